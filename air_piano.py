@@ -1,302 +1,431 @@
 # air_piano.py
 import cv2
+import os
 import time
+import argparse
 from utils.hand_tracker import HandTracker
+from utils.governor import InferenceGovernor
 from utils.mode_selector import ModeSelector
 from utils.download_ui import DownloadUI
 from utils.exit_ui import ExitUI
-from utils.hand_processing import extract_finger_pixels
-from utils.display_text import draw_center_text
-from utils.keyboard import NOTE_MAP, Keyboard
+from utils.hand_processing import extract_finger_pixels, finger_slots
+from utils.motion import FingerMotionTracker
+from utils.filters import FingertipFilter
+from utils.press_detector import PressDetector
+from utils.keyboard import Keyboard
+from utils.layout import DEFAULT_LAYOUT, KeyboardLayout
 from utils.record import MidiRecorder
 from utils.soundplayer import SoundPlayer
 from utils.practice_ui import PracticeUI
+from utils.pipeline import FramePipeline
+from utils.export_jobs import ExportQueue
+from utils.states import StateMachine
+from utils.song import PracticeEngine, Song
+from utils.song_library import SongLibrary
+from utils.scoring import Scorer
+from utils.analytics import AnalyticsStore
+from utils import clock
 
 class AirPiano:
-    def __init__(self, cam_index=0):
-        self.cap = cv2.VideoCapture(cam_index)
-        self.hand_tracker = HandTracker()
-        self.keyboard = Keyboard(NOTE_MAP)
+    def __init__(self, cam_index=0, threaded=True, source=None, headless=False, layout=DEFAULT_LAYOUT,
+                 audio_backend="auto", roi=True, roi_scale=1.0, target_ms=30.0,
+                 fingertip_filter=None, press_detection=True, station=None, infer_procs=0,
+                 analytics=None):
+        """
+        source  : 取代相機的輸入（utils.replay 的 VideoReplaySource / LandmarkReplaySource）
+        headless: 不開視窗，不呼叫 cv2.imshow / cv2.waitKey
+        layout  : 鍵盤音域與黑鍵設定（utils.layout.KeyboardLayout）
+        audio_backend: auto / sounddevice / pygame / file / null（utils.audio_engine）
+        roi     : 鍵盤建好後只對桌面附近的橫帶做手部偵測；roi_scale < 1 時再縮小
+        target_ms: 推論時間目標，超過就自動降低模型 / 解析度 / 偵測頻率；None 表示不調整
+        fingertip_filter: utils.filters.FingertipFilter；None 表示不濾波（eval_onset_timing 量起來濾波會變慢、
+                          預測會多出 onset，所以預設關掉）
+        press_detection : 用桌面高度 + 下壓速度判斷按下（utils.press_detector）；False 時只看距離
+        station : (編號, utils.station_server.SharedResources)，由 StationServer 建立；
+                  None 時自己載入模型、開音效、用全域時鐘（單機執行）
+        infer_procs: > 0 時手部推論分給這麼多個 worker process（utils.inference_pool），只用在單機 + threaded
+        analytics: 練習 / 錄音紀錄的 SQLite 檔（utils.analytics）；None 表示不記錄。server 模式用共用的
+        """
+        self.cap = source if source is not None else cv2.VideoCapture(cam_index)
+        self.headless = headless
+        self.station_id, shared = station if station is not None else (None, None)
+        self.window = "AirPiano" if self.station_id is None else f"AirPiano {self.station_id}"
+        # 共用視窗迴圈時由 server 統一呼叫 cv2.waitKey，再把按鍵放進 self.key
+        self.poll_keys = shared is None
+        self.key = -1
+
+        # landmark 重播：來源自己提供 detect()，不用載入 MediaPipe
+        replay_landmarks = hasattr(self.cap, "detect")
+        # server 模式的模型由 InferencePool 的 worker 提供；process pool 則是各 worker process 自己載入
+        executor = None
+        if infer_procs > 0 and threaded and shared is None and not replay_landmarks:
+            from utils.inference_pool import ProcessInferencePool
+            executor = ProcessInferencePool(workers=infer_procs)
+        governor = None
+        if target_ms and not replay_landmarks:
+            # 模型在 worker 裡、大小換不了：governor 只調整縮放與偵測頻率
+            pool = executor if executor is not None else (shared.pool if shared is not None else None)
+            governor = InferenceGovernor(target_ms,
+                                         complexity=pool.model_complexity if pool is not None else None)
+        self.hand_tracker = HandTracker(use_mediapipe=not replay_landmarks and shared is None and executor is None,
+                                        governor=governor)
+        detector = self.cap if replay_landmarks else self.hand_tracker
+        self.use_roi = roi
+        self.roi_scale = roi_scale
+
+        # 重播時所有 UI 計時都跟著 frame 時間走；server 模式每個 station 各用各的
+        self.clock = getattr(self.cap, "now", None)
+        if shared is None and self.clock is not None:
+            clock.set_clock(self.clock)
+
+        # capture / inference 各自一條 thread，主執行緒只負責畫面與聲音
+        # 畫面只在要顯示時才鏡像；偵測用原始畫面，座標由 HandTracker 鏡像
+        self.pipeline = FramePipeline(self.cap, detector, threaded=threaded, mirror=not headless,
+                                      clock=self.clock if shared is not None else None,
+                                      pool=shared.pool if shared is not None else None,
+                                      executor=executor)
+        self.latency = self.pipeline.stats
+        self.layout = layout
+        self.keyboard = Keyboard(layout, hold_scale=1.2 if press_detection else 1.0)
         self.mode_selector = ModeSelector()
         self.download_ui = DownloadUI()
         self.exit_ui = ExitUI()
-        self.sound_player = SoundPlayer()
+        if shared is None:
+            self.sound_player = SoundPlayer(layout=layout, backend=audio_backend)
+        else:
+            self.sound_player = SoundPlayer(layout=layout, engine=shared.engine, bank=shared.bank,
+                                            voice_key=self.station_id)
         self.midi_recorder = MidiRecorder()
-        self.practice_ui = PracticeUI()
+        # 存檔 / 轉 PDF 在背景 thread，不會卡住畫面
+        self.exports = ExportQueue()
+        # 曲庫 index 在背景建（多台琴共用一個）
+        if shared is None:
+            self.library = SongLibrary().start()
+        else:
+            self.library = shared.library
+        # 每個 session / 每個音的紀錄：主迴圈只丟進 queue，背景 thread 批次寫入
+        if shared is None:
+            self.analytics = AnalyticsStore(analytics) if analytics else None
+            if self.analytics is not None:
+                print(f"Analytics: recording sessions to {self.analytics.path}")
+        else:
+            self.analytics = shared.analytics
+        self.session = None
+        self.velocities = {}
+        self.press_latency = None
+        self.practice_ui = PracticeUI(layout=layout, library=self.library)
 
         self.mode = None  # 模式可選擇"record" or "practice"
-        self.show_mode_text = False
 
         self.frame_w = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         self.frame_h = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
 
+        # 每根手指的下壓速度 → 力度
+        self.motion = FingerMotionTracker(self.frame_h)
+        # 指尖濾波 / 預測（hit-test 前）；None 直接用量到的位置
+        self.fingertips = fingertip_filter
+        # 每根手指的按下 / 抬起狀態機
+        self.press_detector = PressDetector(self.motion) if press_detection else None
+
         self.table_ready = False
         self.keyboard_ready = False
         self.center_x = None
         self.key_width = None
 
-        self.practice_idx = 0
-        self.practice_notes = []
-
-        self.waiting_hands_up = False
-        self.completed_ui_time = None
+        # 練習模式：選好曲子後的 utils.song.PracticeEngine
+        self.practice = None
+        # 跟參考曲子對齊的評分（時間誤差、錯音、漏音、速度變化）
+        self.scorer = None
+
+        # 校正 → 選模式 → 彈奏 → Exit 選單…；訊息畫面用 timer 切換，不會卡住迴圈
+        self.machine = StateMachine(self)
+
+    def show(self, frame, delay=1):
+        """顯示畫面並回傳按鍵；headless 時什麼都不做"""
+        if self.headless:
+            return -1
+        cv2.imshow(self.window, frame)
+        key = cv2.waitKey(delay) & 0xFF if self.poll_keys else self.key
+
+        # [ ] 左右捲動鍵盤，- = 縮放
+        if key == ord("["):
+            self.keyboard.scroll(-1)
+        elif key == ord("]"):
+            self.keyboard.scroll(1)
+        elif key == ord("-"):
+            self.keyboard.set_zoom(self.keyboard.zoom / 1.25)
+        elif key == ord("="):
+            self.keyboard.set_zoom(self.keyboard.zoom * 1.25)
+        return key
 
     def run(self):
         print("Please place your hand on the table for at least 1 second to calibrate.")
+        self.pipeline.start()
 
         while True:
-            ret, frame = self.cap.read()
-            if not ret:
+            packet = self.pipeline.read()
+            if packet is None or not self.step(packet):
                 break
+        self.close()
+
+    def step(self, packet):
+        """處理一個已完成手部偵測的 packet；回傳 False 表示要結束（Exit 或 ESC）"""
+        return self.machine.step(packet)
+
+    # 以下是各狀態（utils.states）共用的動作
+
+    def draw_table_line(self, frame):
+        if self.hand_tracker.table_y_pixel is not None:
+            y = self.hand_tracker.table_y_pixel
+            x = getattr(self.hand_tracker, "table_x_pixel", None)
+
+            # 畫桌面水平線
+            cv2.line(frame, (0, y), (self.frame_w, y), (0, 255, 0), 2)
+
+            # 若有校正的 x，就畫圓心
+            if x is not None:
+                cv2.circle(frame, (x, y), 8, (0, 255, 0), -1)
+
+    def build_keyboard(self, hand):
+        """用校正的手決定鍵寬與位置，建好鍵盤與模式按鈕"""
+        palm_width = abs(hand[4][0] - hand[20][0]) * self.frame_w
+        self.key_width = int(palm_width / 5) # 每個鍵的寬度
+        finger_x = int(hand[8][0] * self.frame_w)
+
+        self.keyboard.build_keyboard(self.frame_w, self.hand_tracker.table_y_pixel, finger_x, self.key_width)
+        if self.press_detector is not None:
+            # 校正的手還放在桌面上，順便記下各手指相對食指的高度
+            self.press_detector.set_table(self.hand_tracker.table_z, hand)
+        self.mode_selector.build_buttons(self.frame_w)
+
+        # 鍵盤位置固定了，之後只需要偵測桌面附近
+        self.hand_tracker.set_roi(self.use_roi, self.roi_scale)
+        self.keyboard_ready = True
+
+    def fingers(self, packet):
+        left_hand, right_hand = packet.hands[0], packet.hands[1]
+        return extract_finger_pixels(left_hand, right_hand, self.frame_w, self.frame_h)
+
+    def play(self, packet):
+        """
+        琴鍵：指尖 → 按下 / 抬起 → 聲音 / MIDI。
+        回傳 (fingers, 這張新按下的音, 目前仍按住的音)
+        """
+        left_hand, right_hand = packet.hands[0], packet.hands[1]
+
+        # 取得手指位置（10 指）
+        fingers = extract_finger_pixels(left_hand, right_hand, self.frame_w, self.frame_h)
+        slots = finger_slots(left_hand, right_hand)
+        self.motion.update(fingers, slots, packet.timestamp)
+
+        # 濾掉抖動；predict 時往前推「拍到這張 frame 到現在」的時間
+        tips = fingers
+        if self.fingertips is not None:
+            lead = time.perf_counter() - packet.t_capture
+            tips = self.fingertips.apply(fingers, slots, packet.timestamp, lead)
+
+        # 檢查鍵盤（事件導向）：只有真的敲下去的手指能按鍵
+        active = None
+        if self.press_detector is not None:
+            active = self.press_detector.update(tips, slots, packet.timestamp)
+        newly_pressed, newly_released = self.keyboard.check_pressed(tips, active)
+        velocities = {note: self.motion.strike_velocity(slots[i])
+                      for note, i in self.keyboard.pressed_by.items()}
+
+        # 聲音：與偵測綁在一起
+        self.sound_player.play_notes(newly_pressed, velocities)
+        self.sound_player.stop_notes(newly_released)
+        self.velocities = velocities
+        if newly_pressed:
+            # 從相機拍到這張 frame 到送出 note-on 的時間
+            self.press_latency = time.perf_counter() - packet.t_capture
+            self.latency.add("glass_to_sound", self.press_latency)
+
+        # 目前仍被按住的鍵（給畫面 / MIDI 用）
+        pressed_notes = [n for n, v in self.keyboard.key_states.items() if v]
+
+        # 若是錄音模式 → 更新 MIDI
+        if self.mode == "record":
+            self.midi_recorder.update(pressed_notes, velocities, packet.timestamp)
+        return fingers, newly_pressed, pressed_notes
+
+    def load_song(self, selected):
+        """
+        曲子模型（鍵盤上沒有的音略過）：有快取就不用再解碼 MIDI；和弦在練習時才往下解析。
+        讀不了的檔案回傳 False（曲庫會把它從清單拿掉），留在選曲畫面。
+        """
+        try:
+            arrays = self.library.load_arrays(selected)
+        except (OSError, ValueError, IndexError) as e:
+            print(f"[Warning] Cannot load song {selected}: {e}")
+            self.practice_ui.selected_file = None
+            return False
+        self.practice_ui.midi_practice_audio = selected
+        self.practice_ui.selected_file = selected
+        self.practice = PracticeEngine(Song.from_arrays(arrays, playable=self.layout.note_map, name=selected))
+        # 評分用同一份欄位另外建一個 Song（游標跟 PracticeEngine 各走各的）
+        self.scorer = Scorer(Song.from_arrays(arrays, playable=self.layout.note_map, name=selected))
+        print(f"Loaded practice song: {selected}, first chord {self.practice.chord}")
+        return True
+
+    def begin_session(self):
+        """進入 playing 時開一個 analytics session（已經開著就不重開）"""
+        if self.analytics is None or self.session is not None:
+            return
+        song = None
+        if self.mode == "practice" and self.practice_ui.selected_file is not None:
+            song = os.path.basename(self.practice_ui.selected_file)
+        self.session = self.analytics.begin_session(self.mode, song=song, station=self.station_id)
+
+    def log_notes(self, packet, newly_pressed, judged=None):
+        """這張 frame 新按下的音送進 analytics；judged 是 Scorer.update 的判定（練習模式）"""
+        if self.session is None or not newly_pressed:
+            return
+        if judged is None:
+            judged = [(note, None, "play", None) for note in sorted(newly_pressed)]
+        latency_ms = self.press_latency * 1000 if self.press_latency is not None else None
+        for note, _, kind, error in judged:
+            self.analytics.note(self.session, packet.timestamp, note, self.velocities.get(note), latency_ms,
+                                kind, error * 1000 if error is not None else None)
+
+    def end_session(self):
+        """彈完 / Restart / 結束：評分在這裡定案；有 analytics 時練習模式附上評分結果"""
+        if self.scorer is not None:
+            self.scorer.finish()
+        if self.session is None:
+            return
+        summary = None
+        if self.session.mode == "practice" and self.scorer is not None:
+            summary = self.scorer.metrics()
+        self.analytics.end_session(self.session, summary)
+        self.session = None
+
+    def restart(self):
+        """Exit 選單的 Restart：重新校正桌面，沒存的錄音直接丟掉"""
+        self.end_session()
+        self.mode = None
+        self.practice = self.scorer = None
+
+        # 重置鍵盤 / 校正狀態
+        self.keyboard_ready = False
+        self.center_x = None
+        self.key_width = None
 
-            frame = cv2.flip(frame, 1)
-                        
-            left_hand, right_hand, left_z, right_z, handed_list = \
-                self.hand_tracker.detect(frame)
-
-            n_hands = 0
-            if left_hand is not None:
-                n_hands += 1
-            if right_hand is not None:
-                n_hands += 1
-
-            # 1. 桌面校正
-            if not self.hand_tracker.table_locked:
-                self.hand_tracker.update_table_calibration(left_hand, right_hand, self.frame_h)
-                draw_center_text(frame, "Please keep fingertip touching table for calibration.")
-
-                cv2.imshow("AirPiano", frame)
-                if cv2.waitKey(1) & 0xFF == 27:
-                    break
-                continue
-            
-            if self.hand_tracker.table_y_pixel is not None:
-                y = self.hand_tracker.table_y_pixel
-                x = getattr(self.hand_tracker, "table_x_pixel", None)
-
-                # 畫桌面水平線
-                cv2.line(frame, (0, y), (self.frame_w, y), (0, 255, 0), 2)
-
-                # 若有校正的 x，就畫圓心
-                if x is not None:
-                    cv2.circle(frame, (x, y), 8, (0, 255, 0), -1)
-
-            # 2. 手部校正
-            if self.hand_tracker.table_locked and not self.keyboard_ready:
-                draw_center_text(frame, "Step 2: Show your hand to calibrate key width.")
-
-                dom = self.hand_tracker.get_dominant(left_hand, right_hand)
-
-                if dom is None:
-                    # 沒偵測到手，等手出現
-                    cv2.imshow("AirPiano", frame)
-                    if cv2.waitKey(1) & 0xFF == 27: break
-                    continue
-                
-                hand = left_hand if dom == "Left" else right_hand
-
-                palm_width = abs(hand[4][0] - hand[20][0]) * self.frame_w
-                self.key_width = int(palm_width / 5) # 每個鍵的寬度
-
-                finger_x = None
-                if hand is not None: finger_x = int(hand[8][0] * self.frame_w) 
-
-                self.keyboard.build_keyboard(self.frame_w, self.hand_tracker.table_y_pixel, finger_x, self.key_width)
-                self.mode_selector.build_buttons(self.frame_w)
-
-                self.keyboard_ready = True
-                continue
-
-            # 3. ModeSelector 選擇模式
-            if self.mode is None:
-                fingers = extract_finger_pixels(left_hand, right_hand, self.frame_w, self.frame_h)
-                hover = self.mode_selector.check_pressed(fingers)
-
-                if hover is not None:
-                    self.mode = hover
-                    self.show_mode_text = True
-
-                    if self.mode == "record":
-                        self.midi_recorder.start()
-                    elif self.mode == "practice":
-                        selected = None
-                        while selected is None:
-                            ret, frame = self.cap.read()
-                            if not ret: break
-
-                            frame = cv2.flip(frame, 1)
-                            left_hand, right_hand, left_z, right_z, handed_list = self.hand_tracker.detect(frame)
-
-                            # 取得手指座標
-                            fingers = extract_finger_pixels(left_hand, right_hand,
-                                                            self.frame_w, self.frame_h)
-                            # 只需要右手的食指
-                            fingertip = None
-                            if right_hand is not None:  # 偵測到右手
-                                x_norm, y_norm, _ = right_hand[8]   # 食指 (ID=8)
-                                fx = int(x_norm * self.frame_w)
-                                fy = int(y_norm * self.frame_h)
-                                fingertip = (fx, fy)
-
-                            # 顯示 UI
-                            frame = self.practice_ui.render(frame, fingertip)
-                            selected = self.practice_ui.update(fingertip)
-                            cv2.imshow("AirPiano", frame)
-                            if cv2.waitKey(1) & 0xFF == 27:
-                                break
-
-                        # 使用者已選好曲目
-                        self.practice_ui.midi_practice_audio = selected
-                        self.practice_ui.selected_file = selected
-
-                        # 讀取 MIDI → 轉成鍵盤可用的 note sequence
-                        self.practice_notes = self.practice_ui.midi_to_notes(selected)
-                        print("Loaded practice notes:", self.practice_notes)
-                        self.practice_idx = 0
-
-                self.mode_selector.draw(frame, hover)
-
-                draw_center_text(frame, "Please select a mode: Record or Practice.")
-                cv2.imshow("AirPiano", frame)
-
-                if cv2.waitKey(1) & 0xFF == 27:
-                    break
-                continue
-
-            # 顯示當前選擇模式 1 秒
-            if self.show_mode_text:
-                msg = "RECORD MODE" if self.mode == "record" else "PRACTICE MODE"
-                draw_center_text(frame, msg)
-                cv2.imshow("AirPiano", frame)
-                cv2.waitKey(1000)
-                self.show_mode_text = False
-
-            # 4. 取得手指位置（10 指）
-            fingers = extract_finger_pixels(left_hand, right_hand, self.frame_w, self.frame_h)
-
-            # 5. 檢查鍵盤（事件導向）
-            newly_pressed, newly_released = self.keyboard.check_pressed(fingers)
-
-            # 6. 聲音：與偵測綁在一起
-            self.sound_player.play_notes(newly_pressed)
-            self.sound_player.stop_notes(newly_released)
-
-            # 目前仍被按住的鍵（給畫面 / MIDI 用）
-            pressed_notes = [n for n, v in self.keyboard.key_states.items() if v]
-
-            # 7.若是錄音模式 → 更新 MIDI
-            if self.mode == "record":
-                self.midi_recorder.update(pressed_notes)
-
-            # 8. 離開 Exit UI
-            left_up = left_hand is None
-            right_up = right_hand is None
-            self.exit_ui.update(left_up, right_up)
-
-            # 若 Exit UI 開啟 → 檢查按鈕
-            if self.exit_ui.visible:
-                self.exit_ui.build(self.frame_w, self.frame_h)
-
-                midi_hover = False
-                # 只有在 record 模式才顯示 Download MIDI
-                if self.mode == "record":
-                    self.download_ui.build(self.frame_w, self.frame_h)
-                    midi_hover = self.download_ui.check_pressed(fingers)
-
-                    if midi_hover:
-                        midi_file = self.midi_recorder.stop_and_save()
-                        draw_center_text(frame, f"Saved: {midi_file}")
-                        cv2.imshow("AirPiano", frame)
-                        cv2.waitKey(500)  # 短暫顯示一下提示
-
-                # completed 狀態下，需等待 2 秒後才允許點擊 Exit UI
-                if self.mode == "completed":
-                    if time.time() - self.completed_ui_time >= 2.0:
-                        selected = self.exit_ui.check_pressed(fingers)
-                    else:
-                        selected = None
-                else:
-                    selected = self.exit_ui.check_pressed(fingers)
-
-                if selected == "exit":
-                    print("程式結束")
-                    break
-
-                elif selected == "restart":
-                    print("Restart requested")
-
-                    # 重置模式狀態
-                    self.mode = None
-                    self.show_mode_text = False
-
-                    # 重置鍵盤 / 校正狀態
-                    self.keyboard_ready = False
-                    self.center_x = None
-                    self.key_width = None
-
-                    # 重置 hand_tracker 的桌面校正狀態
-                    self.hand_tracker.table_locked = False
-                    self.hand_tracker.table_lock_time = None
-
-                    self.exit_ui.visible = False
-                    self.exit_ui.trigger_time = None
-
-                    # 5. 重建一個新的 MIDI recorder
-                    self.midi_recorder = MidiRecorder()
-                    continue
-
-
-                # 繪製 Exit UI
-                self.exit_ui.draw(frame)
-
-                # 若是 record 模式，再畫 Download 按鈕
-                if self.mode == "record":
-                    self.download_ui.draw(frame, midi_hover)
-
-                cv2.imshow("AirPiano", frame)
-                if cv2.waitKey(1) & 0xFF == 27:
-                    break
-                continue
-
-            # 練習模式 → 只畫鍵盤
-            if self.mode == "practice":
-                next_note = self.practice_notes[self.practice_idx]
-                # self.keyboard.highlight_note(next_note)
-
-                # 如果使用者按對
-                if next_note in newly_pressed:
-                    self.practice_idx += 1
-
-                    # 如果彈完了，show success
-                    if self.practice_idx >= len(self.practice_notes):
-                        draw_center_text(frame, "Song Completed!")
-                        cv2.imshow("AirPiano", frame)
-                        cv2.waitKey(1500)
-
-                        # 啟動完成畫面計時（2 秒後才允許互動）
-                        self.mode = "completed"
-                        self.completed_ui_time = time.time()
-                        self.waiting_hands_up = False
-
-                        self.exit_ui.visible = True
-                        self.exit_ui.trigger_time = None
-                        continue
-
-                self.keyboard.draw(frame, pressed_notes, next_note)
-
-            # 錄音模式 → 錄完可下載 MIDI
-            if self.mode == "record":
-                self.keyboard.draw(frame, pressed_notes)
-
-            # 畫面更新
-            cv2.imshow("AirPiano", frame)
-            if cv2.waitKey(1) & 0xFF == 27:
-                break
+        # 重置 hand_tracker 的桌面校正狀態
+        self.hand_tracker.table_locked = False
+        self.hand_tracker.table_lock_time = None
+        self.hand_tracker.set_roi(False)
 
+        self.exit_ui.visible = False
+        self.exit_ui.trigger_time = None
+
+        # 重建一個新的 MIDI recorder
+        self.midi_recorder.stop()
+        self.midi_recorder = MidiRecorder()
+        self.machine.reset()
+
+    def close(self):
+        self.pipeline.stop()
+        # 等還沒存完的錄音
+        self.exports.close(wait=True)
+        self.hand_tracker.stop_recording()
+        self.sound_player.close()
         self.cap.release()
-        cv2.destroyAllWindows()
+        if self.station_id is None:
+            if not self.headless:
+                cv2.destroyAllWindows()
+            clock.set_clock(None)
+        else:
+            if not self.headless:
+                cv2.destroyWindow(self.window)
+            print(f"Station {self.station_id}:")
+        self.latency.report()
+        if self.hand_tracker.hands is not None or self.pipeline.executor is not None:
+            print(f"Inference ROI: {self.hand_tracker.roi_summary()}")
+        if self.pipeline.executor is not None:
+            print(f"Inference processes: {self.pipeline.executor.metrics()}")
+        if self.press_detector is not None:
+            print(f"Press detection: {self.press_detector.metrics()}")
+        if self.hand_tracker.governor is not None:
+            print(f"Inference governor: {self.hand_tracker.governor.metrics()}")
+        # 評分在 end_session 定案，之後才印
+        self.end_session()
+        if self.practice is not None:
+            print(f"Practice: {self.practice.metrics()}")
+        if self.scorer is not None:
+            print(f"Scoring: {self.scorer.metrics()}")
+        if self.station_id is None:
+            self.library.stop()
+            print(f"Song library: {self.library.metrics()}")
+            if self.analytics is not None:
+                self.analytics.close()
+                print(f"Analytics: {self.analytics.metrics()}")
 
 
 if __name__ == "__main__":
-    app = AirPiano(cam_index=0)
-    app.run()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--camera", type=int, nargs="+", default=[0],
+                        help="相機編號；給好幾個就在同一個 process 跑好幾台琴")
+    parser.add_argument("--replay", nargs="+", help="影片檔或 landmark 串流 (.lmk / .npz)；可以給好幾個")
+    parser.add_argument("--workers", type=int, default=2, help="多台琴時共用的推論 worker 數")
+    parser.add_argument("--infer-procs", type=int, default=0,
+                        help="單機時把手部推論分給幾個 worker process（0 = 在推論 thread 裡做）")
+    parser.add_argument("--headless", action="store_true")
+    parser.add_argument("--no-threads", action="store_true")
+    parser.add_argument("--record-landmarks", help="把偵測到的 landmark 存成 .lmk")
+    parser.add_argument("--range", default="C3-C5", help="音域，例如 C3-C5、C2-C7，或 88")
+    parser.add_argument("--black-keys", action="store_true", help="上排加上黑鍵")
+    parser.add_argument("--audio", default="auto", choices=["auto", "sounddevice", "pygame", "file", "null"])
+    parser.add_argument("--no-roi", action="store_true", help="校正後仍用整張畫面做手部偵測")
+    parser.add_argument("--roi-scale", type=float, default=1.0, help="ROI 送進模型前的縮放比例")
+    parser.add_argument("--filter", action="store_true", help="指尖位置做 One-Euro 濾波")
+    parser.add_argument("--predict", action="store_true",
+                        help="濾波並往前預測，補償 pipeline 延遲（時間較準，但抖動時會多出 onset）")
+    parser.add_argument("--min-cutoff", type=float, default=5.0, help="One-Euro 靜止時的 cutoff (Hz)")
+    parser.add_argument("--beta", type=float, default=0.1, help="One-Euro 速度係數")
+    parser.add_argument("--proximity-press", action="store_true", help="舊的判定方式：指尖靠近琴鍵就算按下")
+    parser.add_argument("--target-ms", type=float, default=30.0, help="推論時間目標（0 = 固定最高品質、每張都偵測）")
+    parser.add_argument("--analytics", metavar="PATH", nargs="?", const="records/analytics.db",
+                        help="把練習 / 錄音記到這個 SQLite 檔（只給 --analytics 時用 records/analytics.db）；"
+                             "預設不記錄")
+    args = parser.parse_args()
+
+    sources = [None] * len(args.camera)
+    if args.replay:
+        from utils.replay import open_replay_source
+        sources = [open_replay_source(path) for path in args.replay]
+
+    layout = KeyboardLayout.parse(args.range, black_keys=args.black_keys)
+    options = dict(headless=args.headless, layout=layout, audio_backend=args.audio,
+                   roi=not args.no_roi, roi_scale=args.roi_scale, target_ms=args.target_ms,
+                   press_detection=not args.proximity_press, infer_procs=args.infer_procs)
+    analytics = args.analytics
+
+    def make_filter():
+        if not (args.filter or args.predict):
+            return None
+        return FingertipFilter(args.min_cutoff, args.beta, predict=args.predict)
+
+    if len(sources) > 1:
+        # 多台琴：共用推論 worker、mixer 與音色庫
+        from utils.replay import PacedSource
+        from utils.station_server import StationServer
+        server = StationServer(workers=args.workers, headless=args.headless, audio_backend=args.audio,
+                               analytics=analytics)
+        for i, source in enumerate(sources):
+            cam_index = args.camera[i] if source is None else 0
+            if source is not None:
+                # 重播檔依原本的 fps 出 frame，跟相機一樣
+                source = PacedSource(source)
+            server.add(AirPiano(cam_index=cam_index, source=source, fingertip_filter=make_filter(),
+                                station=server.station(), **options))
+        server.run()
+    else:
+        # 重播預設逐張處理，結果才會固定
+        source = sources[0]
+        threaded = not args.no_threads and source is None
+        app = AirPiano(cam_index=args.camera[0], threaded=threaded, source=source,
+                       fingertip_filter=make_filter(), analytics=analytics, **options)
+        if args.record_landmarks:
+            app.hand_tracker.start_recording(args.record_landmarks, (app.frame_w, app.frame_h))
+        app.run()
@@ -0,0 +1,150 @@
+# benchmarks/bench_alloc.py
+"""
+每張 frame 在影像路徑上配置了多少記憶體（tracemalloc，numpy / cv2 的輸出陣列都算在內）。
+
+  legacy : 原本的寫法：cap.read() 新的 frame → cv2.flip → cvtColor → list comprehension 轉 landmark
+           → PracticeUI 的 overlay = frame.copy()
+  pooled : FramePipeline + HandTracker 目前的寫法：frame / landmark 從 pool 借、
+           resize / cvtColor 寫進 scratch buffer、座標鏡像、顯示前原地翻轉
+
+peak_kb 是處理一張 frame 期間比開始時多用的最大記憶體（暫時配置的 frame 都會反映在這裡），
+retained_kb 是處理完之後還留著的量；前 warmup 張（buffer 第一次配置）不算。
+MediaPipe 的推論本身不在量測範圍內。
+
+    python -m benchmarks.bench_alloc --frames 300
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from utils.hand_tracker import HandTracker
+from utils.pipeline import FramePipeline
+from utils.practice_ui import PracticeUI
+from .synthetic import SyntheticCapture, as_mediapipe_landmarks, synthetic_frames, synthetic_landmark_stream
+
+
+class StreamDetector:
+    """
+    把合成 landmark 串流包成 FramePipeline 的 detector：
+    影像前處理與 landmark 轉換都走 HandTracker 的程式碼，只有 Hands.process 換成查表。
+    """
+    def __init__(self, stream):
+        self.stream = stream
+        self.i = 0
+        self.tracker = HandTracker(use_mediapipe=False)
+
+    def detect(self, frame, out=None):
+        _, left, right = self.stream[self.i % len(self.stream)]
+        self.i += 1
+        self.tracker._prepare(frame, None)
+
+        hands = [None, None]
+        handed_list = []
+        for j, (hand, label) in enumerate(((left, "Left"), (right, "Right"))):
+            if hand is not None:
+                points = as_mediapipe_landmarks(hand)
+                hands[j] = HandTracker._fill_landmarks(points, out[j], mirror=True)
+                handed_list.append(label)
+        return hands[0], hands[1], None, None, handed_list
+
+
+def legacy_frame(cap, stream, i, practice_ui, fingertip):
+    ret, frame = cap.read()
+    frame = cv2.flip(frame, 1)
+    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    _, left, right = stream[i % len(stream)]
+    for hand in (left, right):
+        if hand is not None:
+            np.array([(p.x, p.y, p.z) for p in as_mediapipe_landmarks(hand)])
+
+    # PracticeUI.render 原本的半透明選單
+    h, w, _ = frame.shape
+    overlay = frame.copy()
+    cv2.rectangle(overlay, (0, 0), (w, practice_ui.menu_height), practice_ui.menu_bg, -1)
+    frame[:practice_ui.menu_height] = cv2.addWeighted(overlay[:practice_ui.menu_height], 0.85,
+                                                      frame[:practice_ui.menu_height], 0.15, 0)
+    cv2.circle(frame, fingertip, 8, (0, 255, 0), -1)
+    return rgb
+
+
+def measure(step, n_frames, warmup):
+    """回傳每張 frame 的 (peak, retained) bytes，以及平均耗時"""
+    peaks = []
+    retained = []
+    elapsed = 0.0
+    tracemalloc.start()
+    for i in range(n_frames):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        t0 = time.perf_counter()
+        step(i)
+        dt = time.perf_counter() - t0
+        after, peak = tracemalloc.get_traced_memory()
+        if i >= warmup:
+            peaks.append(peak - before)
+            retained.append(after - before)
+            elapsed += dt
+    tracemalloc.stop()
+
+    peaks = np.array(peaks) / 1024
+    retained = np.array(retained) / 1024
+    return {
+        "peak_kb_p50": round(float(np.percentile(peaks, 50)), 1),
+        "peak_kb_max": round(float(peaks.max()), 1),
+        "retained_kb_mean": round(float(retained.mean()), 3),
+        "ms_per_frame": round(elapsed / max(len(peaks), 1) * 1000, 3),
+    }
+
+
+def run(n_frames=300, frame_w=1280, frame_h=720, seed=0, warmup=10):
+    frames = synthetic_frames(4, frame_w, frame_h, seed)
+    stream = synthetic_landmark_stream(n_frames, seed=seed)
+    fingertip = (frame_w // 2, 100)
+    results = {}
+
+    practice_ui = PracticeUI()
+    cap = SyntheticCapture(frames)
+    results["legacy"] = measure(lambda i: legacy_frame(cap, stream, i, practice_ui, fingertip),
+                                n_frames, warmup)
+
+    pipeline = FramePipeline(SyntheticCapture(frames), StreamDetector(stream), threaded=False)
+
+    def pooled(i):
+        packet = pipeline.read()
+        practice_ui.render(packet.frame, fingertip)
+
+    results["pooled"] = measure(pooled, n_frames, warmup)
+    pipeline.stop()
+    results["pooled"]["frame_buffers"] = pipeline.frames.allocated
+    results["pooled"]["landmark_buffers"] = pipeline.hands.allocated
+
+    return {"benchmark": "alloc", "frames": n_frames, "warmup": warmup,
+            "frame_size": [frame_w, frame_h], "frame_kb": round(frame_w * frame_h * 3 / 1024, 1),
+            "paths": results}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--out", help="JSON 輸出檔（預設印到 stdout）")
+    args = parser.parse_args()
+
+    result = run(args.frames, args.width, args.height, args.seed, args.warmup)
+    text = json.dumps(result, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
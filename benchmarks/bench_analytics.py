@@ -0,0 +1,181 @@
+# benchmarks/bench_analytics.py
+"""
+練習紀錄（utils.analytics.AnalyticsStore）：主迴圈記一個音要多久、writer 寫得多快、
+session 累積到幾萬個之後查詢還快不快。
+
+暫存資料夾裡的新資料庫，寫入 --sessions 個合成的 session（分散在 --weeks 週、--songs 首曲子，
+每個 session --notes 個音，命中 / 錯音 / 時間誤差隨機），然後量：
+  bulk     : 一口氣灌進去（比 writer 快很多，queue 會堆起來）：全部寫完要多久、每秒幾個音、幾個 batch
+  live     : 資料庫已經很大時，照 --live-rate（每秒幾個音，遠比人彈得快）記一個 session：
+             store.note() 本身（只丟進 queue）每次的時間、flush 要等多久
+  queries  : accuracy_by_week / slowest_notes（讀彙總表）跟直接從 sessions / notes 算（raw，
+             每次掃所有的音）的時間，並檢查兩種算法結果一樣
+
+    python -m benchmarks.bench_analytics --sessions 1000 10000 50000
+"""
+import argparse
+import contextlib
+import json
+import os
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+
+from utils.analytics import AnalyticsStore
+
+NOTES = ["C4", "D4", "E4", "F4", "G4", "A4", "B4", "C5"]
+
+RAW_ACCURACY = """
+SELECT s.song, s.week, SUM(n.kind = 'hit') AS n_hits, SUM(n.kind = 'wrong') AS n_wrong
+FROM notes n JOIN sessions s ON s.id = n.session
+GROUP BY s.song, s.week HAVING n_hits + n_wrong > 0 ORDER BY s.song, s.week
+"""
+
+RAW_SLOWEST = """
+SELECT n.note, AVG(n.error_ms) AS mean_ms, COUNT(n.error_ms) AS cnt FROM notes n
+WHERE n.error_ms IS NOT NULL GROUP BY n.note HAVING cnt >= 5 ORDER BY mean_ms DESC LIMIT 10
+"""
+
+
+def timed(fn, repeat=5):
+    """最好的一次（ms）與回傳值"""
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        ms = (time.perf_counter() - t0) * 1000
+        best = ms if best is None else min(best, ms)
+    return round(best, 3), out
+
+
+def populate(store, n_sessions, n_notes, n_songs, n_weeks, seed=0):
+    """回傳每次 store.note() 的時間（秒）"""
+    rng = np.random.default_rng(seed)
+    start = time.time() - n_weeks * 7 * 86400
+    times = []
+    for i in range(n_sessions):
+        song = f"song_{rng.integers(n_songs):02d}.mid"
+        started = start + i / n_sessions * n_weeks * 7 * 86400
+        session = store.begin_session("practice", song=song, started=started)
+        # 每個 session 的程度不一樣；音越高越容易晚
+        skill = rng.uniform(0.6, 0.98)
+        hits = wrong = 0
+        for k in range(n_notes):
+            idx = rng.integers(len(NOTES))
+            hit = rng.random() < skill
+            error = rng.normal(10.0 * idx, 30.0) if hit else None
+            t0 = time.perf_counter()
+            store.note(session, k * 0.5, NOTES[idx], velocity=int(rng.integers(40, 127)),
+                       latency_ms=float(rng.normal(40, 5)), kind="hit" if hit else "wrong", error_ms=error)
+            times.append(time.perf_counter() - t0)
+            hits += hit
+            wrong += not hit
+        store.end_session(session, {"played": n_notes, "hits": hits, "wrong_notes": wrong,
+                                    "missed": int(rng.integers(0, 3)), "accuracy": round(hits / n_notes, 3)})
+    return times
+
+
+def live(path, rate, seconds):
+    """已經有資料的資料庫，照固定速度記音（跟實際彈奏一樣 queue 不會堆起來）"""
+    store = AnalyticsStore(path)
+    session = store.begin_session("practice", song="live.mid")
+    times = []
+    t_next = time.perf_counter()
+    for k in range(int(rate * seconds)):
+        t_next += 1.0 / rate
+        delay = t_next - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        t0 = time.perf_counter()
+        store.note(session, k / rate, NOTES[k % len(NOTES)], velocity=90, latency_ms=40.0, kind="hit", error_ms=5.0)
+        times.append(time.perf_counter() - t0)
+    store.end_session(session)
+    t0 = time.perf_counter()
+    store.flush()
+    flush_ms = (time.perf_counter() - t0) * 1000
+    store.close()
+    us = np.asarray(times) * 1e6
+    return {"rate": rate, "notes": len(times),
+            "note_p50_us": round(float(np.percentile(us, 50)), 2),
+            "note_p99_us": round(float(np.percentile(us, 99)), 2),
+            "note_max_us": round(float(us.max()), 1),
+            "flush_ms": round(flush_ms, 2), "batches": store.metrics()["batches"]}
+
+
+def raw(path, sql):
+    with contextlib.closing(sqlite3.connect(path)) as conn:
+        return conn.execute(sql).fetchall()
+
+
+def run(n_sessions, args):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "analytics.db")
+        store = AnalyticsStore(path)
+        t0 = time.perf_counter()
+        note_times = populate(store, n_sessions, args.notes, args.songs, args.weeks)
+        store.close()
+        write_s = time.perf_counter() - t0
+        writer = store.metrics()
+
+        us = np.asarray(note_times) * 1e6
+        result = {
+            "sessions": n_sessions,
+            "notes": writer["notes"],
+            "bulk": {"total_s": round(write_s, 2),
+                     "notes_per_s": round(writer["notes"] / write_s),
+                     "batches": writer["batches"],
+                     "writer_ms": writer["write_ms"],
+                     "failed": writer["failed"],
+                     "note_p50_us": round(float(np.percentile(us, 50)), 2),
+                     "note_max_us": round(float(us.max()), 1)},
+            "db_mb": round(os.path.getsize(path) / 2**20, 1),
+            "live": live(path, args.live_rate, args.live_s),
+        }
+
+        song = "song_00.mid"
+        acc_ms, acc = timed(lambda: store.accuracy_by_week())
+        acc_song_ms, _ = timed(lambda: store.accuracy_by_week(song=song))
+        slow_ms, slow = timed(lambda: store.slowest_notes())
+        slow_song_ms, _ = timed(lambda: store.slowest_notes(song=song))
+        recent_ms, recent = timed(lambda: store.recent_sessions())
+        drill_ms, _ = timed(lambda: store.session_notes(recent[0]["id"]))
+        raw_acc_ms, raw_acc = timed(lambda: raw(path, RAW_ACCURACY), 1)
+        raw_slow_ms, raw_slow = timed(lambda: raw(path, RAW_SLOWEST), 1)
+        result["queries_ms"] = {
+            "accuracy_by_week": acc_ms, "accuracy_by_week_one_song": acc_song_ms,
+            "slowest_notes": slow_ms, "slowest_notes_one_song": slow_song_ms,
+            "recent_sessions": recent_ms, "session_notes": drill_ms,
+            "raw_accuracy_by_week": raw_acc_ms, "raw_slowest_notes": raw_slow_ms,
+        }
+        result["same_result"] = (
+            [(r["song"], r["week"], r["hits"], r["wrong"]) for r in acc] == [tuple(r) for r in raw_acc]
+            and [r["note"] for r in slow] == [r[0] for r in raw_slow])
+        result["rows"] = {"song_weeks": len(acc), "slowest": [(r["note"], r["mean_ms"]) for r in slow[:3]]}
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--notes", type=int, default=40, help="每個 session 幾個音")
+    parser.add_argument("--songs", type=int, default=30)
+    parser.add_argument("--weeks", type=int, default=52)
+    parser.add_argument("--live-rate", type=float, default=200.0, help="live 階段每秒幾個音")
+    parser.add_argument("--live-s", type=float, default=3.0)
+    parser.add_argument("--out", help="JSON 輸出檔（預設印到 stdout）")
+    args = parser.parse_args()
+
+    runs = [run(n, args) for n in args.sessions]
+    text = json.dumps({"benchmark": "analytics", "notes_per_session": args.notes, "songs": args.songs,
+                       "weeks": args.weeks, "runs": runs}, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# benchmarks/bench_hot_path.py
+"""
+分別計時 AirPiano.run 每一圈的各個階段，輸出 p50/p95/p99 (JSON)。
+
+    python -m benchmarks.bench_hot_path --frames 500 --out bench_output.json
+
+MediaPipe 無法載入時 Hands.process 這一段會標成 skipped，其他階段照跑，
+所以在只有 CPU 的機器上也能比較不同 commit。
+"""
+import argparse
+import json
+import platform
+import time
+
+import cv2
+import numpy as np
+
+from utils.hand_processing import extract_finger_pixels
+from utils.hand_tracker import HandTracker
+from utils.keyboard import NOTE_MAP, Keyboard
+from utils.latency import LatencyStats
+from utils.practice_ui import PracticeUI
+from utils.record import MidiRecorder
+from .synthetic import synthetic_frames, synthetic_landmark_stream, as_mediapipe_landmarks
+
+
+def make_hands():
+    try:
+        import mediapipe as mp
+        return mp.solutions.hands.Hands(
+            max_num_hands=2,
+            min_detection_confidence=0.6,
+            min_tracking_confidence=0.6,
+            model_complexity=1
+        )
+    except (ImportError, AttributeError) as e:
+        print(f"MediaPipe unavailable, skipping Hands.process: {e}")
+        return None
+
+
+def hand_box(hand, frame_w, frame_h):
+    return (int(hand[:, 0].min() * frame_w), int(hand[:, 1].min() * frame_h),
+            int(hand[:, 0].max() * frame_w), int(hand[:, 1].max() * frame_h))
+
+
+def run(n_frames=300, frame_w=1280, frame_h=720, seed=0, use_mediapipe=True, roi_scale=1.0):
+    stats = LatencyStats(window=n_frames)
+    frames = synthetic_frames(8, frame_w, frame_h, seed)
+    stream = synthetic_landmark_stream(n_frames, seed=seed)
+    hands = make_hands() if use_mediapipe else None
+
+    # 依第一張 frame 的右手建鍵盤（同 AirPiano 的手寬校正）
+    _, _, right0 = stream[0]
+    table_y = int(right0[8][1] * frame_h)
+    key_width = int(abs(right0[4][0] - right0[20][0]) * frame_w / 5)
+    keyboard = Keyboard(NOTE_MAP)
+    keyboard.build_keyboard(frame_w, table_y, frame_w // 2, key_width)
+
+    # 校正後的 ROI 選擇（只用到 HandTracker 的 ROI 邏輯，不載入模型）
+    roi_tracker = HandTracker(use_mediapipe=False)
+    roi_tracker.table_y_pixel = table_y
+    roi_tracker.set_roi(True, roi_scale)
+    roi_pixels = 0
+
+    practice_ui = PracticeUI()
+    recorder = MidiRecorder()
+    recorder.active = True      # 不呼叫 start()，避免印出訊息
+
+    def timed(stage, fn, *args):
+        t0 = time.perf_counter()
+        out = fn(*args)
+        stats.add(stage, time.perf_counter() - t0)
+        return out
+
+    # 與 FramePipeline / HandTracker 相同：frame、RGB、landmark 都寫進重複使用的 buffer
+    frame = np.empty_like(frames[0])
+    rgb = np.empty_like(frames[0])
+    hand_buf = np.empty((2, 21, 3))
+
+    for i, (_, left, right) in enumerate(stream):
+        np.copyto(frame, frames[i % len(frames)])
+
+        timed("bgr2rgb", cv2.cvtColor, frame, cv2.COLOR_BGR2RGB, rgb)
+        if hands is not None:
+            timed("hands_process", hands.process, rgb)
+
+        # ROI：同一張 frame 只裁桌面附近的橫帶
+        roi_tracker.hand_boxes = [hand_box(h, frame_w, frame_h) for h in (left, right) if h is not None]
+        t0 = time.perf_counter()
+        roi_tracker._select_roi(frame_w, frame_h)
+        roi_rgb = roi_tracker._prepare(frame, roi_tracker.roi)
+        stats.add("roi_bgr2rgb", time.perf_counter() - t0)
+        roi_pixels += roi_rgb.shape[0] * roi_rgb.shape[1]
+        if hands is not None:
+            timed("hands_process_roi", hands.process, roi_rgb)
+
+        # landmark → numpy，與 HandTracker.detect 相同的寫法
+        lms = [as_mediapipe_landmarks(h) for h in (left, right) if h is not None]
+        t0 = time.perf_counter()
+        for j, lm in enumerate(lms):
+            HandTracker._fill_landmarks(lm, hand_buf[j], mirror=True)
+        stats.add("landmarks_to_numpy", time.perf_counter() - t0)
+
+        fingers = timed("extract_fingers", extract_finger_pixels, left, right, frame_w, frame_h)
+        timed("check_pressed", keyboard.check_pressed, fingers)
+        pressed_notes = [n for n, v in keyboard.key_states.items() if v]
+        timed("keyboard_draw", keyboard.draw, frame, pressed_notes)
+        timed("practice_render", practice_ui.render, frame, (frame_w // 2, 100))
+        # 顯示前原地鏡像
+        timed("mirror", cv2.flip, frame, 1, frame)
+        timed("midi_update", recorder.update, pressed_notes)
+
+    summary = stats.summary()
+    if hands is None:
+        summary["hands_process"] = {"skipped": True}
+        summary["hands_process_roi"] = {"skipped": True}
+
+    return {
+        "benchmark": "hot_path",
+        "frames": n_frames,
+        "frame_size": [frame_w, frame_h],
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "roi_scale": roi_scale,
+        "roi_pixel_ratio": round(roi_pixels / (n_frames * frame_w * frame_h), 3),
+        "stages": summary,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-mediapipe", action="store_true")
+    parser.add_argument("--roi-scale", type=float, default=1.0)
+    parser.add_argument("--out", help="JSON 輸出檔（預設印到 stdout）")
+    args = parser.parse_args()
+
+    result = run(args.frames, args.width, args.height, args.seed, not args.no_mediapipe, args.roi_scale)
+    text = json.dumps(result, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
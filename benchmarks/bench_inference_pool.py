@@ -0,0 +1,151 @@
+# benchmarks/bench_inference_pool.py
+"""
+手部推論分給 N 個 worker process（utils.inference_pool）時每秒能推論幾張。
+
+來源是比推論快很多的合成相機（--fps，預設 120），FramePipeline 照平常的方式跑：
+推論跟不上時 capture ring 會丟掉舊的 frame，所以 frames_out / wall 就是推論的吞吐量。
+workers=0 是原本的寫法（一條推論 thread、同一個 process）。
+
+每張 frame 左上角寫了編號，假模型把編號放進 landmark 回傳，
+所以也會檢查：交回來的順序有沒有倒退（out_of_order）、結果有沒有配錯 frame（mismatched）。
+
+  --model synthetic : 每張固定花 --cost-ms ± --jitter-ms 的 CPU，不需要 MediaPipe
+  --model mediapipe : 真的 Hands.process（雜訊畫面上找不到手，但 palm detection 的成本是真的）
+  --kill-after N    : 交回 N 張之後砍掉 worker 0，看剩下的 worker 能不能接手
+
+    python -m benchmarks.bench_inference_pool --workers 0 1 2 4 8
+    python -m benchmarks.bench_inference_pool --workers 4 --kill-after 100
+"""
+import argparse
+import contextlib
+import functools
+import io
+import json
+import os
+import signal
+import time
+
+from utils.hand_tracker import HandTracker
+from utils.inference_pool import ProcessInferencePool, _build_model
+from utils.pipeline import FramePipeline
+from .synthetic import SyntheticCapture, stamp_frame, synthetic_frames, synthetic_hands
+
+
+class StampedCapture(SyntheticCapture):
+    """每張 frame 寫上編號；fps > 0 時照這個速度出 frame"""
+    def __init__(self, frames, n_frames, fps=0.0):
+        super().__init__(frames, n_frames)
+        self.interval = 1.0 / fps if fps > 0 else 0.0
+        self.next_t = None
+
+    def read(self, image=None):
+        if self.interval:
+            now = time.perf_counter()
+            if self.next_t is None:
+                self.next_t = now
+            if self.next_t > now:
+                time.sleep(self.next_t - now)
+            self.next_t += self.interval
+        n = self.idx
+        ret, frame = super().read(image)
+        if ret:
+            stamp_frame(frame, n)
+        return ret, frame
+
+
+def run(workers, factory, n_frames, frames, fps, kill_after):
+    tracker = HandTracker(use_mediapipe=False)
+    executor = None
+    if workers > 0:
+        executor = ProcessInferencePool(workers, model_factory=factory)
+        # worker 載入模型的時間不算在吞吐量裡
+        executor.start()
+        deadline = time.perf_counter() + 60.0
+        while not all(w.ready for w in executor.workers) and time.perf_counter() < deadline:
+            executor.collect(0.05)
+    else:
+        tracker.hands = factory(1, False)
+
+    pipeline = FramePipeline(StampedCapture(frames, n_frames, fps), tracker, mirror=False,
+                             executor=executor)
+    t0 = time.perf_counter()
+    pipeline.start()
+
+    out = 0
+    last_seq = -1
+    out_of_order = 0
+    mismatched = 0
+    killed = False
+    while True:
+        packet = pipeline.read()
+        if packet is None:
+            break
+        out += 1
+        if packet.seq <= last_seq:
+            out_of_order += 1
+        last_seq = packet.seq
+        right = packet.hands[1]
+        if right is not None and int(right[0][2]) != packet.seq:
+            mismatched += 1
+        if kill_after and out == kill_after and executor is not None and not killed:
+            os.kill(executor.workers[0].process.pid, signal.SIGKILL)
+            killed = True
+    wall = time.perf_counter() - t0
+    pool = executor.metrics() if executor is not None else None
+    pipeline.stop()
+    if workers == 0:
+        tracker.hands.close()
+
+    summary = pipeline.stats.summary()
+    return {
+        "workers": workers,
+        "wall_s": round(wall, 2),
+        "frames_in": n_frames,
+        "frames_out": out,
+        "fps": round(out / wall, 1),
+        "dropped": summary.get("capture_dropped", {}).get("count", 0),
+        "out_of_order": out_of_order,
+        "mismatched": mismatched,
+        "inference": {k: summary["inference"][k] for k in ("p50_ms", "p95_ms")} if "inference" in summary else None,
+        "worker": {k: summary["worker"][k] for k in ("p50_ms", "p95_ms")} if "worker" in summary else None,
+        "pool": pool,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4, 8])
+    parser.add_argument("--frames", type=int, default=600, help="相機總共出幾張")
+    parser.add_argument("--fps", type=float, default=120.0, help="相機速度（比推論快才量得到吞吐量；0 = 不限速）")
+    parser.add_argument("--model", default="synthetic", choices=["synthetic", "mediapipe"])
+    parser.add_argument("--cost-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--kill-after", type=int, default=0, help="交回幾張之後砍掉 worker 0（0 = 不砍）")
+    parser.add_argument("--out", help="JSON 輸出檔（預設印到 stdout）")
+    args = parser.parse_args()
+
+    if args.model == "synthetic":
+        factory = functools.partial(synthetic_hands, args.cost_ms, args.jitter_ms)
+    else:
+        factory = _build_model
+    frames = synthetic_frames(4, args.width, args.height)
+    runs = []
+    for n in args.workers:
+        # worker 掉了之類的訊息不要混進 JSON
+        with contextlib.redirect_stdout(io.StringIO()):
+            runs.append(run(n, factory, args.frames, frames, args.fps, args.kill_after))
+
+    text = json.dumps({"benchmark": "inference_pool", "model": args.model, "cpus": os.cpu_count(),
+                       "cost_ms": args.cost_ms if args.model == "synthetic" else None,
+                       "frame_size": [args.width, args.height], "runs": runs}, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# benchmarks/bench_keyboard.py
+"""
+Keyboard.check_pressed 的 micro-benchmark：15 / 61 / 88 鍵，
+比較原本的 Python 雙迴圈 (math.dist) 與目前的實作，並確認結果一致。
+
+    python -m benchmarks.bench_keyboard
+"""
+import argparse
+import json
+import math
+import time
+
+import numpy as np
+
+from utils.keyboard import Keyboard
+from utils.layout import KeyboardLayout
+
+LAYOUTS = {
+    15: KeyboardLayout("C3", "C5"),
+    61: KeyboardLayout("C2", "C7", black_keys=True),
+    88: KeyboardLayout("A0", "C8", black_keys=True),
+}
+
+
+class LegacyKeyboard(Keyboard):
+    """原本的 check_pressed（掃過所有鍵），當作比較基準"""
+    def check_pressed(self, finger_positions):
+        newly_pressed = []
+        newly_released = []
+
+        current_pressed = set()
+
+        for fx, fy, _ in finger_positions:
+            for (kx, ky, note) in self.key_centers:
+                # 上排黑鍵的判定距離比較小
+                threshold = self.hit_threshold if ky == self.row_y[0] else self.black_hit_threshold
+                if math.dist((fx, fy), (kx, ky)) < threshold:
+                    current_pressed.add(note)
+
+        for note in self.key_states:
+            if current_pressed.__contains__(note) and not self.key_states[note]:
+                newly_pressed.append(note)
+                self.key_states[note] = True
+
+            elif not current_pressed.__contains__(note) and self.key_states[note]:
+                newly_released.append(note)
+                self.key_states[note] = False
+
+        return newly_pressed, newly_released
+
+
+def finger_stream(n_frames, frame_w, table_y, seed=0):
+    """10 根手指在鍵盤列附近隨機移動"""
+    rng = np.random.default_rng(seed)
+    pos = rng.uniform(0, frame_w, 10)
+    frames = []
+    for _ in range(n_frames):
+        pos = np.clip(pos + rng.normal(0, 15, 10), 0, frame_w)
+        ys = table_y - 60 + rng.normal(0, 40, 10)
+        frames.append([(int(x), int(y), 0.0) for x, y in zip(pos, ys)])
+    return frames
+
+
+def bench(cls, layout, frames, frame_w, table_y, key_width):
+    kb = cls(layout)
+    kb.build_keyboard(frame_w, table_y, frame_w // 2, key_width)
+    events = []
+    t0 = time.perf_counter()
+    for fingers in frames:
+        events.append(kb.check_pressed(fingers))
+    elapsed = time.perf_counter() - t0
+    return elapsed / len(frames), events
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=3000)
+    parser.add_argument("--width", type=int, default=1920)
+    args = parser.parse_args()
+
+    table_y = 500
+    results = {}
+    for n_keys, layout in LAYOUTS.items():
+        key_width = args.width // len(layout.row0)
+        frames = finger_stream(args.frames, args.width, table_y)
+
+        legacy_t, legacy_events = bench(LegacyKeyboard, layout, frames, args.width, table_y, key_width)
+        new_t, new_events = bench(Keyboard, layout, frames, args.width, table_y, key_width)
+
+        results[str(n_keys)] = {
+            "legacy_us": round(legacy_t * 1e6, 2),
+            "current_us": round(new_t * 1e6, 2),
+            "speedup": round(legacy_t / new_t, 2),
+            "identical": legacy_events == new_events,
+        }
+
+    print(json.dumps({"benchmark": "keyboard_check_pressed", "frames": args.frames,
+                      "keys": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
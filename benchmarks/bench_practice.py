@@ -0,0 +1,145 @@
+# benchmarks/bench_practice.py
+"""
+練習引擎（utils.song）跟曲子長度的關係，以及 tempo-following 的效果。
+
+合成 MIDI：兩個聲部（旋律 + 每拍一個三音和弦），--chords 給幾種長度。
+  open      : Song.open 到拿到第一個和弦（lazy）、原本 midi_to_notes 整首攤平、Song 整首走一遍
+              的耗時與記憶體峰值（tracemalloc）
+  update    : 模擬彈奏者每張 frame 呼叫 PracticeEngine.update 的 p50 / p99 / max（應該跟長度無關）
+模擬的彈奏者比樂譜慢 --player-rate 倍、每個和弦有 ±--jitter-ms 的誤差；
+follow=0 是不跟速度（固定照樂譜時間），可以看 tempo-following 把時間誤差降了多少。
+
+    python -m benchmarks.bench_practice --chords 100 1000 10000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import mido
+import numpy as np
+from mido import Message, MetaMessage, MidiFile, MidiTrack, bpm2tempo
+
+from utils.layout import KeyboardLayout, midi_to_note
+from utils.song import PracticeEngine, Song
+
+
+def synthetic_midi(path, n_chords, bpm=120, tpb=480):
+    """旋律（track 1）每拍一個音；伴奏（track 2）每拍一個三音和弦，跟旋律同時開始"""
+    mid = MidiFile(ticks_per_beat=tpb)
+    meta = MidiTrack()
+    meta.append(MetaMessage("set_tempo", tempo=bpm2tempo(bpm), time=0))
+    mid.tracks.append(meta)
+
+    scale = [60, 62, 64, 65, 67, 69, 71, 72]
+    melody = MidiTrack()
+    chords = MidiTrack()
+    for i in range(n_chords):
+        top = scale[i % len(scale)]
+        melody.append(Message("note_on", note=top, velocity=80, time=20 if i else 0, channel=0))
+        melody.append(Message("note_on", note=top, velocity=0, time=tpb - 20, channel=0))
+        root = 48 + (i // 4) % 5
+        for n in (root, root + 4, root + 7):
+            chords.append(Message("note_on", note=n, velocity=60, time=0, channel=1))
+        for j, n in enumerate((root, root + 4, root + 7)):
+            chords.append(Message("note_off", note=n, velocity=0, time=tpb if j == 0 else 0, channel=1))
+    mid.tracks += [melody, chords]
+    mid.save(path)
+    return 60.0 / bpm     # 每個和弦的樂譜間隔（秒）
+
+
+def legacy_midi_to_notes(path, playable):
+    """原本 PracticeUI.midi_to_notes 的寫法：mido 讀整個檔，所有 track 攤平成音名串列"""
+    notes = []
+    for track in mido.MidiFile(path).tracks:
+        for msg in track:
+            if msg.type == "note_on" and msg.velocity > 0:
+                note = midi_to_note(msg.note)
+                if note in playable:
+                    notes.append(note)
+    return notes
+
+
+def traced(fn):
+    """(耗時 ms, 記憶體峰值 KB)"""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    fn()
+    ms = (time.perf_counter() - t0) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return round(ms, 2), round(peak / 1024, 1)
+
+
+def measure_open(path, playable):
+    lazy_ms, lazy_kb = traced(lambda: Song.open(path, playable=playable).peek())
+    legacy_ms, legacy_kb = traced(lambda: legacy_midi_to_notes(path, playable))
+    full_ms, full_kb = traced(lambda: Song.open(path, playable=playable).notes())
+    return {"first_chord_ms": lazy_ms, "first_chord_peak_kb": lazy_kb,
+            "legacy_flatten_ms": legacy_ms, "legacy_flatten_peak_kb": legacy_kb,
+            "song_full_pass_ms": full_ms, "song_full_pass_peak_kb": full_kb}
+
+
+def simulate(path, playable, beat, player_rate, jitter_ms, follow, fps=30.0, seed=0):
+    """
+    彈奏者照自己的速度（樂譜的 1 / player_rate 倍慢）按下每個和弦的音；
+    每張 frame 呼叫一次 update，回傳引擎的統計與每次 update 的耗時。
+    """
+    rng = np.random.default_rng(seed)
+    engine = PracticeEngine(Song.open(path, playable=playable), follow=follow)
+    dt = 1.0 / fps
+    t = 0.0
+    next_press = 0.0
+    times = []
+    while not engine.finished:
+        pressed = []
+        if t >= next_press:
+            pressed = list(engine.pending)
+            next_press += beat / player_rate + rng.uniform(-jitter_ms, jitter_ms) / 1000.0
+        t0 = time.perf_counter()
+        engine.update(pressed, t)
+        times.append(time.perf_counter() - t0)
+        t += dt
+    us = np.asarray(times) * 1e6
+    return engine.metrics(), {"p50_us": round(float(np.percentile(us, 50)), 2),
+                              "p99_us": round(float(np.percentile(us, 99)), 2),
+                              "max_us": round(float(us.max()), 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chords", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--player-rate", type=float, default=0.8, help="彈奏者速度 / 樂譜速度")
+    parser.add_argument("--jitter-ms", type=float, default=40.0)
+    parser.add_argument("--out", help="JSON 輸出檔（預設印到 stdout）")
+    args = parser.parse_args()
+
+    playable = KeyboardLayout("C3", "C5", black_keys=True).note_map
+    runs = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for n in args.chords:
+            path = os.path.join(tmpdir, f"song_{n}.mid")
+            beat = synthetic_midi(path, n)
+            followed, update = simulate(path, playable, beat, args.player_rate, args.jitter_ms, follow=0.3)
+            fixed, _ = simulate(path, playable, beat, args.player_rate, args.jitter_ms, follow=0.0)
+            runs.append({
+                "chords": n,
+                "open": measure_open(path, playable),
+                "update": update,
+                "tempo_following": followed,
+                "fixed_tempo": fixed,
+            })
+
+    text = json.dumps({"benchmark": "practice", "player_rate": args.player_rate,
+                       "jitter_ms": args.jitter_ms, "runs": runs}, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+# benchmarks/bench_render.py
+"""
+UI 繪製時間：每張 frame 從頭畫（原本的寫法）vs 靜態圖層 + 只畫會變的部分。
+順便比對兩種畫法的結果，回報有幾 % 的像素不同（圖層的疊放順序不同，邊緣會有少許差異）。
+
+    python -m benchmarks.bench_render --frames 300
+"""
+import argparse
+import json
+import time
+
+import cv2
+import numpy as np
+
+from utils.download_ui import DownloadUI
+from utils.exit_ui import ExitUI
+from utils.keyboard import Keyboard
+from utils.layout import KeyboardLayout
+from utils.mode_selector import ModeSelector
+from utils.practice_ui import PracticeUI
+from .synthetic import synthetic_frames
+
+
+# ---- 原本的畫法（比較基準） ----
+
+def legacy_keyboard_draw(kb, frame, pressed_notes, next_note=None):
+    pressed_notes = set(pressed_notes)
+    s0, s1 = kb.visible_slots()
+    keys = [(k, kb.key_radius, False) for k in kb.slot_to_key0[s0:s1]]
+    keys += [(k, kb.black_radius, True) for k in kb.slot_to_key1[s0:s1] if k >= 0]
+    for k, radius, black in keys:
+        cx, cy, note = kb.key_centers[k]
+        if next_note == note and note not in pressed_notes:
+            cv2.circle(frame, (cx, cy), radius+4, kb.practice_color, -1)
+            continue
+        if note in pressed_notes:
+            cv2.circle(frame, (cx, cy), radius, (0, 255, 0), -1)
+        else:
+            if black:
+                cv2.circle(frame, (cx, cy), radius, kb.black_color, -1)
+            cv2.circle(frame, (cx, cy), radius, (0, 255, 0), 2)
+        if not black:
+            cv2.putText(frame, note, (cx - 15, cy + 25),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
+
+
+def legacy_mode_draw(ms, frame, hover=None):
+    for name, btn, text in (("record", ms.record_btn, "RECORD"), ("practice", ms.practice_btn, "PRACTICE")):
+        x1, y1, x2, y2 = btn
+        color = (180, 180, 180) if hover == name else (255, 255, 255)
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, -1)
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 0), 2)
+        cv2.putText(frame, text, (x1 + 20, y1 + 40), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 2)
+
+
+def legacy_exit_draw(ui, frame, hover=None):
+    for (x1, y1, x2, y2, mode) in [ui.restart_btn, ui.exit_btn]:
+        color = ui.hover_color if hover == mode else ui.default_color
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 0), 2)
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, -1)
+        text = "Restart" if mode == "restart" else "Exit"
+        cv2.putText(frame, text, (x1 + 25, y1 + 45), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 3)
+
+
+def legacy_download_draw(ui, frame, hover=False):
+    (x1, y1, x2, y2, _) = ui.btn
+    color = ui.hover_color if hover else ui.default_color
+    cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 0), 2)
+    cv2.rectangle(frame, (x1, y1), (x2, y2), color, -1)
+    cv2.putText(frame, "Download MIDI", (x1 + 15, y1 + 50), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 3)
+
+
+def legacy_practice_render(ui, frame, fingertip):
+    h, w, _ = frame.shape
+    overlay = frame.copy()
+    cv2.rectangle(overlay, (0, 0), (w, ui.menu_height), ui.menu_bg, -1)
+    alpha = 0.85
+    frame[:ui.menu_height] = cv2.addWeighted(overlay[:ui.menu_height], alpha,
+                                             frame[:ui.menu_height], 1 - alpha, 0)
+    cv2.putText(frame, "Select MIDI File:", (20, 35), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 0), 2)
+    for idx, file in enumerate(ui.files):
+        y = 70 + idx * ui.item_height
+        if ui.hovered_index == idx:
+            cv2.rectangle(frame, (10, y - 25), (w - 10, y + 5), (180, 200, 255), -1)
+        cv2.putText(frame, f"{idx+1}. {file}", (20, y), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 0), 2)
+    if fingertip:
+        cv2.circle(frame, fingertip, 8, (0, 255, 0), -1)
+    return frame
+
+
+# ---- 場景 ----
+
+def scenes(frame_w, frame_h):
+    """name → (legacy(frame, i), layered(frame, i))；i 是 frame 編號，用來改變按下的鍵 / hover"""
+    out = {}
+
+    for name, layout in (("keyboard_15", KeyboardLayout("C3", "C5")),
+                         ("keyboard_88", KeyboardLayout("A0", "C8", black_keys=True))):
+        kb = Keyboard(layout)
+        kb.build_keyboard(frame_w, int(frame_h * 0.7), frame_w // 2, 60)
+        notes = kb.notes_order
+
+        def pressed(i, notes=notes):
+            return [notes[(i * 3 + j) % len(notes)] for j in range(2)]
+
+        def next_note(i, notes=notes):
+            return notes[(i * 5) % len(notes)]
+
+        out[name] = (lambda f, i, kb=kb, p=pressed, n=next_note: legacy_keyboard_draw(kb, f, p(i), n(i)),
+                     lambda f, i, kb=kb, p=pressed, n=next_note: kb.draw(f, p(i), n(i)))
+
+    ms = ModeSelector()
+    ms.build_buttons(frame_w)
+    hovers = [None, "record", None, "practice"]
+    out["mode_selector"] = (lambda f, i: legacy_mode_draw(ms, f, hovers[i % 4]),
+                            lambda f, i: ms.draw(f, hovers[i % 4]))
+
+    ex = ExitUI()
+    ex.build(frame_w, frame_h)
+    ex.visible = True
+    ex_hovers = [None, "restart", None, "exit"]
+    out["exit_ui"] = (lambda f, i: legacy_exit_draw(ex, f, ex_hovers[i % 4]),
+                      lambda f, i: ex.draw(f, ex_hovers[i % 4]))
+
+    dl = DownloadUI()
+    dl.build(frame_w, frame_h)
+    out["download_ui"] = (lambda f, i: legacy_download_draw(dl, f, i % 4 == 1),
+                          lambda f, i: dl.draw(f, i % 4 == 1))
+
+    pu = PracticeUI()
+    pu.set_files([f"{i}_{name}" for i, name in enumerate(((pu.files or ["demo.mid"]) * 4)[:4])])
+
+    def practice(render, f, i):
+        pu.hovered_index = None if i % 3 == 0 else i % len(pu.files)
+        render(pu, f, (frame_w // 2, 100))
+
+    out["practice_ui"] = (lambda f, i: practice(legacy_practice_render, f, i),
+                          lambda f, i: practice(PracticeUI.render, f, i))
+    return out
+
+
+def run(n_frames=300, frame_w=1280, frame_h=720, seed=0):
+    frames = synthetic_frames(4, frame_w, frame_h, seed)
+    results = {}
+    total = {"legacy": 0.0, "layered": 0.0}
+
+    for name, (legacy, layered) in scenes(frame_w, frame_h).items():
+        times = {}
+        for label, draw in (("legacy", legacy), ("layered", layered)):
+            buf = np.empty_like(frames[0])
+            samples = []
+            for i in range(n_frames):
+                np.copyto(buf, frames[i % len(frames)])
+                t0 = time.perf_counter()
+                draw(buf, i)
+                samples.append(time.perf_counter() - t0)
+            times[label] = float(np.median(samples))
+            total[label] += times[label]
+
+        # 同一張 frame 兩種畫法的差異
+        diff = 0.0
+        for i in range(4):
+            a = frames[0].copy()
+            b = frames[0].copy()
+            legacy(a, i)
+            layered(b, i)
+            diff = max(diff, float(np.any(a != b, axis=2).mean()))
+
+        results[name] = {
+            "legacy_us": round(times["legacy"] * 1e6, 1),
+            "layered_us": round(times["layered"] * 1e6, 1),
+            "speedup": round(times["legacy"] / times["layered"], 2),
+            "diff_pixels_pct": round(diff * 100, 3),
+        }
+
+    results["total"] = {
+        "legacy_us": round(total["legacy"] * 1e6, 1),
+        "layered_us": round(total["layered"] * 1e6, 1),
+        "speedup": round(total["legacy"] / total["layered"], 2),
+    }
+    return {"benchmark": "render", "frames": n_frames, "frame_size": [frame_w, frame_h],
+            "opencv": cv2.__version__, "scenes": results}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="JSON 輸出檔（預設印到 stdout）")
+    args = parser.parse_args()
+
+    text = json.dumps(run(args.frames, args.width, args.height, args.seed), indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
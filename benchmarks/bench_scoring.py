@@ -0,0 +1,136 @@
+# benchmarks/bench_scoring.py
+"""
+練習評分（utils.scoring.Scorer）：判定對不對、每張 frame 要多久、跟曲子長度的關係。
+
+參考曲子是 bench_practice 的合成 MIDI（旋律 + 三音和弦，每拍一個和弦），--chords 給幾種長度。
+模擬的彈奏者：
+  速度從樂譜的 --rate-start 倍慢慢變成 --rate-end 倍（tempo drift）
+  每個音有 ±--jitter-ms 的誤差，按 --fps 對齊到 frame
+  每個音有 --miss 的機率沒彈（miss），每個和弦有 --wrong 的機率多按一個不在和弦裡的音，
+  有 --pause 的機率在和弦前停 0.5–2 秒
+因為知道正確答案，所以可以比較 scorer 的 hit / wrong / miss 跟實際的差多少（label_agreement 是
+每個彈的音判定一致的比例），以及估出來的 drift 跟實際的 drift。
+
+    python -m benchmarks.bench_scoring --chords 100 1000 10000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from utils.layout import KeyboardLayout
+from utils.song import Song
+from utils.scoring import Scorer
+from .bench_practice import synthetic_midi
+
+
+def simulate_player(song, beat, rate_start, rate_end, jitter_ms, miss, wrong, pause, fps, seed=0):
+    """回傳 [(frame 時間, {音名: 正確答案 "hit" / "wrong"})]、實際 miss 數"""
+    rng = np.random.default_rng(seed)
+    chords = []
+    chord = song.peek()
+    while chord is not None:
+        chords.append(chord)
+        chord = song.advance()
+
+    presses = []            # (時間, 音名, 答案)
+    missed = 0
+    t = 1.0
+    all_notes = sorted({n for c in chords for n in c.notes})
+    for i, chord in enumerate(chords):
+        rate = rate_start + (rate_end - rate_start) * i / max(len(chords) - 1, 1)
+        if i:
+            t += (chord.onset - chords[i - 1].onset) / rate
+            if rng.random() < pause:
+                # 停下來想一下
+                t += rng.uniform(0.5, 2.0)
+        for note in sorted(chord.notes):
+            if rng.random() < miss:
+                missed += 1
+                continue
+            presses.append((t + rng.uniform(-jitter_ms, jitter_ms) / 1000.0, note, "hit"))
+        if rng.random() < wrong:
+            choices = [n for n in all_notes if n not in chord.notes]
+            presses.append((t + rng.uniform(0, beat / rate / 3), choices[rng.integers(len(choices))], "wrong"))
+
+    # 對齊到 frame；同一張 frame 同一個音只會出現一次
+    frames = {}
+    for when, note, truth in presses:
+        k = int(np.ceil(when * fps))
+        frames.setdefault(k, {})
+        if note in frames[k]:
+            continue
+        frames[k][note] = truth
+    return [(k / fps, frames[k]) for k in sorted(frames)], missed
+
+
+def run(path, playable, beat, args):
+    truth_frames, true_missed = simulate_player(Song.open(path, playable=playable), beat,
+                                                args.rate_start, args.rate_end, args.jitter_ms,
+                                                args.miss, args.wrong, args.pause, args.fps)
+    scorer = Scorer(Song.open(path, playable=playable))
+    times = []
+    agree = 0
+    total = 0
+    true_hits = true_wrong = 0
+    for t, notes in truth_frames:
+        t0 = time.perf_counter()
+        judged = scorer.update(notes, t)
+        times.append(time.perf_counter() - t0)
+        for note, _, kind, _ in judged:
+            total += 1
+            agree += kind == notes[note]
+        true_hits += sum(1 for v in notes.values() if v == "hit")
+        true_wrong += sum(1 for v in notes.values() if v == "wrong")
+    scorer.finish()
+
+    us = np.asarray(times) * 1e6
+    true_drift = (args.rate_end / args.rate_start - 1.0) * 100
+    return {
+        "truth": {"hits": true_hits, "wrong_notes": true_wrong, "missed": true_missed,
+                  "tempo_drift_pct": round(true_drift, 1)},
+        "scorer": scorer.metrics(),
+        "label_agreement": round(agree / total, 4) if total else None,
+        "update": {"frames": len(times),
+                   "p50_us": round(float(np.percentile(us, 50)), 1),
+                   "p99_us": round(float(np.percentile(us, 99)), 1),
+                   "max_us": round(float(us.max()), 1)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chords", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--rate-start", type=float, default=0.8, help="一開始的彈奏速度 / 樂譜速度")
+    parser.add_argument("--rate-end", type=float, default=1.0)
+    parser.add_argument("--jitter-ms", type=float, default=30.0)
+    parser.add_argument("--miss", type=float, default=0.05, help="每個音沒彈的機率")
+    parser.add_argument("--wrong", type=float, default=0.05, help="每個和弦多按一個錯音的機率")
+    parser.add_argument("--pause", type=float, default=0.02, help="每個和弦前停頓 0.5–2 秒的機率")
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--out", help="JSON 輸出檔（預設印到 stdout）")
+    args = parser.parse_args()
+
+    playable = KeyboardLayout("C3", "C5", black_keys=True).note_map
+    runs = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for n in args.chords:
+            path = os.path.join(tmpdir, f"song_{n}.mid")
+            beat = synthetic_midi(path, n)
+            runs.append(dict(chords=n, **run(path, playable, beat, args)))
+
+    text = json.dumps({"benchmark": "scoring", "rate": [args.rate_start, args.rate_end],
+                       "jitter_ms": args.jitter_ms, "miss": args.miss, "wrong": args.wrong, "pause": args.pause,
+                       "fps": args.fps, "runs": runs}, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
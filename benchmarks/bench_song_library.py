@@ -0,0 +1,123 @@
+# benchmarks/bench_song_library.py
+"""
+曲庫快取（utils.song_library）：選曲畫面打開要多久、選好之後多久能開始練。
+
+暫存資料夾裡產生 --songs 首合成 MIDI（每首 --chords 個和弦，旋律 + 三音和弦），
+  index      : 沒有快取（cold，全部解析）/ 快取都在（warm）/ 全部被 touch 過（只重算 sha1）時建 index 的時間
+  picker     : PracticeUI 建好 + 第一張畫面的時間（沒有快取時清單先出來，metadata 之後才補上）
+  load       : 選好一首到拿到整首的和弦：原本的 mido 攤平、Song.open、SongLibrary.load（從 npz）
+也會檢查快取建出來的曲子跟直接解碼的完全一樣（same_song）。
+
+    python -m benchmarks.bench_song_library --songs 10 100 300 --chords 500
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from utils.layout import KeyboardLayout
+from utils.practice_ui import PracticeUI
+from utils.song import Song
+from utils.song_library import SongLibrary
+from .bench_practice import legacy_midi_to_notes, synthetic_midi
+
+
+def timed(fn, repeat=1):
+    """最好的一次（ms）與回傳值"""
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        ms = (time.perf_counter() - t0) * 1000
+        best = ms if best is None else min(best, ms)
+    return round(best, 2), out
+
+
+def build(audio_dir, cache_dir):
+    library = SongLibrary(audio_dir, cache_dir)
+    library.build()
+    return library
+
+
+def picker(audio_dir, cache_dir, frame):
+    ui = PracticeUI(audio_dir, library=SongLibrary(audio_dir, cache_dir))
+    ui.render(frame, None)
+    return ui
+
+
+def chords(song):
+    """整首走一遍；duration 要整首讀完才確定（Song.open 讀到 note off 才補上）"""
+    out = []
+    chord = song.peek()
+    while chord is not None:
+        out.append(chord)
+        chord = song.advance()
+    return [(round(c.onset, 6), c.notes, tuple((e.midi, e.velocity, e.voice, round(e.duration, 6))
+                                               for e in c.events)) for c in out]
+
+
+def run(n_songs, n_chords, playable, frame):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        audio_dir = os.path.join(tmpdir, "audio")
+        cache_dir = os.path.join(tmpdir, "cache")
+        os.makedirs(audio_dir)
+        for i in range(n_songs):
+            # 每首長度不同，內容才不會一樣（一樣的內容快取只會存一份）
+            synthetic_midi(os.path.join(audio_dir, f"song_{i:04d}.mid"), n_chords + i)
+
+        result = {"songs": n_songs, "chords_per_song": n_chords}
+        cold_picker_ms, _ = timed(lambda: picker(audio_dir, cache_dir, frame.copy()))
+
+        cold_ms, library = timed(lambda: build(audio_dir, cache_dir))
+        warm_ms, warm = timed(lambda: build(audio_dir, cache_dir), 3)
+        warm_picker_ms, ui = timed(lambda: picker(audio_dir, cache_dir, frame.copy()), 3)
+        for name in os.listdir(audio_dir):
+            os.utime(os.path.join(audio_dir, name))
+        touched_ms, touched = timed(lambda: build(audio_dir, cache_dir))
+        result["index"] = {"cold_ms": cold_ms, "warm_ms": warm_ms, "touched_ms": touched_ms,
+                           "cold": library.metrics(), "warm": warm.metrics(), "touched": touched.metrics(),
+                           "cache_kb": round(sum(os.path.getsize(os.path.join(cache_dir, f))
+                                                 for f in os.listdir(cache_dir)) / 1024, 1)}
+        result["picker"] = {"no_cache_ms": cold_picker_ms,
+                            "cached_ms": warm_picker_ms,
+                            "metadata_shown": sum(1 for _, meta in ui.library.entries() if meta is not None)}
+
+        path = os.path.join(audio_dir, "song_0000.mid")
+        legacy_ms, _ = timed(lambda: legacy_midi_to_notes(path, playable), 3)
+        open_ms, direct = timed(lambda: chords(Song.open(path, playable=playable)), 3)
+        cached_ms, cached = timed(lambda: chords(touched.load(path, playable=playable)), 3)
+        result["load"] = {"legacy_flatten_ms": legacy_ms, "song_open_ms": open_ms, "cached_ms": cached_ms,
+                          "same_song": direct == cached, "cache_loads": touched.cache_loads}
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--songs", type=int, nargs="+", default=[10, 100, 300])
+    parser.add_argument("--chords", type=int, default=500, help="每首大約幾個和弦")
+    parser.add_argument("--out", help="JSON 輸出檔（預設印到 stdout）")
+    args = parser.parse_args()
+
+    playable = KeyboardLayout("C3", "C5", black_keys=True).note_map
+    frame = np.zeros((720, 1280, 3), np.uint8)
+    runs = []
+    for n in args.songs:
+        # 解析失敗之類的訊息不要混進 JSON
+        with contextlib.redirect_stdout(io.StringIO()):
+            runs.append(run(n, args.chords, playable, frame))
+
+    text = json.dumps({"benchmark": "song_library", "runs": runs}, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# benchmarks/bench_song_picker.py
+"""
+選曲畫面（PracticeUI）每張 frame 的成本跟曲庫大小的關係：5 首和 5000 首應該一樣。
+
+暫存資料夾裡放 --songs 首曲子（同一首 MIDI 複製成不同檔名，快取只解析一次），
+指尖照固定的路徑移動：停在清單上、拉捲軸、按 Down 翻頁、停在字母上篩選，時間用 FakeClock。
+  legacy : 原本的寫法，每張 frame 畫出所有列、update 逐列比對（列會畫到選單外面）
+  virtual: 只畫看得到的列、hover 直接從 y 算
+
+    python -m benchmarks.bench_song_picker --songs 5 50 500 5000
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import string
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from utils import clock
+from utils.practice_ui import PracticeUI
+from utils.song_library import SongLibrary
+from utils.states import FakeClock
+from .bench_practice import synthetic_midi
+
+
+def legacy_render(ui, frame, fingertip):
+    """原本的 render：半透明底 + 標題 + 每一首都畫"""
+    h, w, _ = frame.shape
+    overlay = frame.copy()
+    cv2.rectangle(overlay, (0, 0), (w, ui.menu_height), ui.menu_bg, -1)
+    frame[:ui.menu_height] = cv2.addWeighted(overlay[:ui.menu_height], 0.85, frame[:ui.menu_height], 0.15, 0)
+    cv2.putText(frame, "Select MIDI File:", (20, 35), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 0), 2)
+    for idx, file in enumerate(ui.files):
+        y = 70 + idx * ui.item_height
+        if ui.hovered_index == idx:
+            cv2.rectangle(frame, (10, y - 25), (w - 10, y + 5), (180, 200, 255), -1)
+        cv2.putText(frame, f"{idx+1}. {file}", (20, y), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 0), 2)
+    if fingertip:
+        cv2.circle(frame, fingertip, 8, (0, 255, 0), -1)
+
+
+def legacy_update(ui, fingertip):
+    """原本的 update：逐列比對 y"""
+    if fingertip is None or fingertip[1] > ui.menu_height:
+        ui.hovered_index = None
+        return None
+    fy = fingertip[1]
+    for idx in range(len(ui.files)):
+        y_top = 70 + idx * ui.item_height - 25
+        if y_top <= fy <= y_top + ui.item_height:
+            ui.hovered_index = idx
+            return None
+    ui.hovered_index = None
+    return None
+
+
+def fingertip_path(ui, w, fps):
+    """每段停多久、指尖在哪：清單 → 捲軸由上往下 → Down 翻頁 → 字母 M → 清單"""
+    rows_y = ui.title_height + ui.item_height // 2
+    track_top = ui.title_height
+    track_h = ui.rows * ui.item_height
+    x_down = sum(ui._page_button(1, w)) // 2
+    x_m = sum(ui._letter_cell(ui.letters.index("M"), w)) // 2
+    path = [(w // 3, rows_y + (i // 10 % ui.rows) * ui.item_height) for i in range(int(fps))]
+    path += [(w - ui.scroll_width // 2, track_top + int(track_h * i / fps)) for i in range(int(fps))]
+    path += [(x_down, 25)] * int(2 * fps)
+    path += [(x_m, ui.menu_height - 20)] * int(1.5 * fps)
+    path += [(w // 3, rows_y)] * int(fps // 2)
+    return path
+
+
+def make_library(tmpdir, n):
+    audio_dir = os.path.join(tmpdir, "audio")
+    os.makedirs(audio_dir)
+    source = os.path.join(tmpdir, "source.mid")
+    synthetic_midi(source, 64)
+    letters = string.ascii_lowercase
+    for i in range(n):
+        # 檔名分散在各個字母開頭
+        shutil.copyfile(source, os.path.join(audio_dir, f"{letters[i % 26]}{letters[i // 26 % 26]}_song_{i:05d}.mid"))
+    library = SongLibrary(audio_dir, os.path.join(tmpdir, "cache"))
+    library.build()
+    return audio_dir, library
+
+
+def measure(step, path, frame, background, fake, fps):
+    times = []
+    for i, tip in enumerate(path):
+        np.copyto(frame, background)
+        t0 = time.perf_counter()
+        step(frame, tip)
+        times.append(time.perf_counter() - t0)
+        fake.advance(1.0 / fps)
+    ms = np.asarray(times) * 1000.0
+    return {"p50_ms": round(float(np.percentile(ms, 50)), 3),
+            "p95_ms": round(float(np.percentile(ms, 95)), 3),
+            "max_ms": round(float(ms.max()), 3)}
+
+
+def run(n, fps, frame):
+    background = frame.copy()
+    fake = FakeClock()
+    with tempfile.TemporaryDirectory() as tmpdir, clock.using(fake):
+        audio_dir, library = make_library(tmpdir, n)
+        w = frame.shape[1]
+
+        legacy = PracticeUI(audio_dir, library=library)
+        path = fingertip_path(legacy, w, fps)
+
+        def legacy_step(f, tip):
+            legacy_render(legacy, f, tip)
+            legacy_update(legacy, tip)
+
+        ui = PracticeUI(audio_dir, library=library)
+        ui.render(frame, None)      # 第一張（畫靜態圖層）不算
+
+        def virtual_step(f, tip):
+            ui.render(f, tip)
+            ui.update(tip)
+
+        result = {"songs": n,
+                  "legacy": measure(legacy_step, path, frame, background, fake, fps),
+                  "virtual": measure(virtual_step, path, frame, background, fake, fps)}
+        result["virtual"].update({"static_builds": ui.layers.builds,
+                                  "final_filter": ui.prefix, "filtered": ui.count,
+                                  "top": ui.top})
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--songs", type=int, nargs="+", default=[5, 50, 500, 5000])
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--out", help="JSON 輸出檔（預設印到 stdout）")
+    args = parser.parse_args()
+
+    frame = np.random.default_rng(0).integers(0, 255, (args.height, args.width, 3), dtype=np.uint8)
+    runs = []
+    for n in args.songs:
+        with contextlib.redirect_stdout(io.StringIO()):
+            runs.append(run(n, args.fps, frame))
+
+    text = json.dumps({"benchmark": "song_picker", "fps": args.fps,
+                       "frame_size": [args.width, args.height], "runs": runs}, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
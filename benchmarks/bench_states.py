@@ -0,0 +1,160 @@
+# benchmarks/bench_states.py
+"""
+AirPiano 每個狀態（utils.states）單獨量：一張 frame 在這個狀態下的 step() 要多久。
+
+packet 是直接造出來的（空白畫面 + 合成的敲擊串流），時間用 FakeClock 每張前進 1/fps，
+不需要相機、MediaPipe，也不經過 FramePipeline；每個狀態先 goto() 進去再連續餵 --frames 張。
+會離開的狀態（calibrate_width、mode_select 選到模式…）每張都重新 goto()。
+
+message 另外檢查「訊息畫面不會卡住」：顯示 1 秒的訊息期間每張 frame 都有被處理，
+時間到之後由 timer 切到下一個狀態。
+
+    python -m benchmarks.bench_states --frames 300
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from air_piano import AirPiano
+from utils import clock
+from utils.layout import KeyboardLayout
+from utils.pipeline import FramePacket
+from utils.replay import open_replay_source, save_landmark_stream
+from utils.states import FakeClock
+from .synthetic import synthetic_press_stream
+
+
+def make_packets(records, frame):
+    """records → 每張 frame 的 FramePacket（同 HandTracker.detect 的回傳格式）"""
+    packets = []
+    for i, (t, left, right) in enumerate(records):
+        packet = FramePacket(i, frame, time.perf_counter(), t)
+        handed = [label for label, hand in (("Left", left), ("Right", right)) if hand is not None]
+        packet.hands = (left, right,
+                        left[8][2] if left is not None else None,
+                        right[8][2] if right is not None else None,
+                        handed)
+        packets.append(packet)
+    return packets
+
+
+def build_app(tmpdir, taps, fps, layout):
+    records, _ = synthetic_press_stream(taps, fps=fps)
+    path = os.path.join(tmpdir, "states.npz")
+    save_landmark_stream(path, records, (1280, 720))
+    app = AirPiano(source=open_replay_source(path), threaded=False, headless=True,
+                   audio_backend="null", layout=layout, analytics=None)
+    return app, records
+
+
+def measure(app, fake, packets, frame, background, state, n, fps, reenter=False, **kwargs):
+    times = []
+    app.machine.goto(state, **kwargs)
+    for i in range(n):
+        if reenter and app.machine.name != state:
+            app.machine.goto(state, **kwargs)
+        np.copyto(frame, background)
+        packet = packets[i % len(packets)]
+        t0 = time.perf_counter()
+        app.machine.step(packet)
+        times.append(time.perf_counter() - t0)
+        fake.advance(1.0 / fps)
+    ms = np.asarray(times) * 1000.0
+    return {"frames": n,
+            "p50_ms": round(float(np.percentile(ms, 50)), 3),
+            "p95_ms": round(float(np.percentile(ms, 95)), 3),
+            "max_ms": round(float(ms.max()), 3)}
+
+
+def message_check(app, fake, packets, fps, seconds=1.0):
+    """訊息顯示期間每張 frame 都會進 step()、畫訊息；時間到由 timer 切到 then"""
+    app.exit_ui.visible = False
+    app.machine.message("RECORD MODE", seconds, "playing")
+    shown = 0
+    for i in range(int(10 * seconds * fps)):
+        app.machine.step(packets[i % len(packets)])
+        fake.advance(1.0 / fps)
+        if app.machine.name != "message":
+            break
+        shown += 1
+    return {"message_s": seconds, "frames_during_message": shown,
+            # 浮點誤差可能多一張
+            "all_frames_shown": abs(shown - seconds * fps) <= 1, "next_state": app.machine.name}
+
+
+def run(n_frames, fps, taps):
+    layout = KeyboardLayout.parse("C3-C5")
+    fake = FakeClock()
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir, clock.using(fake):
+        app, records = build_app(tmpdir, taps, fps, layout)
+        frame = np.zeros((app.frame_h, app.frame_w, 3), np.uint8)
+        background = frame.copy()
+        packets = make_packets(records, frame)
+        calib = packets[:int(2 * fps)]
+        taps_only = packets[int(2 * fps):]
+        # Exit 選單的 Download 會把 MIDI 存到 ./records：量測期間在暫存目錄裡跑
+        cwd = os.getcwd()
+        os.chdir(tmpdir)
+
+        results["calibrate_table"] = measure(app, fake, calib, frame, background,
+                                             "calibrate_table", n_frames, fps)
+        # 校正到鍵盤建好為止
+        for packet in calib:
+            if app.keyboard_ready:
+                break
+            app.machine.step(packet)
+            fake.advance(1.0 / fps)
+
+        results["calibrate_width"] = measure(app, fake, calib, frame, background,
+                                             "calibrate_width", n_frames, fps, reenter=True)
+        results["mode_select"] = measure(app, fake, taps_only, frame, background,
+                                         "mode_select", n_frames, fps, reenter=True)
+        results["song_picker"] = measure(app, fake, taps_only, frame, background,
+                                         "song_picker", n_frames, fps, reenter=True)
+
+        app.mode = "record"
+        app.midi_recorder.start(0.0)
+        results["playing"] = measure(app, fake, taps_only, frame, background, "playing", n_frames, fps,
+                                     reenter=True)
+        results["exit_menu"] = measure(app, fake, taps_only, frame, background, "exit_menu", n_frames, fps,
+                                       reenter=True)
+        results["message"] = measure(app, fake, taps_only, frame, background, "message", n_frames, fps,
+                                     reenter=True, text="RECORD MODE", seconds=1e9, then="playing")
+        results["message"].update(message_check(app, fake, taps_only, fps))
+        results["completed"] = measure(app, fake, taps_only, frame, background, "completed", n_frames, fps,
+                                       reenter=True)
+        app.midi_recorder.stop()
+        app.close()
+        os.chdir(cwd)
+
+    return {"benchmark": "states", "fps": fps, "frame_size": [1280, 720], "states": results}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=300, help="每個狀態餵幾張")
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--taps", type=int, default=30)
+    parser.add_argument("--out", help="JSON 輸出檔（預設印到 stdout）")
+    args = parser.parse_args()
+
+    # AirPiano 的訊息不要混進 JSON
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = run(args.frames, args.fps, args.taps)
+    text = json.dumps(result, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
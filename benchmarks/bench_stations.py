@@ -0,0 +1,127 @@
+# benchmarks/bench_stations.py
+"""
+一個 process 跑 N 台琴（utils.station_server）時，每台還能不能維持相機的 frame rate。
+
+每台琴的來源都是依 fps 重播的檔案（PacedSource，跟真的相機一樣），輪流使用給定的檔案：
+  影片（.mp4 …）     走完整的 MediaPipe 推論（需要 MediaPipe）
+  landmark（.lmk/.npz）跳過推論，量的是 capture / UI / 聲音 / 排程的成本
+沒給檔案時用合成的敲擊串流（每台不同 seed），直接進入錄音模式。
+
+    python -m benchmarks.bench_stations --stations 1 2 4 8 --workers 2
+    python -m benchmarks.bench_stations a.mp4 b.mp4 --stations 1 2 4
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from air_piano import AirPiano
+from utils.layout import KeyboardLayout
+from utils.replay import PacedSource, open_replay_source, save_landmark_stream
+from utils.station_server import StationServer
+from .synthetic import synthetic_press_stream
+
+
+def synthetic_sources(n, tmpdir, taps, fps):
+    paths = []
+    for i in range(n):
+        records, _ = synthetic_press_stream(taps, fps=fps, seed=i)
+        path = os.path.join(tmpdir, f"station_{i}.npz")
+        save_landmark_stream(path, records, (1280, 720))
+        paths.append(path)
+    return paths
+
+
+def merge(summaries, stage):
+    """把各 station 同一個階段的樣本合在一起算 p50 / p95"""
+    values = []
+    for stats in summaries:
+        with stats.lock:
+            values.extend(stats.samples.get(stage, ()))
+    if not values:
+        return None
+    ms = np.asarray(values) * 1000.0
+    return {"p50_ms": round(float(np.percentile(ms, 50)), 3),
+            "p95_ms": round(float(np.percentile(ms, 95)), 3)}
+
+
+def run_stations(paths, n, workers, speed, preset_mode, layout):
+    server = StationServer(workers=workers, headless=True, audio_backend="null", analytics=None)
+    apps = []
+    frames_in = 0
+    for i in range(n):
+        source = open_replay_source(paths[i % len(paths)])
+        frames_in += len(source) if hasattr(source, "__len__") else int(source.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = (source.get(cv2.CAP_PROP_FPS) or 30.0) * speed
+        app = AirPiano(source=PacedSource(source, fps), headless=True, layout=layout,
+                       station=server.station())
+        if preset_mode:
+            # 合成串流不會去點模式按鈕：校正完直接進錄音模式
+            app.mode = "record"
+        apps.append(server.add(app))
+
+    t0 = time.perf_counter()
+    server.run()
+    wall = time.perf_counter() - t0
+
+    stats = [app.latency for app in apps]
+    counts = [s.summary() for s in stats]
+    rendered = sum(c.get("step", {}).get("count", 0) for c in counts)
+    dropped = sum(c.get("capture_dropped", {}).get("count", 0) +
+                  c.get("result_dropped", {}).get("count", 0) for c in counts)
+    presses = sum(app.press_detector.metrics()["presses"] for app in apps if app.press_detector)
+
+    return {
+        "stations": n,
+        "wall_s": round(wall, 2),
+        "frames_in": frames_in,
+        "frames_rendered": rendered,
+        "rendered_ratio": round(rendered / frames_in, 3) if frames_in else None,
+        "fps_per_station": round(rendered / n / wall, 1),
+        "dropped": dropped,
+        "presses": presses,
+        "peak_voices": server.shared.engine.mixer.peak_voices,
+        "step": merge(stats, "step"),
+        "capture_to_step": merge(stats, "capture_to_step"),
+        "inference": merge(stats, "inference"),
+        "pool": server.shared.pool.metrics(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("sources", nargs="*", help="影片或 landmark 串流，依序分給各 station")
+    parser.add_argument("--stations", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--speed", type=float, default=1.0, help="重播速度（> 1 時比相機快）")
+    parser.add_argument("--taps", type=int, default=30, help="合成串流的敲擊次數")
+    parser.add_argument("--out", help="JSON 輸出檔（預設印到 stdout）")
+    args = parser.parse_args()
+
+    layout = KeyboardLayout.parse("C3-C5")
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        paths = args.sources or synthetic_sources(max(args.stations), tmpdir, args.taps, 30.0)
+        for n in args.stations:
+            # AirPiano / server 的訊息不要混進 JSON
+            with contextlib.redirect_stdout(io.StringIO()):
+                results.append(run_stations(paths, n, args.workers, args.speed,
+                                            not args.sources, layout))
+
+    text = json.dumps({"benchmark": "stations", "workers": args.workers, "speed": args.speed,
+                       "sources": args.sources or "synthetic", "runs": results}, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
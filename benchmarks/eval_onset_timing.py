@@ -0,0 +1,184 @@
+# benchmarks/eval_onset_timing.py
+"""
+離線評估指尖濾波 / 預測對「按下時間點」的影響。
+
+錄好的 landmark 串流當作真實軌跡，無延遲、無雜訊時 Keyboard 判定到的 onset 是標準答案
+（合成串流用沒有抖動的版本，抖動只由 --noise-px 加進去，標準答案裡不會有抖動造成的 onset）。
+其他做法都假設每張 frame 要晚 latency 才被處理（capture + inference），並可加上像素雜訊：
+
+  raw       直接 hit-test（預設、沒有 --filter 時的行為）
+  filtered  One-Euro 濾波後 hit-test（--filter）
+  predicted One-Euro 濾波並往前預測 latency（--predict；lead 跟 AirPiano.play 一樣是拍到現在的時間）
+
+每個 onset 與同一個鍵最近的標準答案配對，輸出時間誤差、漏掉與多出來的 onset（JSON）。
+
+    python -m benchmarks.eval_onset_timing session.lmk --latency-ms 60 --noise-px 0 2
+    python -m benchmarks.eval_onset_timing            # 沒給檔案就用合成串流
+"""
+import argparse
+import json
+
+import numpy as np
+
+from utils.filters import FingertipFilter
+from utils.hand_processing import extract_finger_pixels, finger_slots
+from utils.keyboard import Keyboard
+from utils.layout import KeyboardLayout
+from utils.replay import open_replay_source
+from .synthetic import synthetic_landmark_stream
+
+
+def load_stream(path):
+    """→ ([(t, left, right), ...], (frame_w, frame_h))"""
+    src = open_replay_source(path)
+    records = []
+    for i in range(len(src)):
+        src.seek(i)
+        src.read()
+        left, right, _, _, _ = src.detect(None)
+        records.append((src.now(), left, right))
+    return records, (src.frame_w, src.frame_h)
+
+
+def build_keyboard(records, layout, frame_w, frame_h):
+    """與 AirPiano 的校正相同：第一隻出現的手決定桌面高度、中心與鍵寬"""
+    for _, left, right in records:
+        hand = right if right is not None else left
+        if hand is not None:
+            break
+    else:
+        raise ValueError("No hands in stream")
+
+    keyboard = Keyboard(layout)
+    table_y = int(hand[8][1] * frame_h)
+    key_width = max(int(abs(hand[4][0] - hand[20][0]) * frame_w / 5), 1)
+    keyboard.build_keyboard(frame_w, table_y, int(hand[8][0] * frame_w), key_width)
+    return keyboard
+
+
+def onsets(records, keyboard, frame_w, frame_h, latency=0.0, noise_px=0.0,
+           fingertip_filter=None, seed=0):
+    """回傳 [(聲音送出的時間, note), ...]"""
+    rng = np.random.default_rng(seed)
+    keyboard.key_states = {n: False for n in keyboard.notes_order}
+    keyboard.pressed_keys = set()
+
+    events = []
+    for t, left, right in records:
+        fingers = extract_finger_pixels(left, right, frame_w, frame_h)
+        if noise_px and fingers:
+            noise = rng.normal(0, noise_px, (len(fingers), 2))
+            fingers = [(int(round(x + dx)), int(round(y + dy)), z)
+                       for (x, y, z), (dx, dy) in zip(fingers, noise)]
+        if fingertip_filter is not None:
+            fingers = fingertip_filter.apply(fingers, finger_slots(left, right), t, latency)
+
+        newly_pressed, _ = keyboard.check_pressed(fingers)
+        events.extend((t + latency, note) for note in newly_pressed)
+    return events
+
+
+def match(reference, events, window=0.2):
+    """同一個鍵、時間最近、window 秒內的 onset 一對一配對"""
+    by_note = {}
+    for t, note in events:
+        by_note.setdefault(note, []).append(t)
+    used = {note: [False] * len(ts) for note, ts in by_note.items()}
+
+    errors = []
+    missed = 0
+    for t_ref, note in reference:
+        best = None
+        for j, t in enumerate(by_note.get(note, [])):
+            if used[note][j] or abs(t - t_ref) > window:
+                continue
+            if best is None or abs(t - t_ref) < abs(by_note[note][best] - t_ref):
+                best = j
+        if best is None:
+            missed += 1
+            continue
+        used[note][best] = True
+        errors.append(by_note[note][best] - t_ref)
+
+    errors = np.array(errors) * 1000
+    result = {
+        "onsets": len(events),
+        "matched": len(errors),
+        "missed": missed,
+        "extra": len(events) - len(errors),
+    }
+    if len(errors):
+        abs_err = np.abs(errors)
+        result.update({
+            "mean_error_ms": round(float(errors.mean()), 2),
+            "mean_abs_ms": round(float(abs_err.mean()), 2),
+            "p50_abs_ms": round(float(np.percentile(abs_err, 50)), 2),
+            "p95_abs_ms": round(float(np.percentile(abs_err, 95)), 2),
+        })
+    return result
+
+
+def evaluate(records, frame_size, layout, latency, noise_levels, min_cutoff, beta, d_cutoff, min_speed,
+             seed=0):
+    frame_w, frame_h = frame_size
+    keyboard = build_keyboard(records, layout, frame_w, frame_h)
+
+    reference = onsets(records, keyboard, frame_w, frame_h)
+    results = {"reference_onsets": len(reference)}
+    for noise_px in noise_levels:
+        variants = {
+            "raw": None,
+            "filtered": FingertipFilter(min_cutoff, beta, d_cutoff, min_speed=min_speed),
+            "predicted": FingertipFilter(min_cutoff, beta, d_cutoff, predict=True, min_speed=min_speed),
+        }
+        results[f"noise_{noise_px:g}px"] = {
+            name: match(reference, onsets(records, keyboard, frame_w, frame_h, latency, noise_px, filt, seed))
+            for name, filt in variants.items()
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("streams", nargs="*", help=".lmk / .npz landmark 串流")
+    parser.add_argument("--latency-ms", type=float, default=60.0, help="capture + inference 延遲")
+    parser.add_argument("--noise-px", type=float, nargs="+", default=[0.0, 2.0],
+                        help="指尖位置加上的高斯雜訊（每個值各跑一次）")
+    parser.add_argument("--min-cutoff", type=float, default=5.0)
+    parser.add_argument("--beta", type=float, default=0.1)
+    parser.add_argument("--d-cutoff", type=float, default=20.0)
+    parser.add_argument("--min-speed", type=float, default=50.0, help="低於這個速度（像素 / 秒）不預測")
+    parser.add_argument("--range", default="C3-C5")
+    parser.add_argument("--black-keys", action="store_true")
+    parser.add_argument("--frames", type=int, default=900, help="合成串流的長度")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="JSON 輸出檔（預設印到 stdout）")
+    args = parser.parse_args()
+
+    layout = KeyboardLayout.parse(args.range, black_keys=args.black_keys)
+    streams = {}
+    if args.streams:
+        for path in args.streams:
+            streams[path] = load_stream(path)
+    else:
+        streams["synthetic"] = (synthetic_landmark_stream(args.frames, seed=args.seed, jitter=0.0), (1280, 720))
+
+    results = {}
+    for name, (records, frame_size) in streams.items():
+        results[name] = evaluate(records, frame_size, layout, args.latency_ms / 1000,
+                                 args.noise_px, args.min_cutoff, args.beta, args.d_cutoff, args.min_speed,
+                                 args.seed)
+
+    text = json.dumps({"benchmark": "onset_timing", "latency_ms": args.latency_ms,
+                       "noise_px": args.noise_px, "min_cutoff": args.min_cutoff,
+                       "beta": args.beta, "d_cutoff": args.d_cutoff, "min_speed": args.min_speed,
+                       "streams": results}, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
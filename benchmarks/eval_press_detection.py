@@ -0,0 +1,164 @@
+# benchmarks/eval_press_detection.py
+"""
+按鍵判定的 precision / recall：在有標註的 landmark 串流上比較
+只看距離（舊的做法）與 PressDetector（桌面高度 + 下壓速度 + hysteresis + debounce）。
+
+標註檔（JSON）：
+    {
+      "stream": "session.lmk",          # 相對於標註檔的路徑
+      "tolerance_ms": 100,              # 選填，預設 100
+      "presses": [{"t": 3.42, "slot": 6}, ...]
+    }
+t 是指尖碰到桌面那張 frame 的時間（與 .lmk 的時間相同），
+slot 是 finger_slots 的編號：左手 0-4、右手 5-9（拇指 → 小指）。
+
+同一根手指、tolerance 內的第一個 note-on 算命中；其他 note-on 都算多出來的
+（懸空誤觸、在邊界抖動造成的重複觸發），也會多佔 voice 與 MIDI 事件。
+
+    python -m benchmarks.eval_press_detection labels.json
+    python -m benchmarks.eval_press_detection          # 沒給標註就用合成串流
+"""
+import argparse
+import json
+import os
+
+from utils import clock
+from utils.hand_processing import extract_finger_pixels, finger_slots
+from utils.hand_tracker import HandTracker
+from utils.keyboard import Keyboard
+from utils.layout import KeyboardLayout
+from utils.motion import FingerMotionTracker
+from utils.press_detector import PressDetector
+from .eval_onset_timing import load_stream
+from .synthetic import synthetic_press_stream
+
+
+def load_labels(path):
+    with open(path) as f:
+        info = json.load(f)
+    stream = os.path.join(os.path.dirname(path), info["stream"])
+    records, frame_size = load_stream(stream)
+    return records, frame_size, info["presses"], info.get("tolerance_ms", 100)
+
+
+def calibrate(records, layout, frame_w, frame_h):
+    """
+    與 AirPiano 相同的流程：HandTracker 校正桌面，鎖定後下一張有手的 frame 決定鍵盤。
+    回傳 (keyboard 參數, table_z, 校正用的手, 從第幾張開始演奏)
+    """
+    tracker = HandTracker(use_mediapipe=False)
+    for i, (t, left, right) in enumerate(records):
+        clock.set_clock(lambda t=t: t)
+        tracker.update_table_calibration(left, right, frame_h)
+        if tracker.table_locked:
+            break
+    clock.set_clock(None)
+    if not tracker.table_locked:
+        raise ValueError("Table calibration never finished")
+
+    for j in range(i + 1, len(records)):
+        _, left, right = records[j]
+        hand = tracker.get_dominant(left, right)
+        if hand is not None:
+            hand = left if hand == "Left" else right
+            key_width = max(int(abs(hand[4][0] - hand[20][0]) * frame_w / 5), 1)
+            keys = (frame_w, tracker.table_y_pixel, int(hand[8][0] * frame_w), key_width)
+            return keys, tracker.table_z, hand, j + 1
+    raise ValueError("No hands after calibration")
+
+
+def detect(records, layout, frame_size, start, keys, table_z=None, hand=None):
+    """
+    table_z 為 None 時只看距離。
+    回傳 ([(t, slot), ...] 每根手指的 note-on 事件, note-on 總數)
+    """
+    frame_w, frame_h = frame_size
+    motion = FingerMotionTracker(frame_h)
+    press = None
+    keyboard = Keyboard(layout)
+    if table_z is not None:
+        press = PressDetector(motion)
+        press.set_table(table_z, hand)
+        keyboard = Keyboard(layout, hold_scale=1.2)
+    keyboard.build_keyboard(*keys)
+
+    events = []
+    n_notes = 0
+    for t, left, right in records[start:]:
+        fingers = extract_finger_pixels(left, right, frame_w, frame_h)
+        slots = finger_slots(left, right)
+        motion.update(fingers, slots, t)
+        active = press.update(fingers, slots, t) if press is not None else None
+
+        newly_pressed, _ = keyboard.check_pressed(fingers, active)
+        n_notes += len(newly_pressed)
+        # 同一根手指同一張 frame 按到好幾個鍵只算一次
+        for slot in sorted({slots[i] for i in keyboard.pressed_by.values()}):
+            events.append((t, slot))
+    return events, n_notes
+
+
+def score(labels, events, tolerance):
+    used = [False] * len(events)
+    matched = 0
+    for label in labels:
+        for j, (t, slot) in enumerate(events):
+            if not used[j] and slot == label["slot"] and abs(t - label["t"]) <= tolerance:
+                used[j] = True
+                matched += 1
+                break
+
+    precision = matched / len(events) if events else 0.0
+    recall = matched / len(labels) if labels else 0.0
+    return {
+        "events": len(events),
+        "matched": matched,
+        "precision": round(precision, 3),
+        "recall": round(recall, 3),
+        "f1": round(2 * precision * recall / (precision + recall), 3) if matched else 0.0,
+    }
+
+
+def evaluate(records, frame_size, labels, tolerance_ms, layout):
+    keys, table_z, hand, start = calibrate(records, layout, *frame_size)
+    results = {"labels": len(labels)}
+    for name, z in (("proximity", None), ("press_detector", table_z)):
+        events, n_notes = detect(records, layout, frame_size, start, keys, z, hand)
+        results[name] = score(labels, events, tolerance_ms / 1000)
+        results[name]["note_ons"] = n_notes
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("labels", nargs="*", help="標註檔 (.json)")
+    parser.add_argument("--range", default="C3-C5")
+    parser.add_argument("--black-keys", action="store_true")
+    parser.add_argument("--taps", type=int, default=60, help="合成串流的敲擊次數")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="JSON 輸出檔（預設印到 stdout）")
+    args = parser.parse_args()
+
+    layout = KeyboardLayout.parse(args.range, black_keys=args.black_keys)
+    datasets = {}
+    if args.labels:
+        for path in args.labels:
+            datasets[path] = load_labels(path)
+    else:
+        records, labels = synthetic_press_stream(args.taps, seed=args.seed)
+        datasets["synthetic"] = (records, (1280, 720), labels, 100)
+
+    results = {}
+    for name, (records, frame_size, labels, tolerance_ms) in datasets.items():
+        results[name] = evaluate(records, frame_size, labels, tolerance_ms, layout)
+
+    text = json.dumps({"benchmark": "press_detection", "datasets": results}, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
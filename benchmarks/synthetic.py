@@ -0,0 +1,201 @@
+# benchmarks/synthetic.py
+"""
+合成的 frame 與 landmark 串流，讓 benchmark 不需要相機也不需要 MediaPipe。
+"""
+import numpy as np
+
+TIP_IDS = [4, 8, 12, 16, 20]
+
+
+def synthetic_frames(n, frame_w=1280, frame_h=720, seed=0):
+    """n 張隨機雜訊 BGR frame（benchmark 時循環使用）"""
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 256, (frame_h, frame_w, 3), dtype=np.uint8) for _ in range(n)]
+
+
+class SyntheticCapture:
+    """
+    循環播放 synthetic_frames 的假相機，介面同 cv2.VideoCapture.read([image])：
+    給了 image 就把畫面寫進去（真的相機驅動也是這樣），否則每次回傳新的陣列。
+    """
+    def __init__(self, frames, n_frames=None):
+        self.frames = frames
+        self.n_frames = n_frames
+        self.idx = 0
+
+    def read(self, image=None):
+        if self.n_frames is not None and self.idx >= self.n_frames:
+            return False, None
+        src = self.frames[self.idx % len(self.frames)]
+        self.idx += 1
+        if image is not None and image.shape == src.shape:
+            np.copyto(image, src)
+            return True, image
+        return True, src.copy()
+
+
+def synthetic_hand(cx, cy, spread=0.12, tap=0.0):
+    """
+    一隻手的 21 個 normalized landmark。
+    cx, cy：食指指尖位置；spread：拇指到小指的寬度；tap：0~1，指尖往下壓的程度
+    """
+    hand = np.zeros((21, 3), dtype=np.float64)
+    hand[:, 0] = cx
+    hand[:, 1] = cy - 0.08
+    hand[:, 2] = -0.05
+    for i, tid in enumerate(TIP_IDS):
+        hand[tid, 0] = cx - spread / 2 + i * spread / 4
+        hand[tid, 1] = cy - 0.02 * (1.0 - tap)
+        hand[tid, 2] = -0.05 + 0.03 * tap
+    return hand
+
+
+def synthetic_landmark_stream(n_frames, fps=30.0, table_y=0.7, seed=0, jitter=0.002):
+    """
+    兩隻手在桌面上左右移動、輪流敲擊的 landmark 串流。
+    回傳 [(t, left_hand, right_hand), ...]，偶爾會有一隻手消失。
+    """
+    rng = np.random.default_rng(seed)
+    records = []
+    for i in range(n_frames):
+        t = i / fps
+        phase = 2 * np.pi * t
+        left = synthetic_hand(0.35 + 0.1 * np.sin(0.3 * phase), table_y,
+                              tap=max(0.0, np.sin(3 * phase)))
+        right = synthetic_hand(0.65 + 0.1 * np.cos(0.3 * phase), table_y,
+                               tap=max(0.0, np.sin(3 * phase + np.pi)))
+        left[:, :2] += rng.normal(0, jitter, (21, 2))
+        right[:, :2] += rng.normal(0, jitter, (21, 2))
+
+        if rng.random() < 0.05:
+            left = None
+        records.append((t, left, right))
+    return records
+
+
+class _Landmark:
+    __slots__ = ("x", "y", "z")
+
+    def __init__(self, x, y, z):
+        self.x = x
+        self.y = y
+        self.z = z
+
+
+def as_mediapipe_landmarks(hand):
+    """numpy (21,3) → 與 MediaPipe lm.landmark 一樣有 .x .y .z 的物件串列"""
+    return [_Landmark(float(x), float(y), float(z)) for x, y, z in hand]
+
+
+def synthetic_press_stream(n_taps=40, fps=30.0, table_y=0.7, seed=0, calib_s=2.0):
+    """
+    有標註的敲擊串流（評估按鍵判定用）：右手先平放在桌面 calib_s 秒讓程式校正，
+    之後手指懸空左右移動，每隔一段時間由其中一根手指敲一下；
+    也會有整隻手懸空滑過琴鍵、沒有敲擊的片段。
+
+    回傳 (records, labels)：
+      records: [(t, left_hand, right_hand), ...]（left_hand 都是 None）
+      labels : [{"t": 碰到桌面的時間, "slot": finger_slots 的編號}, ...]
+    """
+    rng = np.random.default_rng(seed)
+    records = []
+    labels = []
+
+    def pose(cx, depth):
+        # depth 0 = 懸空，1 = 碰到桌面；只改指尖
+        hand = synthetic_hand(cx, table_y, tap=1.0)
+        for i, tid in enumerate(TIP_IDS):
+            hand[tid, 1] -= 0.04 * (1.0 - depth[i])
+            hand[tid, 2] -= 0.03 * (1.0 - depth[i])
+        hand[:, :2] += rng.normal(0, 0.0015, (21, 2))
+        hand[:, 2] += rng.normal(0, 0.002, 21)
+        return hand
+
+    t = 0.0
+    dt = 1.0 / fps
+    for _ in range(int(calib_s * fps)):
+        records.append((t, None, pose(0.5, np.ones(5))))
+        t += dt
+
+    # 一次敲擊：往下 3 張、停 2 張、往上 3 張、懸空 4 張
+    profile = [1 / 3, 2 / 3, 1.0, 1.0, 1.0, 2 / 3, 1 / 3, 0.0, 0.0, 0.0, 0.0, 0.0]
+    for k in range(n_taps):
+        glide = k % 5 == 4      # 每 5 次有一次只是滑過去
+        finger = int(rng.integers(0, 5))
+        x_from = 0.5 + 0.12 * np.sin(0.7 * k)
+        x_to = 0.5 + 0.12 * np.sin(0.7 * (k + 1)) if glide else x_from
+        for j, d in enumerate(profile):
+            depth = np.zeros(5)
+            if not glide:
+                depth[finger] = d
+                if j == 2:
+                    labels.append({"t": round(t, 6), "slot": 5 + finger})
+            cx = x_from + (x_to - x_from) * j / (len(profile) - 1)
+            records.append((t, None, pose(cx, depth)))
+            t += dt
+    return records, labels
+
+
+class _Hand:
+    def __init__(self, landmark):
+        self.landmark = landmark
+
+
+class _Handedness:
+    def __init__(self, label):
+        self.classification = [_Label(label)]
+
+
+class _Label:
+    def __init__(self, label):
+        self.label = label
+
+
+class _Results:
+    def __init__(self, hands, labels):
+        self.multi_hand_landmarks = hands
+        self.multi_handedness = [_Handedness(label) for label in labels]
+
+
+def stamp_frame(frame, n):
+    """把編號 n 寫進左上角 4 個灰色像素（BGR→RGB 之後還讀得出來）"""
+    for k in range(4):
+        frame[0, k] = (n >> (8 * k)) & 0xFF
+
+
+def read_stamp(image):
+    return sum(int(image[0, k, 0]) << (8 * k) for k in range(4))
+
+
+class SyntheticHands:
+    """
+    假的 Hands：每張花 cost_ms ± jitter_ms 的 CPU（真的在算，不是 sleep），
+    回傳一隻 "Left" 手，landmark 0 的 z 是畫面上 stamp_frame 寫的編號，用來檢查結果有沒有配錯 frame。
+    """
+    def __init__(self, cost_ms=20.0, jitter_ms=10.0, seed=0):
+        import cv2
+        cv2.setNumThreads(1)    # 跟 MediaPipe 一樣一張圖只用一個核心
+        self.cost = cost_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.rng = np.random.default_rng(seed)
+        self.hand = synthetic_hand(0.5, 0.7)
+
+    def process(self, image):
+        import time
+        import cv2
+        end = time.process_time() + max(self.cost + self.rng.uniform(-self.jitter, self.jitter), 0.0)
+        small = image[::8, ::8]
+        while time.process_time() < end:
+            cv2.GaussianBlur(small, (5, 5), 0)
+        hand = self.hand.copy()
+        hand[0, 2] = read_stamp(image)
+        return _Results([_Hand(as_mediapipe_landmarks(hand))], ["Left"])
+
+    def close(self):
+        pass
+
+
+def synthetic_hands(cost_ms, jitter_ms, complexity, static):
+    """ProcessInferencePool 的 model_factory（用 functools.partial 綁 cost_ms / jitter_ms）"""
+    import os
+    return SyntheticHands(cost_ms, jitter_ms, seed=os.getpid())
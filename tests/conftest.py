@@ -0,0 +1,6 @@
+# tests/conftest.py
+# 沒有打包：測試從 repo 根目錄 import utils / benchmarks
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
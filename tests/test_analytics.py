@@ -0,0 +1,57 @@
+# tests/test_analytics.py
+"""AnalyticsStore 的 writer：session id 只在 commit 之後設定；寫入失敗的 session 整個丟掉"""
+import contextlib
+import sqlite3
+
+from utils.analytics import AnalyticsStore
+
+
+def rows(path, sql):
+    with contextlib.closing(sqlite3.connect(path)) as conn:
+        return conn.execute(sql).fetchall()
+
+
+def test_session_id_after_commit(tmp_path):
+    path = str(tmp_path / "a.db")
+    store = AnalyticsStore(path, flush_s=10.0)
+    session = store.begin_session("practice", song="a.mid")
+    store.note(session, 1.0, "C4", kind="hit", error_ms=5.0)
+    assert session.id is None
+    store.end_session(session, {"played": 1, "hits": 1})
+    store.flush()
+    assert session.id is not None
+    assert rows(path, "SELECT session, note FROM notes") == [(session.id, "C4")]
+    assert rows(path, "SELECT hits FROM sessions") == [(1,)]
+    store.close()
+
+
+def test_failed_session_is_dropped_not_written_as_null(tmp_path):
+    path = str(tmp_path / "a.db")
+    store = AnalyticsStore(path, flush_s=10.0)
+    with contextlib.closing(sqlite3.connect(path)) as conn:
+        conn.execute("CREATE TRIGGER boom BEFORE INSERT ON sessions WHEN NEW.song = 'bad.mid'"
+                     " BEGIN SELECT RAISE(ABORT, 'boom'); END")
+        conn.commit()
+
+    bad = store.begin_session("practice", song="bad.mid")
+    store.note(bad, 1.0, "C4", kind="hit")
+    store.flush()
+    # rollback 之後沒有留下舊的 id
+    assert bad.id is None and bad.dropped
+    assert store.metrics()["failed"] == 2
+
+    # 同一個 session 後面的事件直接丟掉，不會以 session = NULL 寫進去、也不算 failed
+    store.note(bad, 2.0, "D4", kind="hit")
+    store.end_session(bad)
+    good = store.begin_session("record")
+    store.note(good, 0.0, "E4")
+    store.end_session(good)
+    store.flush()
+
+    metrics = store.metrics()
+    assert metrics["failed"] == 2
+    assert metrics["dropped"] == 2
+    assert metrics["sessions"] == 1
+    assert good.id is not None
+    assert rows(path, "SELECT session, note FROM notes") == [(good.id, "E4")]
+    store.close()
@@ -0,0 +1,37 @@
+# tests/test_benchmarks.py
+"""benchmarks 在 CI 上要跑得起來：不用 pyautogui、不用螢幕、不用 mediapipe"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_module(module, *args):
+    env = dict(os.environ, SDL_AUDIODRIVER="dummy", SDL_VIDEODRIVER="dummy")
+    return subprocess.run([sys.executable, "-m", module, *args], cwd=ROOT, env=env,
+                          capture_output=True, text=True, timeout=120)
+
+
+def test_bench_hot_path_imports():
+    import benchmarks.bench_hot_path as bench
+    assert callable(bench.run)
+
+    proc = run_module("benchmarks.bench_hot_path", "--help")
+    assert proc.returncode == 0, proc.stderr
+    assert "--no-mediapipe" in proc.stdout
+
+
+def test_bench_hot_path_runs_without_mediapipe():
+    import benchmarks.bench_hot_path as bench
+    result = bench.run(n_frames=5, use_mediapipe=False)
+    assert result["frames"] == 5
+
+
+def test_bench_states_imports():
+    proc = run_module("benchmarks.bench_states", "--help")
+    assert proc.returncode == 0, proc.stderr
+
+    proc = run_module("benchmarks.bench_states", "--frames", "10")
+    assert proc.returncode == 0, proc.stderr
+    assert '"next_state": "playing"' in proc.stdout
@@ -0,0 +1,57 @@
+# tests/test_export_jobs.py
+import os
+import shlex
+import sys
+
+import mido
+
+from utils.export_jobs import ExportQueue
+
+# 假的 converter：把 MIDI 的大小寫進 PDF 檔，證明真的有被叫到、參數正確
+STUB = """
+import os, sys
+midi, pdf = sys.argv[1], sys.argv[2]
+with open(pdf, "w") as f:
+    f.write(f"converted {os.path.getsize(midi)} bytes")
+"""
+
+
+def make_midi():
+    mid = mido.MidiFile()
+    track = mido.MidiTrack()
+    mid.tracks.append(track)
+    track.append(mido.Message("note_on", note=60, velocity=90, time=0))
+    track.append(mido.Message("note_off", note=60, velocity=0, time=480))
+    return mid
+
+
+def test_export_job_with_stub_converter(tmp_path, monkeypatch):
+    stub = tmp_path / "stub_converter.py"
+    stub.write_text(STUB)
+    monkeypatch.setenv("AIRPIANO_SCORE_CONVERTER", f"{shlex.quote(sys.executable)} {shlex.quote(str(stub))} {{midi}} {{pdf}}")
+
+    exports = ExportQueue()
+    # 換掉的 converter 不是 MuseScore：轉完不會開啟播放
+    assert exports.post_process is None
+    job = exports.submit(make_midi(), str(tmp_path / "records" / "take.mid"))
+    exports.close(wait=True)
+
+    assert job.status == "done", job.error
+    assert job.progress == 1.0 and job.finished_at is not None
+    assert os.path.exists(job.midi_path)
+    with open(job.pdf_path) as f:
+        assert f.read() == f"converted {os.path.getsize(job.midi_path)} bytes"
+    assert job.describe() == "Saved: take.mid"
+
+
+def test_failing_converter_marks_job_failed(tmp_path, monkeypatch):
+    monkeypatch.setenv("AIRPIANO_SCORE_CONVERTER", f"{shlex.quote(sys.executable)} -c \"raise SystemExit(3)\"")
+
+    exports = ExportQueue()
+    job = exports.submit(make_midi(), str(tmp_path / "take.mid"))
+    exports.close(wait=True)
+
+    assert job.status == "failed"
+    # MIDI 在轉檔之前就存好了
+    assert os.path.exists(job.midi_path)
+    assert job.describe().startswith("Export failed")
@@ -0,0 +1,48 @@
+# tests/test_filters.py
+"""FingertipFilter 的預測：等速時追得上、突然停住不 overshoot、靜止的抖動不推"""
+import numpy as np
+
+from utils.filters import FingertipFilter
+
+FPS = 30.0
+
+
+def feed(filt, xs, lead=0.0, y=300):
+    """同一根手指（slot 0）依序經過 xs；回傳每張 frame 輸出的 x"""
+    out = []
+    for i, x in enumerate(xs):
+        (fx, _, _), = filt.apply([(int(round(x)), y, 0.0)], [0], i / FPS, lead)
+        out.append(fx)
+    return out
+
+
+def test_prediction_catches_up_with_constant_velocity():
+    speed = 300.0                                  # 像素 / 秒
+    lead = 0.06
+    xs = [100 + speed * i / FPS for i in range(30)]
+    predicted = feed(FingertipFilter(predict=True), xs, lead)
+    # 補回 latency 加上濾波本身的延遲：落在 lead 秒之後真正的位置
+    assert abs(predicted[-1] - (xs[-1] + speed * lead)) <= 2
+
+
+def test_no_overshoot_after_sudden_stop():
+    xs = [100 + 10 * i for i in range(15)] + [240] * 5
+    predicted = feed(FingertipFilter(predict=True), xs, 0.06)
+    # 停住之後不會再往前推過停住的位置
+    assert max(predicted[15:]) <= 240
+
+
+def test_jitter_at_rest_is_not_extrapolated():
+    rng = np.random.default_rng(0)
+    xs = 400 + rng.normal(0, 1.0, 60)
+    filtered = feed(FingertipFilter(), xs)
+    predicted = feed(FingertipFilter(predict=True), xs, 0.06)
+    assert filtered[10:] == predicted[10:]
+
+
+def test_lead_is_capped_and_ignored_without_predict():
+    xs = [100 + 10 * i for i in range(15)]
+    capped = feed(FingertipFilter(predict=True, max_lead=0.05), xs, 1.0)
+    at_cap = feed(FingertipFilter(predict=True, max_lead=0.05), xs, 0.05)
+    assert capped == at_cap
+    assert feed(FingertipFilter(), xs, 0.06) == feed(FingertipFilter(), xs)
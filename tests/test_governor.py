@@ -0,0 +1,136 @@
+# tests/test_governor.py
+"""InferenceGovernor 的 policy：假時鐘 + 假偵測器（每個等級花多少時間由參數決定），不用真的模型"""
+from utils.governor import LEVELS, InferenceGovernor, level_cost
+from utils.states import FakeClock
+
+FPS = 30.0
+
+
+class FakeDetector:
+    """單次偵測的時間：模型大小 × 像素 + 固定開銷；load 是整台機器的負擔倍數"""
+    def __init__(self, base_ms=40.0, heavy=1.5, overhead_ms=5.0):
+        self.base_ms = base_ms
+        self.heavy = heavy
+        self.overhead_ms = overhead_ms
+        self.load = 1.0
+
+    def seconds(self, level):
+        complexity, scale, _ = level
+        ms = self.base_ms * (self.heavy if complexity == 1 else 1.0) * scale * scale + self.overhead_ms
+        return ms * self.load / 1000.0
+
+
+def run(governor, fake, detector, seconds):
+    """照 FPS 跑 seconds 秒；回傳每張 frame 的 (時間, 等級)"""
+    trace = []
+    for _ in range(int(seconds * FPS)):
+        if governor.should_detect():
+            governor.record(detector.seconds(governor.levels[governor.level]))
+        trace.append((fake(), governor.level))
+        fake.advance(1.0 / FPS)
+    return trace
+
+
+def make(fake, **kw):
+    kw.setdefault("target_ms", 30.0)
+    return InferenceGovernor(clock=fake, **kw)
+
+
+def test_steps_down_to_first_level_under_target_and_stays():
+    fake = FakeClock()
+    gov = make(fake)
+    detector = FakeDetector()
+    # 等級 0：65 ms、1：45 ms、2：27.5 ms（第一個低於 30 ms）
+    run(gov, fake, detector, 60.0)
+    assert gov.level == 2
+    # 每次只走一級，走到之後不會再來回跳（retry_s 過了也一樣）
+    assert [(old, new) for _, old, new, _ in gov.decisions] == [(0, 1), (1, 2)]
+
+
+def test_no_periodic_retry_of_a_level_known_to_be_too_slow():
+    fake = FakeClock()
+    # 等級 2：27.5 ms（超過 26）、等級 3：15 ms（低於 26 * 0.6）；只看目前的 15 ms 會以為等級 2 也夠快
+    gov = make(fake, target_ms=26.0, retry_s=10.0)
+    run(gov, fake, FakeDetector(), 60.0)
+    assert gov.level == 3
+    assert [(old, new) for _, old, new, _ in gov.decisions] == [(0, 1), (1, 2), (2, 3)]
+
+
+def test_hold_s_between_switches():
+    fake = FakeClock()
+    gov = make(fake, hold_s=2.0)
+    detector = FakeDetector(base_ms=400.0)      # 每個等級都太慢
+    run(gov, fake, detector, 30.0)
+    times = [t for t, _, _, _ in gov.decisions]
+    assert len(times) == len(LEVELS) - 1
+    assert times[0] >= 2.0
+    assert all(b - a >= 2.0 for a, b in zip(times, times[1:]))
+
+
+def test_hysteresis_band_keeps_level():
+    fake = FakeClock()
+    gov = make(fake)
+    # 22 ms：比 target 低，但高於 target * up_ratio（18 ms）
+    detector = FakeDetector(base_ms=(22.0 - 5.0) / 1.5)
+    run(gov, fake, detector, 20.0)
+    assert gov.switches == 0
+
+    # 已經降了一級、成本在中間：不會升回去
+    fake = FakeClock()
+    gov = make(fake)
+    detector = FakeDetector()
+    run(gov, fake, detector, 1.5)               # 65 ms → 降到等級 1
+    assert gov.level == 1
+    detector.base_ms = 15.0                     # 等級 1 變成 20 ms、等級 0 估計 27.5 ms 以上
+    run(gov, fake, detector, 30.0)
+    assert gov.level == 1
+
+
+def test_retry_s_before_stepping_back_up():
+    fake = FakeClock()
+    gov = make(fake, retry_s=10.0)
+    detector = FakeDetector()
+    detector.load = 2.0                         # 背景很忙
+    run(gov, fake, detector, 10.0)
+    settled = gov.level
+    left_at = {old: t for t, old, new, _ in gov.decisions}
+    detector.load = 0.3                         # 忙完了
+
+    trace = run(gov, fake, detector, 30.0)
+    ups = [(t, old, new) for t, old, new, _ in gov.decisions if new < old]
+    assert ups, "負擔降下來之後應該要升回去"
+    t_up, old, new = ups[0]
+    assert old == settled
+    # 剛量過太慢的等級，retry_s 之內不會再試
+    assert t_up - left_at[new] >= 10.0
+    assert trace[-1][1] < settled
+
+
+def test_unmeasured_level_estimate_scales_with_cost():
+    fake = FakeClock()
+    gov = make(fake)
+    gov.level = 3
+    gov.ewma = 0.010
+    # 沒量過：用 level_cost 的比例，比較重的等級一定估得比較貴
+    estimate = gov._estimate(2, fake())
+    assert estimate > 0.010
+    assert abs(estimate - 0.010 * level_cost(LEVELS[2]) / level_cost(LEVELS[3])) < 1e-12
+
+    # 兩個等級都待過：用當時量到的比例
+    gov.seen = {2: 0.030, 3: 0.015}
+    assert abs(gov._estimate(2, fake()) - 0.020) < 1e-12
+
+
+def test_fixed_complexity_only_changes_scale_and_rate(capsys):
+    fake = FakeClock()
+    gov = make(fake, complexity=1)
+    assert all(c == 1 for c, _, _ in gov.levels)
+    assert len(set(gov.levels)) == len(gov.levels)
+    run(gov, fake, FakeDetector(base_ms=400.0), 30.0)
+    assert gov.switches > 0
+    assert gov.model_complexity == 1
+    metrics = gov.metrics()
+    assert metrics["complexity_fixed"] is True
+    assert metrics["recent_switches"]
+    # 換等級不寫 stdout
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,36 @@
+# tests/test_motion.py
+"""FingerMotionTracker：敲擊速度用 y 和 z（往相機靠近）一起估計"""
+from utils.motion import FingerMotionTracker
+
+FRAME_H = 720
+FPS = 30.0
+
+
+def strike(tracker, ys, zs):
+    for i, (y, z) in enumerate(zip(ys, zs)):
+        tracker.update([(100, y, z)], [0], i / FPS)
+    return tracker.strike_velocity(0)
+
+
+def test_approach_toward_camera_adds_velocity():
+    ys = [400, 410, 420, 430]
+    flat = strike(FingerMotionTracker(FRAME_H), ys, [0.0] * 4)
+    closer = strike(FingerMotionTracker(FRAME_H), ys, [0.0, -0.02, -0.04, -0.06])
+    assert closer > flat
+
+    # 只看 y 時 z 沒有影響
+    assert strike(FingerMotionTracker(FRAME_H, z_weight=0.0), ys, [0.0, -0.02, -0.04, -0.06]) == flat
+
+
+def test_moving_away_does_not_reduce_velocity():
+    ys = [400, 410, 420, 430]
+    flat = strike(FingerMotionTracker(FRAME_H), ys, [0.0] * 4)
+    away = strike(FingerMotionTracker(FRAME_H), ys, [0.0, 0.02, 0.04, 0.06])
+    assert away == flat
+
+
+def test_down_speed_stays_y_only():
+    tracker = FingerMotionTracker(FRAME_H)
+    strike(tracker, [400, 400, 400, 400], [0.0, -0.05, -0.1, -0.15])
+    assert tracker.down_speed(0) == 0.0
+    assert tracker.strike_speed(0) > 0.0
@@ -0,0 +1,57 @@
+# tests/test_replay.py
+""".lmk 的 EXTRAPOLATED 旗標：HandTracker 外插的 frame 會標起來，重播預設略過"""
+import numpy as np
+
+from utils.hand_tracker import HandTracker
+from utils.landmark_store import EXTRAPOLATED, LandmarkReader, LandmarkWriter
+from utils.replay import LandmarkReplaySource
+
+
+class SkipGovernor:
+    """每張都叫 HandTracker 不要偵測（用外插）"""
+    model_complexity = 1
+    scale = 1.0
+
+    def should_detect(self):
+        return False
+
+
+def hand(y):
+    h = np.zeros((21, 3))
+    h[:, 1] = y
+    return h
+
+
+def write_stream(path):
+    # 偵測 / 外插 / 外插 / 偵測
+    with LandmarkWriter(path, (320, 240)) as writer:
+        for i, (y, extrapolated) in enumerate([(0.1, False), (0.2, True), (0.3, True), (0.4, False)]):
+            writer.write(i / 30.0, None, hand(y), ["Right"], extrapolated)
+
+
+def replay(source):
+    out = []
+    while source.read()[0]:
+        _, right, _, _, _ = source.detect(None)
+        out.append((round(source.now() * 30), round(float(right[0, 1]), 3)))
+    return out
+
+
+def test_replay_skips_extrapolated_frames(tmp_path):
+    path = str(tmp_path / "s.lmk")
+    write_stream(path)
+    assert list(LandmarkReader(path).detected()) == [0, 3]
+
+    # 時間照原本錄的 t
+    assert replay(LandmarkReplaySource(path)) == [(0, 0.1), (3, 0.4)]
+    assert replay(LandmarkReplaySource(path, include_extrapolated=True)) == \
+        [(0, 0.1), (1, 0.2), (2, 0.3), (3, 0.4)]
+
+
+def test_hand_tracker_flags_extrapolated_frames(tmp_path):
+    path = str(tmp_path / "s.lmk")
+    tracker = HandTracker(use_mediapipe=False, governor=SkipGovernor())
+    tracker.start_recording(path, (320, 240))
+    tracker.detect(np.zeros((240, 320, 3), np.uint8))
+    tracker.stop_recording()
+    assert int(LandmarkReader(path).records["flags"][0]) & EXTRAPOLATED
@@ -0,0 +1,66 @@
+# tests/test_sample_bank.py
+import os
+import wave
+
+import numpy as np
+
+from utils.layout import KeyboardLayout
+from utils.sample_bank import SampleBank
+
+
+def write_wav(path, freq, rate=8000, seconds=0.2):
+    t = np.arange(int(rate * seconds)) / rate
+    data = (np.sin(2 * np.pi * freq * t) * 8000).astype("<i2")
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(data.tobytes())
+
+
+def make_bank(tmp_path, layout, **kw):
+    return SampleBank(layout.note_map, str(tmp_path / "wav"), 8000, 1,
+                      cache_dir=str(tmp_path / "cache"), **kw)
+
+
+def test_two_layouts_keep_their_own_cache(tmp_path):
+    (tmp_path / "wav").mkdir()
+    write_wav(tmp_path / "wav" / "C4.wav", 261.6)
+    small = KeyboardLayout("C4", "E4")
+    wide = KeyboardLayout("A0", "C8", black_keys=True)
+
+    assert not make_bank(tmp_path, small).cache_hit
+    assert not make_bank(tmp_path, wide).cache_hit
+    # 兩個音域輪流開，不會互相把對方的快取刪掉
+    assert make_bank(tmp_path, small).cache_hit
+    assert make_bank(tmp_path, wide).cache_hit
+
+
+def test_evicts_least_recently_used(tmp_path):
+    (tmp_path / "wav").mkdir()
+    layouts = [KeyboardLayout("C4", end) for end in ("D4", "E4", "F4")]
+    for layout in layouts:
+        make_bank(tmp_path, layout, max_banks=2)
+    banks = [n for n in os.listdir(tmp_path / "cache") if n.endswith(".json") and n.startswith("bank_")]
+    assert len(banks) == 2
+    # 最早的那份被淘汰，最近的兩份還在
+    assert not make_bank(tmp_path, layouts[0], max_banks=2).cache_hit
+
+
+def test_key_follows_wav_content(tmp_path):
+    (tmp_path / "wav").mkdir()
+    path = tmp_path / "wav" / "C4.wav"
+    write_wav(path, 261.6)
+    layout = KeyboardLayout("C4", "E4")
+    make_bank(tmp_path, layout)
+
+    # 只被 touch（內容一樣）：還是用快取
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert make_bank(tmp_path, layout).cache_hit
+
+    # 內容改了：重建
+    write_wav(path, 300.0)
+    bank = make_bank(tmp_path, layout)
+    assert not bank.cache_hit
+    assert bank.sources()["C4"] == "wav"
@@ -0,0 +1,84 @@
+# tests/test_song.py
+"""utils.song 的 SMF 解碼：running status、meta / sysex 夾在中間、截斷的 track；結果要跟 mido 一樣"""
+import os
+
+import mido
+import pytest
+
+from utils.song import Song, _mido_track, _smf_tracks, note_events
+
+SONG = os.path.join(os.path.dirname(__file__), "..", "audio", "twinkle-twinkle-little-star.mid")
+
+
+def chunk(body, declared=None):
+    length = len(body) if declared is None else declared
+    return b"MTrk" + length.to_bytes(4, "big") + bytes(body)
+
+
+def smf(*tracks, division=96):
+    header = b"MThd" + (6).to_bytes(4, "big") + (1).to_bytes(2, "big")
+    header += len(tracks).to_bytes(2, "big") + division.to_bytes(2, "big")
+    return header + b"".join(tracks)
+
+
+def events(data):
+    """每個 track 解出來的 (tick, kind, channel, a, b)"""
+    _, tracks = _smf_tracks(data)
+    return [[(tick, kind, channel, a, b) for tick, _, kind, channel, a, b in track] for track in tracks]
+
+
+END = [0x00, 0xFF, 0x2F, 0x00]
+TEMPO = [0x00, 0xFF, 0x51, 0x03, 0x07, 0xA1, 0x20]       # 500000 µs / 拍
+
+
+def test_running_status():
+    body = [0x00, 0x90, 60, 100,
+            0x00, 64, 90,           # running status：還是 note on
+            0x60, 60, 0,            # velocity 0 = note off
+            0x00, 64, 0] + END
+    assert events(smf(chunk(body))) == [[
+        (0, "on", 0, 60, 100), (0, "on", 0, 64, 90), (96, "off", 0, 60, 0), (96, "off", 0, 64, 0)]]
+
+
+def test_meta_keeps_running_status_and_sysex_cancels_it():
+    body = [0x00, 0x91, 60, 100] + TEMPO + [0x10, 62, 100] + END
+    assert events(smf(chunk(body))) == [[
+        (0, "on", 1, 60, 100), (0, "tempo", 0, 500000, 0), (16, "on", 1, 62, 100)]]
+
+    sysex = [0x00, 0xF0, 0x03, 0x7E, 0x09, 0xF7]
+    body = [0x00, 0x90, 60, 100] + sysex + [0x10, 62, 100] + END
+    with pytest.raises(ValueError):
+        events(smf(chunk(body)))
+
+
+def test_system_messages_are_skipped():
+    body = [0x00, 0x90, 60, 100,
+            0x00, 0xF8,                 # real-time：沒有 data，running status 不變
+            0x00, 62, 100,
+            0x00, 0xF2, 0x10, 0x20,     # song position：兩個 data byte
+            0x00, 0x80, 60, 0] + END
+    assert events(smf(chunk(body))) == [[(0, "on", 0, 60, 100), (0, "on", 0, 62, 100), (0, "off", 0, 60, 0)]]
+
+
+def test_truncated_track_keeps_complete_events():
+    body = [0x00, 0x90, 60, 100, 0x10, 0x80, 60]              # 最後一個 note off 少一個 byte
+    data = smf(chunk(body, declared=len(body) + 20))
+    assert events(data) == [[(0, "on", 0, 60, 100)]]
+
+    # 宣告的長度比內容短：不會讀進下一個 chunk
+    first = [0x00, 0x90, 60, 100, 0x10, 0x80, 60, 0] + END
+    second = [0x00, 0x90, 67, 80] + END
+    data = smf(chunk(first, declared=4), chunk(second))
+    assert events(data)[0] == [(0, "on", 0, 60, 100)]
+
+
+def test_matches_mido():
+    with open(SONG, "rb") as f:
+        data = f.read()
+    ours = list(note_events(*_smf_tracks(data)))
+    midi = mido.MidiFile(SONG)
+    theirs = list(note_events(midi.ticks_per_beat, [_mido_track(t, i) for i, t in enumerate(midi.tracks)]))
+    assert ours
+    assert [(e.onset, e.midi, e.velocity, e.voice, e.duration) for e in ours] == \
+        [(e.onset, e.midi, e.velocity, e.voice, e.duration) for e in theirs]
+    assert Song.open(SONG).notes() == Song.from_midi(midi).notes()
@@ -0,0 +1,66 @@
+# tests/test_song_library.py
+"""SongLibrary：只刪自己的快取檔、解析失敗的曲子不列出、PracticeUI 跟著 version 更新清單"""
+import os
+import shutil
+
+import pytest
+
+from utils.practice_ui import PracticeUI
+from utils.song_library import SongLibrary
+
+SONG = os.path.join(os.path.dirname(__file__), "..", "audio", "twinkle-twinkle-little-star.mid")
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    audio = tmp_path / "audio"
+    audio.mkdir()
+    shutil.copy(SONG, audio / "twinkle.mid")
+    (audio / "broken.mid").write_bytes(b"not a midi file")
+    return str(audio), str(tmp_path / "cache")
+
+
+def test_garbage_collection_keeps_other_libraries_files(dirs):
+    audio, cache = dirs
+    SongLibrary(audio, cache).build()
+    (mine,) = [f for f in os.listdir(cache) if f.endswith(".npz")]
+
+    # 共用 cache_dir 的另一個曲庫的快取
+    other = os.path.join(cache, "0" * 40 + ".npz")
+    open(other, "wb").close()
+    SongLibrary(audio, cache).build()
+    assert os.path.exists(other)
+
+    # 這份 index 原本指到、曲子被拿掉之後的快取才刪
+    os.remove(os.path.join(audio, "twinkle.mid"))
+    library = SongLibrary(audio, cache)
+    library.build()
+    assert not os.path.exists(os.path.join(cache, mine))
+    assert os.path.exists(other)
+
+
+def test_unparsable_song_is_not_listed(dirs):
+    audio, cache = dirs
+    library = SongLibrary(audio, cache)
+    assert [name for name, _ in library.entries()] == ["broken.mid", "twinkle.mid"]
+
+    library.build()
+    assert [name for name, _ in library.entries()] == ["twinkle.mid"]
+    assert library.metrics()["failed"] == 1
+
+
+def test_load_failure_marks_song_broken_and_picker_refreshes(dirs):
+    audio, cache = dirs
+    library = SongLibrary(audio, cache)
+    ui = PracticeUI(audio_dir=audio, library=library)
+    assert ui.files == ["broken.mid", "twinkle.mid"]
+
+    with pytest.raises(ValueError):
+        library.load_arrays(os.path.join(audio, "broken.mid"))
+    ui.refresh()
+    assert ui.files == ["twinkle.mid"]
+
+    # version 沒變就不重建
+    files = ui.files
+    ui.refresh()
+    assert ui.files is files
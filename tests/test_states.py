@@ -0,0 +1,211 @@
+# tests/test_states.py
+"""StateMachine 的狀態切換：假的 app / packet + FakeClock，不用相機也不用 AirPiano"""
+import numpy as np
+
+from utils.states import FakeClock, Scheduler, StateMachine
+
+FPS = 30.0
+
+
+class FakeExitUI:
+    def __init__(self):
+        self.visible = False
+        self.trigger_time = None
+        self.hands_gone = False
+        self.choice = None
+
+    def update(self, left_missing, right_missing):
+        if self.hands_gone:
+            self.visible = True
+
+    def build(self, w, h):
+        pass
+
+    def check_pressed(self, fingers):
+        return self.choice
+
+    def draw(self, frame):
+        pass
+
+
+class FakeWidget:
+    """鍵盤 / Download 按鈕：只需要能畫、不會被按到"""
+    def build(self, w, h):
+        pass
+
+    def check_pressed(self, fingers):
+        return False
+
+    def draw(self, frame, *args):
+        pass
+
+
+class FakeRecorder:
+    def __init__(self):
+        self.started = None
+        self.export_job = None
+
+    def start(self, t):
+        self.started = t
+
+
+class FakePicker:
+    """選曲畫面：第一次 update 就選到 selected"""
+    def __init__(self, selected=None):
+        self.selected = selected
+
+    def render(self, frame, fingertip):
+        pass
+
+    def update(self, fingertip):
+        selected, self.selected = self.selected, None
+        return selected
+
+
+class FakeApp:
+    """StateMachine 會用到的 AirPiano 屬性 / 方法"""
+    frame_w = 320
+    frame_h = 240
+
+    def __init__(self, fake):
+        self.headless = True
+        self.mode = None
+        self.exit_ui = FakeExitUI()
+        self.download_ui = FakeWidget()
+        self.keyboard = FakeWidget()
+        self.midi_recorder = FakeRecorder()
+        self.practice_ui = FakePicker()
+        self.loadable = True
+        self.frames_shown = 0
+        self.sessions = 0
+        self.restarts = 0
+        self.logged = 0
+        self.machine = StateMachine(self, scheduler=Scheduler(now=fake))
+
+    def show(self, frame, delay=1):
+        self.frames_shown += 1
+        return -1
+
+    def draw_table_line(self, frame):
+        pass
+
+    def begin_session(self):
+        self.sessions += 1
+
+    def play(self, packet):
+        return [], [], []
+
+    def log_notes(self, packet, newly_pressed, judged=None):
+        self.logged += 1
+
+    def load_song(self, selected):
+        return self.loadable
+
+    def restart(self):
+        self.restarts += 1
+        self.mode = None
+        self.machine.reset()
+
+
+class Packet:
+    def __init__(self, t):
+        self.frame = np.zeros((FakeApp.frame_h, FakeApp.frame_w, 3), np.uint8)
+        self.hands = (None, None, None, None, [])
+        self.timestamp = t
+
+
+def step(app, fake, n=1):
+    """跑 n 張 frame；回傳每張 step 之後的狀態名稱"""
+    names = []
+    for _ in range(n):
+        app.machine.step(Packet(fake()))
+        names.append(app.machine.name)
+        fake.advance(1.0 / FPS)
+    return names
+
+
+def test_message_waits_for_timer_even_when_headless():
+    fake = FakeClock()
+    app = FakeApp(fake)
+    app.machine.message("RECORD MODE", 1.0, "playing")
+    assert app.machine.name == "message"
+
+    names = step(app, fake, int(2 * FPS))
+    shown = names.index("playing")
+    # 訊息期間的 frame 都有經過 step（重播時跟有畫面時一樣）
+    assert abs(shown - FPS) <= 1
+    assert app.frames_shown >= shown
+    assert app.sessions == 1
+
+
+def test_record_mode_goes_through_message_to_playing():
+    fake = FakeClock(5.0)
+    app = FakeApp(fake)
+    app.mode = "record"
+    app.machine.goto("mode_select")
+    names = step(app, fake, int(2 * FPS))
+    assert app.midi_recorder.started == 5.0
+    assert names[0] == "message"
+    assert names[-1] == "playing"
+
+
+def test_reset_cancels_pending_message():
+    fake = FakeClock()
+    app = FakeApp(fake)
+    app.machine.message("PRACTICE MODE", 1.0, "playing")
+    app.machine.reset("exit_menu")
+    names = step(app, fake, int(2 * FPS))
+    # 訊息的 timer 不會在重設之後把狀態切走
+    assert set(names) == {"exit_menu"}
+    assert app.sessions == 0
+
+
+def test_hands_leaving_opens_exit_menu_and_restart():
+    fake = FakeClock()
+    app = FakeApp(fake)
+    app.mode = "record"
+    app.machine.goto("playing")
+    app.exit_ui.hands_gone = True
+    assert step(app, fake) == ["exit_menu"]
+    # 切到 Exit 選單的那張 frame 不再記錄 / 畫鍵盤，只顯示
+    assert app.logged == 0
+    assert app.frames_shown == 1
+
+    app.exit_ui.choice = "restart"
+    step(app, fake)
+    assert app.restarts == 1
+    assert app.machine.name == "calibrate_table"
+
+
+def test_exit_menu_exit_stops_loop():
+    fake = FakeClock()
+    app = FakeApp(fake)
+    app.machine.goto("exit_menu")
+    app.exit_ui.choice = "exit"
+    assert app.machine.step(Packet(fake())) is False
+
+
+def test_completed_menu_locked_for_lock_s():
+    fake = FakeClock()
+    app = FakeApp(fake)
+    app.machine.goto("completed")
+    app.exit_ui.choice = "exit"
+    # 2 秒內按 Exit 沒反應
+    for _ in range(int(1.9 * FPS)):
+        assert app.machine.step(Packet(fake())) is True
+        fake.advance(1.0 / FPS)
+    fake.advance(0.2)
+    assert app.machine.step(Packet(fake())) is False
+
+
+def test_unloadable_song_returns_to_picker():
+    fake = FakeClock()
+    app = FakeApp(fake)
+    app.mode = "practice"
+    app.loadable = False
+    app.practice_ui.selected = "audio/broken.mid"
+    app.machine.goto("song_picker")
+    names = step(app, fake, int(2 * FPS))
+    assert names[0] == "message"
+    assert names[-1] == "song_picker"
+    assert "playing" not in names
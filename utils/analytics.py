@@ -0,0 +1,366 @@
+# utils/analytics.py
+"""
+練習 / 錄音的紀錄：每個 session 一列、每個彈的音一列，存在本機的 SQLite（預設 records/analytics.db）。
+
+主迴圈只把事件丟進 queue（append-only，不碰資料庫），背景 writer thread 累積到 batch_size 筆
+或等了 flush_s 秒就用一個 transaction 寫進去。寫的時候順便更新兩張彙總表，
+常用的查詢只讀彙總表，不用掃所有的音，session 再多也一樣快：
+
+  song_weeks (song, week)        每首每週：session 數、彈了幾個音、命中、錯音、漏音
+  note_weeks (song, week, note)  每個音每週：次數、命中、錯音、延遲與時間誤差的總和
+
+原始的 sessions / notes 只會新增，要細查某個 session 時用（都有 index）。
+week 是 ISO 週（"2026-W42"），字串比較就是時間順序。
+
+    store = AnalyticsStore()
+    session = store.begin_session("practice", song="twinkle.mid")
+    每個音：store.note(session, packet.timestamp, "C4", velocity=90, latency_ms=35.0, kind="hit", error_ms=-20.0)
+    結束：store.end_session(session, scorer.metrics())
+    查詢：store.accuracy_by_week() / store.slowest_notes() / store.recent_sessions()
+    store.close()
+"""
+import contextlib
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    mode TEXT NOT NULL,
+    song TEXT NOT NULL,
+    station INTEGER,
+    started REAL NOT NULL,
+    week TEXT NOT NULL,
+    ended REAL,
+    played INTEGER,
+    hits INTEGER,
+    wrong INTEGER,
+    missed INTEGER,
+    accuracy REAL,
+    mean_abs_error_ms REAL,
+    tempo_drift_pct REAL
+);
+CREATE INDEX IF NOT EXISTS sessions_started ON sessions (started);
+CREATE INDEX IF NOT EXISTS sessions_song_week ON sessions (song, week);
+
+CREATE TABLE IF NOT EXISTS notes (
+    session INTEGER NOT NULL,
+    t REAL NOT NULL,
+    note TEXT NOT NULL,
+    velocity INTEGER,
+    latency_ms REAL,
+    kind TEXT NOT NULL,
+    error_ms REAL
+);
+CREATE INDEX IF NOT EXISTS notes_session ON notes (session);
+
+CREATE TABLE IF NOT EXISTS song_weeks (
+    song TEXT NOT NULL,
+    week TEXT NOT NULL,
+    sessions INTEGER NOT NULL DEFAULT 0,
+    played INTEGER NOT NULL DEFAULT 0,
+    hits INTEGER NOT NULL DEFAULT 0,
+    wrong INTEGER NOT NULL DEFAULT 0,
+    missed INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (song, week)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS song_weeks_week ON song_weeks (week);
+
+CREATE TABLE IF NOT EXISTS note_weeks (
+    song TEXT NOT NULL,
+    week TEXT NOT NULL,
+    note TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    hits INTEGER NOT NULL DEFAULT 0,
+    wrong INTEGER NOT NULL DEFAULT 0,
+    latency_sum REAL NOT NULL DEFAULT 0,
+    latency_n INTEGER NOT NULL DEFAULT 0,
+    error_sum REAL NOT NULL DEFAULT 0,
+    error_n INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (song, week, note)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS note_weeks_week ON note_weeks (week);
+"""
+
+# slowest_notes 可以排序的欄位
+SLOW_BY = {
+    "error": ("error_sum", "error_n"),          # 比參考曲子晚多少（練習模式）
+    "latency": ("latency_sum", "latency_n"),    # 相機拍到 → 送出聲音
+}
+
+
+def week_of(timestamp):
+    """ISO 週，例如 "2026-W42"（本地時間）"""
+    return time.strftime("%G-W%V", time.localtime(timestamp))
+
+
+class Session:
+    """
+    begin_session 回傳的把手；id 等 writer 的 transaction commit 之後才有。
+    寫 session 的 transaction 失敗時 dropped = True，之後這個 session 的音 / 結束都不寫。
+    """
+    def __init__(self, mode, song, station, started):
+        self.id = None
+        self.dropped = False
+        self.mode = mode
+        self.song = song
+        self.station = station
+        self.started = started
+        self.week = week_of(started)
+        self.t0 = None              # 第一個音的時間（notes.t 是從這裡算的秒數）
+        self.notes = 0
+        self.ended = False
+
+
+class AnalyticsStore:
+    def __init__(self, path="records/analytics.db", batch_size=512, flush_s=0.5):
+        """
+        path      : SQLite 檔（資料夾不存在會建立）
+        batch_size: 一個 transaction 最多寫幾個事件
+        flush_s   : 事件最多在 queue 裡等這麼久就寫
+        """
+        self.path = os.path.abspath(path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.batch_size = batch_size
+        self.flush_s = flush_s
+
+        with contextlib.closing(self._connect()) as conn:
+            if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                conn.executescript(SCHEMA)
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            # WAL：writer 寫的時候查詢照樣可以讀
+            conn.execute("PRAGMA journal_mode = WAL")
+
+        self.pending = queue.Queue()
+        self.closed = False
+
+        # 統計（只有 writer 改）
+        self.sessions_written = 0
+        self.notes_written = 0
+        self.batches = 0
+        self.write_ms = 0.0
+        self.failed = 0
+        self.dropped = 0
+
+        self.worker = threading.Thread(target=self._loop, name="analytics", daemon=True)
+        self.worker.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10.0)
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    # ---- 主迴圈呼叫（只丟進 queue） ----
+    def begin_session(self, mode, song=None, station=None, started=None):
+        """song: 練習的曲子（檔名）；錄音 / 自由彈奏是 None。started 預設現在（time.time）"""
+        session = Session(mode, song or "", station, started if started is not None else time.time())
+        self.pending.put(("session", session))
+        return session
+
+    def note(self, session, t, note, velocity=None, latency_ms=None, kind="play", error_ms=None):
+        """
+        t       : 這個音的時間（packet.timestamp）
+        kind    : "hit" / "wrong"（練習模式的判定），錄音模式是 "play"
+        error_ms: 跟參考曲子預期時間的差（晚為正）；沒有判定時是 None
+        """
+        if session.t0 is None:
+            session.t0 = t
+        session.notes += 1
+        self.pending.put(("note", session, (t - session.t0, note, velocity, latency_ms, kind, error_ms)))
+
+    def end_session(self, session, summary=None):
+        """summary: Scorer.metrics()（練習模式）；沒有的話只記結束時間與音數"""
+        if session.ended:
+            return
+        session.ended = True
+        self.pending.put(("end", session, dict(summary or {}), time.time()))
+
+    def flush(self):
+        """等目前 queue 裡的事件都寫進去（查詢前想看到最新的資料時用）"""
+        if self.closed:
+            return
+        done = threading.Event()
+        self.pending.put(("flush", done))
+        done.wait()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.pending.put(None)
+        self.worker.join()
+
+    # ---- writer thread ----
+    def _loop(self):
+        conn = self._connect()
+        stop = False
+        while not stop:
+            batch = [self.pending.get()]
+            deadline = time.monotonic() + self.flush_s
+            while len(batch) < self.batch_size and batch[-1] is not None and batch[-1][0] != "flush":
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            if batch[-1] is None:
+                stop = True
+                batch.pop()
+            flushed = [item[1] for item in batch if item[0] == "flush"]
+            items = [item for item in batch if item[0] != "flush"]
+            try:
+                self._write(conn, items)
+            except sqlite3.Error as e:
+                lost = [item for item in items if not item[1].dropped]
+                self.failed += len(lost)
+                # rollback 掉的 session 沒有 id：後面的音不能寫成 session = NULL，整個 session 丟掉
+                for item in lost:
+                    if item[1].id is None:
+                        item[1].dropped = True
+                print(f"Analytics write failed: {e}")
+            for done in flushed:
+                done.set()
+        conn.close()
+
+    def _write(self, conn, batch):
+        live = [item for item in batch if not item[1].dropped]
+        self.dropped += len(batch) - len(live)
+        if not live:
+            return
+        t0 = time.perf_counter()
+        ids = {}            # 這個 batch 新增的 session → rowid；commit 成功才設到 session.id
+        notes = []
+        note_weeks = {}     # (song, week, note) → [count, hits, wrong, latency_sum, latency_n, error_sum, error_n]
+        song_weeks = {}     # (song, week) → [sessions, played, hits, wrong, missed]
+        with conn:
+            for item in live:
+                kind, session = item[0], item[1]
+                key = (session.song, session.week)
+                if kind == "session":
+                    cur = conn.execute(
+                        "INSERT INTO sessions (mode, song, station, started, week) VALUES (?, ?, ?, ?, ?)",
+                        (session.mode, session.song, session.station, session.started, session.week))
+                    ids[session] = cur.lastrowid
+                    song_weeks.setdefault(key, [0, 0, 0, 0, 0])[0] += 1
+                elif kind == "note":
+                    t, note, velocity, latency_ms, judged, error_ms = item[2]
+                    notes.append((ids.get(session, session.id), t, note, velocity, latency_ms, judged, error_ms))
+                    hit, wrong = judged == "hit", judged == "wrong"
+                    s = song_weeks.setdefault(key, [0, 0, 0, 0, 0])
+                    s[1] += 1
+                    s[2] += hit
+                    s[3] += wrong
+                    n = note_weeks.setdefault(key + (note,), [0, 0, 0, 0.0, 0, 0.0, 0])
+                    n[0] += 1
+                    n[1] += hit
+                    n[2] += wrong
+                    if latency_ms is not None:
+                        n[3] += latency_ms
+                        n[4] += 1
+                    if error_ms is not None:
+                        n[5] += error_ms
+                        n[6] += 1
+                else:
+                    summary, ended = item[2], item[3]
+                    conn.execute(
+                        "UPDATE sessions SET ended = ?, played = ?, hits = ?, wrong = ?, missed = ?,"
+                        " accuracy = ?, mean_abs_error_ms = ?, tempo_drift_pct = ? WHERE id = ?",
+                        (ended, summary.get("played", session.notes), summary.get("hits"),
+                         summary.get("wrong_notes"), summary.get("missed"), summary.get("accuracy"),
+                         summary.get("mean_abs_error_ms"), summary.get("tempo_drift_pct"),
+                         ids.get(session, session.id)))
+                    song_weeks.setdefault(key, [0, 0, 0, 0, 0])[4] += summary.get("missed") or 0
+
+            conn.executemany("INSERT INTO notes VALUES (?, ?, ?, ?, ?, ?, ?)", notes)
+            conn.executemany(
+                "INSERT INTO song_weeks VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (song, week) DO UPDATE SET"
+                " sessions = sessions + excluded.sessions, played = played + excluded.played,"
+                " hits = hits + excluded.hits, wrong = wrong + excluded.wrong, missed = missed + excluded.missed",
+                [k + tuple(v) for k, v in song_weeks.items()])
+            conn.executemany(
+                "INSERT INTO note_weeks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (song, week, note)"
+                " DO UPDATE SET count = count + excluded.count, hits = hits + excluded.hits,"
+                " wrong = wrong + excluded.wrong,"
+                " latency_sum = latency_sum + excluded.latency_sum, latency_n = latency_n + excluded.latency_n,"
+                " error_sum = error_sum + excluded.error_sum, error_n = error_n + excluded.error_n",
+                [k + tuple(v) for k, v in note_weeks.items()])
+        for session, rowid in ids.items():
+            session.id = rowid
+        self.sessions_written += len(ids)
+        self.notes_written += len(notes)
+        self.batches += 1
+        self.write_ms += (time.perf_counter() - t0) * 1000
+
+    # ---- 查詢（呼叫的 thread 自己開連線；WAL 下不會等 writer） ----
+    def _query(self, sql, params=()):
+        with contextlib.closing(sqlite3.connect(self.path, timeout=10.0)) as conn:
+            conn.row_factory = sqlite3.Row
+            return [dict(row) for row in conn.execute(sql, params)]
+
+    def accuracy_by_week(self, song=None, since=None):
+        """
+        每首每週的命中率（hits / (hits + wrong)）與完成度（hits / (hits + missed)）。
+        song / since（週，例如 "2026-W40"）可以篩選；只列有判定的曲子（練習模式）。
+        """
+        where, params = ["hits + wrong > 0"], []
+        if song is not None:
+            where.append("song = ?")
+            params.append(song)
+        if since is not None:
+            where.append("week >= ?")
+            params.append(since)
+        rows = self._query(
+            "SELECT song, week, sessions, played, hits, wrong, missed FROM song_weeks"
+            f" WHERE {' AND '.join(where)} ORDER BY song, week", params)
+        for row in rows:
+            row["accuracy"] = round(row["hits"] / (row["hits"] + row["wrong"]), 3)
+            reached = row["hits"] + row["missed"]
+            row["completion"] = round(row["hits"] / reached, 3) if reached else None
+        return rows
+
+    def slowest_notes(self, limit=10, by="error", song=None, since=None, min_count=5):
+        """
+        平均最慢的音：by="error" 是比參考曲子晚多少（練習模式），"latency" 是相機到聲音的延遲。
+        次數少於 min_count 的音不列（幾次的平均不準）。
+        """
+        total, count = SLOW_BY[by]
+        where, params = [f"{count} > 0"], []
+        if song is not None:
+            where.append("song = ?")
+            params.append(song)
+        if since is not None:
+            where.append("week >= ?")
+            params.append(since)
+        params += [min_count, limit]
+        rows = self._query(
+            f"SELECT note, SUM({total}) / SUM({count}) AS mean_ms, SUM({count}) AS n,"
+            " SUM(hits) AS hits, SUM(wrong) AS wrong FROM note_weeks"
+            f" WHERE {' AND '.join(where)} GROUP BY note HAVING n >= ? ORDER BY mean_ms DESC LIMIT ?", params)
+        for row in rows:
+            row["mean_ms"] = round(row["mean_ms"], 1)
+        return rows
+
+    def recent_sessions(self, limit=20):
+        return self._query("SELECT * FROM sessions ORDER BY started DESC LIMIT ?", (limit,))
+
+    def session_notes(self, session_id):
+        return self._query("SELECT t, note, velocity, latency_ms, kind, error_ms FROM notes"
+                           " WHERE session = ? ORDER BY t", (session_id,))
+
+    def metrics(self):
+        return {
+            "sessions": self.sessions_written,
+            "notes": self.notes_written,
+            "batches": self.batches,
+            "write_ms": round(self.write_ms, 1),
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "pending": self.pending.qsize(),
+        }
@@ -0,0 +1,351 @@
+# utils/audio_engine.py
+"""
+自己的混音器：所有發聲中的 voice 在 callback 裡用 NumPy 加總成一個小 block 輸出。
+
+  Mixer           voice 管理、release envelope、voice stealing
+  *Backend        把 Mixer.render() 的結果送到某個地方
+                    sounddevice : PortAudio callback（最低延遲，需要 pip install sounddevice）
+                    pygame      : 沒有 sounddevice 時，用單一 pygame Channel 排隊播放 block
+                    file        : 寫成 .wav（headless 測試用）
+                    null        : 不輸出
+  AudioEngine     依名稱挑 backend，回報實際輸出延遲
+"""
+import threading
+import time
+import wave
+
+import numpy as np
+
+
+def load_wav(path, sample_rate=44100, channels=2):
+    """讀 16-bit PCM wav → float32 (N, channels)，必要時線性重新取樣"""
+    with wave.open(path, "rb") as wf:
+        n_channels = wf.getnchannels()
+        width = wf.getsampwidth()
+        rate = wf.getframerate()
+        raw = wf.readframes(wf.getnframes())
+
+    if width != 2:
+        raise ValueError(f"Only 16-bit wav is supported: {path}")
+
+    data = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    data = data.reshape(-1, n_channels)
+
+    if rate != sample_rate:
+        data = resample(data, rate / sample_rate)
+    return match_channels(data, channels)
+
+
+def resample(data, ratio):
+    """ratio > 1 → 變短（音變高）；線性內插"""
+    n_out = int(len(data) / ratio)
+    src = np.arange(n_out) * ratio
+    idx = np.arange(len(data))
+    return np.stack([np.interp(src, idx, data[:, c]) for c in range(data.shape[1])],
+                    axis=1).astype(np.float32)
+
+
+def match_channels(data, channels):
+    if data.shape[1] == channels:
+        return np.ascontiguousarray(data, dtype=np.float32)
+    mono = data.mean(axis=1, keepdims=True)
+    return np.ascontiguousarray(np.repeat(mono, channels, axis=1), dtype=np.float32)
+
+
+class Voice:
+    __slots__ = ("note", "data", "pos", "gain", "level", "release_step", "serial", "stolen")
+
+    def __init__(self, note, data, gain, serial):
+        self.note = note
+        self.data = data
+        self.pos = 0
+        self.gain = gain
+        self.level = 1.0            # envelope 目前的值
+        self.release_step = 0.0     # 每個 sample 減少多少；0 = 還按著
+        self.serial = serial
+        self.stolen = False         # 被搶走、正在快速淡出
+
+
+class Mixer:
+    def __init__(self, sample_rate=44100, channels=2, block_size=256,
+                 max_voices=32, release_ms=80, steal_ms=5):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.block_size = block_size
+        self.max_voices = max_voices
+        self.release_samples = max(int(sample_rate * release_ms / 1000), 1)
+        self.steal_samples = max(int(sample_rate * steal_ms / 1000), 1)
+
+        self.voices = []
+        self.held = {}          # note → 還按著的 Voice
+        self.serial = 0
+        self.lock = threading.Lock()
+
+        # 統計
+        self.blocks = 0
+        self.stolen = 0
+        self.peak_voices = 0
+
+    def note_on(self, note, data, gain=1.0):
+        with self.lock:
+            # 同一個音重按：舊的淡出，不要硬切
+            old = self.held.pop(note, None)
+            if old is not None:
+                self._steal(old)
+
+            # voice 不夠用 → 搶一個：優先搶已經在 release、音量最小的，再來是最舊的
+            candidates = [v for v in self.voices if not v.stolen]
+            if len(candidates) >= self.max_voices:
+                victim = min(candidates, key=lambda v: (v.release_step == 0, v.level, v.serial))
+                self._steal(victim)
+                if self.held.get(victim.note) is victim:
+                    del self.held[victim.note]
+                self.stolen += 1
+
+            self.serial += 1
+            voice = Voice(note, data, gain, self.serial)
+            self.voices.append(voice)
+            self.held[note] = voice
+            self.peak_voices = max(self.peak_voices, len(self.voices))
+
+    def note_off(self, note):
+        with self.lock:
+            voice = self.held.pop(note, None)
+            if voice is not None:
+                self._release(voice, self.release_samples)
+
+    def _steal(self, voice):
+        voice.stolen = True
+        self._release(voice, self.steal_samples)
+
+    def _release(self, voice, samples):
+        step = voice.level / samples
+        # 已經在更快淡出就不要放慢
+        voice.release_step = max(voice.release_step, step)
+
+    def render(self, frames=None, out=None):
+        """混出 frames 個 sample → float32 (frames, channels)"""
+        frames = frames or self.block_size
+        if out is None:
+            out = np.zeros((frames, self.channels), dtype=np.float32)
+        else:
+            out.fill(0)
+
+        with self.lock:
+            alive = []
+            for v in self.voices:
+                n = min(frames, len(v.data) - v.pos)
+                if n <= 0:
+                    self._drop(v)
+                    continue
+
+                chunk = v.data[v.pos:v.pos + n]
+                if v.release_step:
+                    env = v.level - v.release_step * np.arange(1, n + 1, dtype=np.float32)
+                    np.maximum(env, 0.0, out=env)
+                    out[:n] += chunk * (env * v.gain)[:, None]
+                    v.level = float(env[-1])
+                else:
+                    out[:n] += chunk * v.gain
+
+                v.pos += n
+                if v.level <= 0.0 or v.pos >= len(v.data):
+                    self._drop(v)
+                else:
+                    alive.append(v)
+            self.voices = alive
+            self.blocks += 1
+
+        np.clip(out, -1.0, 1.0, out=out)
+        return out
+
+    def _drop(self, voice):
+        if self.held.get(voice.note) is voice:
+            del self.held[voice.note]
+
+    def active_voices(self):
+        with self.lock:
+            return len(self.voices)
+
+
+class NullBackend:
+    """
+    不輸出聲音。realtime=True 時用一條 thread 以實際速度消耗 block，
+    否則由呼叫端 pump() 推進（測試用，完全可重現）。
+    """
+    name = "null"
+
+    def __init__(self, mixer, realtime=False):
+        self.mixer = mixer
+        self.realtime = realtime
+        self.running = False
+        self.thread = None
+        self.buffer = np.zeros((mixer.block_size, mixer.channels), dtype=np.float32)
+
+    def start(self):
+        if not self.realtime or self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, name="audio", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+
+    def pump(self, n_blocks=1):
+        for _ in range(n_blocks):
+            self._consume(self.mixer.render(out=self.buffer))
+
+    def device_latency(self):
+        return 0.0
+
+    def _consume(self, block):
+        pass
+
+    def _loop(self):
+        period = self.mixer.block_size / self.mixer.sample_rate
+        next_t = time.perf_counter()
+        while self.running:
+            self._consume(self.mixer.render(out=self.buffer))
+            next_t += period
+            delay = next_t - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_t = time.perf_counter()
+
+
+class FileBackend(NullBackend):
+    """把混音結果寫成 16-bit wav"""
+    name = "file"
+
+    def __init__(self, mixer, path="audio_out.wav", realtime=False):
+        super().__init__(mixer, realtime)
+        self.path = path
+        self.wf = wave.open(path, "wb")
+        self.wf.setnchannels(mixer.channels)
+        self.wf.setsampwidth(2)
+        self.wf.setframerate(mixer.sample_rate)
+
+    def stop(self):
+        super().stop()
+        if self.wf is not None:
+            self.wf.close()
+            self.wf = None
+
+    def _consume(self, block):
+        if self.wf is not None:
+            self.wf.writeframes((block * 32767).astype("<i2").tobytes())
+
+
+class SoundDeviceBackend:
+    """PortAudio callback，每次 callback 混一個 block"""
+    name = "sounddevice"
+
+    def __init__(self, mixer):
+        import sounddevice as sd
+
+        self.mixer = mixer
+        self.stream = sd.OutputStream(
+            samplerate=mixer.sample_rate,
+            blocksize=mixer.block_size,
+            channels=mixer.channels,
+            dtype="float32",
+            latency="low",
+            callback=self._callback,
+        )
+        self.underruns = 0
+
+    def _callback(self, outdata, frames, time_info, status):
+        if status.output_underflow:
+            self.underruns += 1
+        self.mixer.render(frames, out=outdata)
+
+    def start(self):
+        self.stream.start()
+
+    def stop(self):
+        self.stream.stop()
+        self.stream.close()
+
+    def device_latency(self):
+        return float(self.stream.latency)
+
+
+class PygameBackend(NullBackend):
+    """
+    沒有 sounddevice 時的替代方案：混好的 block 依序排進同一個 pygame Channel。
+    混音仍然是我們自己做，只是多了 pygame 的輸出 buffer。
+    """
+    name = "pygame"
+
+    def __init__(self, mixer):
+        import pygame
+
+        super().__init__(mixer, realtime=True)
+        self.pygame = pygame
+        pygame.mixer.init(frequency=mixer.sample_rate, size=-16,
+                          channels=mixer.channels, buffer=mixer.block_size)
+        self.channel = pygame.mixer.Channel(0)
+
+    def _loop(self):
+        period = self.mixer.block_size / self.mixer.sample_rate
+        while self.running:
+            # 正在播一個、後面已經排了一個 → 等一下
+            if self.channel.get_queue() is not None:
+                time.sleep(period / 2)
+                continue
+            block = self.mixer.render(out=self.buffer)
+            sound = self.pygame.mixer.Sound(buffer=(block * 32767).astype("<i2").tobytes())
+            if self.channel.get_busy():
+                self.channel.queue(sound)
+            else:
+                self.channel.play(sound)
+
+    def device_latency(self):
+        # 排隊的那一個 block + pygame 自己的 buffer
+        return 2 * self.mixer.block_size / self.mixer.sample_rate
+
+
+class AudioEngine:
+    BACKENDS = ("auto", "sounddevice", "pygame", "file", "null")
+
+    def __init__(self, backend="auto", sample_rate=44100, channels=2,
+                 block_size=256, max_voices=32, release_ms=80, path="audio_out.wav"):
+        self.mixer = Mixer(sample_rate, channels, block_size, max_voices, release_ms)
+
+        if backend == "auto":
+            try:
+                self.backend = SoundDeviceBackend(self.mixer)
+            except Exception as e:
+                print(f"sounddevice unavailable ({e}), using pygame output")
+                self.backend = PygameBackend(self.mixer)
+        elif backend == "sounddevice":
+            self.backend = SoundDeviceBackend(self.mixer)
+        elif backend == "pygame":
+            self.backend = PygameBackend(self.mixer)
+        elif backend == "file":
+            self.backend = FileBackend(self.mixer, path, realtime=True)
+        elif backend == "null":
+            self.backend = NullBackend(self.mixer)
+        else:
+            raise ValueError(f"Unknown audio backend: {backend}")
+
+        self.backend.start()
+
+    def latency(self):
+        """輸出延遲（毫秒）：一個 block 的長度 + 裝置回報的延遲"""
+        block = self.mixer.block_size / self.mixer.sample_rate
+        device = self.backend.device_latency()
+        return {
+            "backend": self.backend.name,
+            "block_ms": round(block * 1000, 2),
+            "device_ms": round(device * 1000, 2),
+            "total_ms": round((block + device) * 1000, 2),
+        }
+
+    def close(self):
+        self.backend.stop()
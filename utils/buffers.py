@@ -0,0 +1,48 @@
+# utils/buffers.py
+"""
+重複使用的 numpy buffer，讓每張 frame 的處理不用重新配置記憶體。
+
+BufferPool 是 free list：acquire() 拿一塊、release() 還回去。
+pool 空了就配置新的（allocated 會增加），所以不會因為有人拿太久而出錯，
+穩定之後 allocated 就不會再變。
+"""
+import collections
+
+import numpy as np
+
+
+class BufferPool:
+    def __init__(self, shape=None, dtype=np.uint8, prealloc=0):
+        """
+        shape: None 表示還不知道（例如相機解析度），第一次 reset() 時才決定
+        """
+        self.shape = tuple(shape) if shape is not None else None
+        self.dtype = np.dtype(dtype)
+        self.free = collections.deque()
+        self.allocated = 0
+        for _ in range(prealloc if shape is not None else 0):
+            self.free.append(self._new())
+
+    def reset(self, shape, dtype=None):
+        """換尺寸：舊的 buffer 全部丟掉，之後還回來的舊尺寸 buffer 也不收"""
+        self.shape = tuple(shape)
+        if dtype is not None:
+            self.dtype = np.dtype(dtype)
+        self.free.clear()
+
+    def acquire(self):
+        """拿一塊 buffer（內容是上一次用剩的）；shape 還沒決定時回傳 None"""
+        if self.shape is None:
+            return None
+        try:
+            return self.free.pop()
+        except IndexError:
+            return self._new()
+
+    def release(self, buf):
+        if buf is not None and buf.shape == self.shape and buf.dtype == self.dtype:
+            self.free.append(buf)
+
+    def _new(self):
+        self.allocated += 1
+        return np.empty(self.shape, dtype=self.dtype)
@@ -0,0 +1,34 @@
+# utils/clock.py
+import contextlib
+import threading
+import time
+
+# 所有 UI 計時（校正 1.5 秒、Exit UI 3 秒、選曲 hover 2 秒…）都經過這裡，
+# 重播模式可以換成依 frame 時間前進的時鐘，讓結果跟實際跑多快無關。
+_now = time.time
+
+# 同一個 process 有好幾個 station 時，每個 thread 可以暫時用自己的時鐘
+_local = threading.local()
+
+
+def now():
+    fn = getattr(_local, "now", None)
+    return fn() if fn is not None else _now()
+
+
+def set_clock(fn):
+    """替換時鐘；傳 None 還原成 time.time"""
+    global _now
+    _now = fn if fn is not None else time.time
+
+
+@contextlib.contextmanager
+def using(fn):
+    """with clock.using(fn): 只有目前這個 thread 改用 fn；fn 為 None 時不變"""
+    prev = getattr(_local, "now", None)
+    if fn is not None:
+        _local.now = fn
+    try:
+        yield
+    finally:
+        _local.now = prev
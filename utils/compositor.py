@@ -0,0 +1,134 @@
+# utils/compositor.py
+"""
+靜態 UI 圖層：版面改變時才畫一次到 BGRA 快取，之後每張 frame 只在圖層的外框範圍內貼上去。
+會變的東西（按下的鍵、hover、游標）仍然每張 frame 直接畫在 frame 上。
+
+  render_layer(shape, draw)  用 cv2 畫一次、算出透明度，裁成實際有畫到的外框 → Layer
+  Layer.blend(frame)         半透明底色（選用）+ 不透明的部分用 mask 複製 + 邊緣逐點混合
+  LayerCache                 依版面參數（key）快取 Layer，key 變了才重畫
+"""
+import cv2
+import numpy as np
+
+
+class Layer:
+    def __init__(self, image, x=0, y=0, backdrop=None, frame_w=None):
+        """
+        image   : (h, w, 4) BGRA，顏色已經乘上 alpha（premultiplied）
+        x, y    : 貼到 frame 上的左上角
+        backdrop: (x1, y1, x2, y2, color, alpha)，貼上 image 之前先在這個範圍混一層半透明底色
+        frame_w : frame 的寬度，用來把半透明像素換成攤平後的 index
+        """
+        self.x = x
+        self.y = y
+        self.h, self.w = image.shape[:2]
+        self.bgr = np.ascontiguousarray(image[:, :, :3])
+        alpha = image[:, :, 3]
+        # 幾乎不透明的部分整塊複製；文字邊緣（anti-aliasing）等半透明的像素另外逐點混合
+        opaque = alpha >= 250
+        self.mask = opaque.astype(np.uint8) * 255
+        ys, xs = np.nonzero((alpha > 0) & ~opaque)
+        self.frame_w = frame_w
+        self.soft_idx = (ys + y) * (frame_w or 0) + (xs + x)
+        self.soft_y = ys + y
+        self.soft_x = xs + x
+        # 8-bit 定點數：out = (under * keep + src) >> 8
+        self.soft_src = image[ys, xs, :3].astype(np.uint16) << 8
+        keep = 256 - (alpha[ys, xs, None].astype(np.uint16) * 256 + 127) // 255
+        # 展開成 (n, 3)：broadcast 的乘法每次都會配置暫存
+        self.soft_keep = np.ascontiguousarray(np.repeat(keep, 3, axis=1))
+        # 混合時用的暫存，每張 frame 重複使用
+        self.soft_under = np.empty((len(ys), 3), dtype=np.uint8)
+        self.soft_mix = np.empty((len(ys), 3), dtype=np.uint16)
+        self.backdrop = None
+        if backdrop is not None:
+            x1, y1, x2, y2, color, alpha = backdrop
+            fill = np.empty((y2 - y1, x2 - x1, 3), dtype=np.uint8)
+            fill[:] = color
+            self.backdrop = (x1, y1, x2, y2, fill, alpha)
+
+    @property
+    def rect(self):
+        return self.x, self.y, self.x + self.w, self.y + self.h
+
+    def blend(self, frame):
+        if self.backdrop is not None:
+            x1, y1, x2, y2, fill, alpha = self.backdrop
+            roi = frame[y1:y2, x1:x2]
+            # 直接寫回 frame 的那一塊，不複製整張 frame
+            cv2.addWeighted(fill, alpha, roi, 1.0 - alpha, 0, dst=roi)
+
+        if self.w and self.h:
+            roi = frame[self.y:self.y + self.h, self.x:self.x + self.w]
+            # cv2.copyTo 直接寫進 frame 的那一塊（比 np.copyto(where=) 快很多）
+            cv2.copyTo(self.bgr, self.mask, roi)
+
+        if len(self.soft_idx):
+            under = self.soft_under
+            mix = self.soft_mix
+            flat = None
+            if frame.shape[1] == self.frame_w and frame.flags.c_contiguous:
+                flat = frame.reshape(-1, 3)
+                # mode="clip"：out 不用先另外複製一份（index 本來就在範圍內）
+                np.take(flat, self.soft_idx, axis=0, out=under, mode="clip")
+            else:
+                under[:] = frame[self.soft_y, self.soft_x]
+            np.copyto(mix, under)
+            mix *= self.soft_keep
+            mix += self.soft_src
+            mix >>= 8
+            np.copyto(under, mix, casting="unsafe")
+            if flat is not None:
+                flat[self.soft_idx] = under
+            else:
+                frame[self.soft_y, self.soft_x] = under
+
+
+def render_layer(shape, draw, backdrop=None):
+    """
+    shape: frame.shape；draw(canvas) 用 cv2 畫在 (h, w, 3) 的畫布上（跟畫在 frame 上一樣）
+    回傳裁到實際有畫到的範圍的 Layer（frame 外的部分會被裁掉）
+
+    cv2 的文字有 anti-aliasing，不能直接畫在 BGRA 上（alpha 不會正確合成），
+    所以分別畫在黑底與白底上：兩張的差就是透明度，黑底那張就是乘好 alpha 的顏色。
+    """
+    h, w = shape[:2]
+    black = np.zeros((h, w, 3), dtype=np.uint8)
+    white = np.full((h, w, 3), 255, dtype=np.uint8)
+    draw(black)
+    draw(white)
+
+    diff = white.astype(np.int16) - black
+    alpha = np.clip(255 - diff.mean(axis=2), 0, 255).astype(np.uint8)
+    canvas = np.dstack([black, alpha])
+
+    if backdrop is not None:
+        x1, y1, x2, y2, color, a = backdrop
+        backdrop = (max(x1, 0), max(y1, 0), min(x2, w), min(y2, h), color, a)
+
+    rows = np.flatnonzero(alpha.any(axis=1))
+    cols = np.flatnonzero(alpha.any(axis=0))
+    if len(rows) == 0:
+        return Layer(canvas[:0, :0], backdrop=backdrop, frame_w=w)
+
+    y0, y1 = rows[0], rows[-1] + 1
+    x0, x1 = cols[0], cols[-1] + 1
+    return Layer(canvas[y0:y1, x0:x1], int(x0), int(y0), backdrop, w)
+
+
+class LayerCache:
+    def __init__(self):
+        self.key = None
+        self.layer = None
+        self.builds = 0
+
+    def get(self, key, build):
+        """key 跟上次一樣就回傳快取的 Layer，否則呼叫 build() 重畫"""
+        if self.layer is None or key != self.key:
+            self.layer = build()
+            self.key = key
+            self.builds += 1
+        return self.layer
+
+    def invalidate(self):
+        self.layer = None
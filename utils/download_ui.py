@@ -1,4 +1,5 @@
 import cv2
+from .compositor import LayerCache, render_layer
 
 class DownloadUI:
     def __init__(self):
@@ -9,6 +10,9 @@ class DownloadUI:
         self.default_color = (255, 255, 255)
         self.hover_color = (200, 255, 200)
 
+        # 按鈕沒 hover 的樣子是靜態圖層
+        self.layers = LayerCache()
+
     def build(self, frame_w, frame_h):
         cx = frame_w // 2
         cy = int(frame_h * 0.75)
@@ -35,16 +39,23 @@ class DownloadUI:
         if self.btn is None:
             return
 
-        (x1, y1, x2, y2, _) = self.btn
+        if hover:
+            self._draw_button(frame, self.hover_color)
+            return
 
-        color = self.hover_color if hover else self.default_color
+        key = (frame.shape, self.btn)
+        canvas_draw = lambda canvas: self._draw_button(canvas, self.default_color)
+        self.layers.get(key, lambda: render_layer(frame.shape, canvas_draw)).blend(frame)
+
+    def _draw_button(self, img, color):
+        (x1, y1, x2, y2, _) = self.btn
 
-        cv2.rectangle(frame, (x1, y1), (x2, y2),
+        cv2.rectangle(img, (x1, y1), (x2, y2),
                       (0, 0, 0), 2)
-        cv2.rectangle(frame, (x1, y1), (x2, y2),
+        cv2.rectangle(img, (x1, y1), (x2, y2),
                       color, -1)
 
-        cv2.putText(frame, "Download MIDI",
+        cv2.putText(img, "Download MIDI",
                     (x1 + 15, y1 + 50),
                     cv2.FONT_HERSHEY_SIMPLEX,
                     0.8, (0, 0, 0), 3)
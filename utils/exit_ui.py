@@ -1,5 +1,6 @@
 import cv2
-import time
+from . import clock
+from .compositor import LayerCache, render_layer
 
 class ExitUI:
     def __init__(self):
@@ -15,6 +16,9 @@ class ExitUI:
         self.default_color = (255, 255, 255)
         self.hover_color = (255, 200, 200)
 
+        # 兩個按鈕沒 hover 的樣子是靜態圖層
+        self.layers = LayerCache()
+
     # 關閉系統的方式：雙手離開畫面3秒鐘以上，則會跳出退出或重新開始的選擇，若為record模式，則可以下載
     def update(self, left_up, right_up):
         if self.visible:
@@ -22,9 +26,9 @@ class ExitUI:
 
         if left_up and right_up:
             if self.trigger_time is None:
-                self.trigger_time = time.time()
+                self.trigger_time = clock.now()
             else:
-                if time.time() - self.trigger_time >= 3.0:
+                if clock.now() - self.trigger_time >= 3.0:
                     self.visible = True
         else:
             self.trigger_time = None
@@ -66,21 +70,27 @@ class ExitUI:
         if not self.visible:
             return
 
+        key = (frame.shape, self.restart_btn, self.exit_btn)
+        self.layers.get(key, lambda: render_layer(frame.shape, self._draw_static)).blend(frame)
+
         for btn in [self.restart_btn, self.exit_btn]:
-            (x1, y1, x2, y2, mode) = btn
+            if hover == btn[4]:
+                self._draw_button(frame, btn, self.hover_color)
 
-            if hover == mode:
-                color = self.hover_color
-            else:
-                color = self.default_color
-
-            cv2.rectangle(frame, (x1, y1), (x2, y2),
-                          (0, 0, 0), 2)
-            cv2.rectangle(frame, (x1, y1), (x2, y2),
-                          color, -1)
-
-            text = "Restart" if mode == "restart" else "Exit"
-            cv2.putText(frame, text,
-                        (x1 + 25, y1 + 45),
-                        cv2.FONT_HERSHEY_SIMPLEX,
-                        0.8, (0, 0, 0), 3)
+    def _draw_static(self, canvas):
+        for btn in [self.restart_btn, self.exit_btn]:
+            self._draw_button(canvas, btn, self.default_color)
+
+    def _draw_button(self, img, btn, color):
+        (x1, y1, x2, y2, mode) = btn
+
+        cv2.rectangle(img, (x1, y1), (x2, y2),
+                      (0, 0, 0), 2)
+        cv2.rectangle(img, (x1, y1), (x2, y2),
+                      color, -1)
+
+        text = "Restart" if mode == "restart" else "Exit"
+        cv2.putText(img, text,
+                    (x1 + 25, y1 + 45),
+                    cv2.FONT_HERSHEY_SIMPLEX,
+                    0.8, (0, 0, 0), 3)
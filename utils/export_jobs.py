@@ -0,0 +1,160 @@
+# utils/export_jobs.py
+"""
+錄音存檔、MuseScore 轉 PDF、開啟播放都放到背景 worker thread，
+主迴圈只負責送出工作、每張 frame 讀一下 job 的狀態來顯示進度。
+"""
+import os
+import queue
+import shlex
+import subprocess
+import threading
+
+from . import clock
+
+MUSESCORE_PATHS = [
+    r"/Applications/MuseScore 4.app/Contents/MacOS/mscore",
+    r"C:\Program Files\MuseScore 4\bin\MuseScore4.exe",
+    "/usr/bin/mscore4portable",
+    "/usr/bin/mscore",
+]
+
+
+def default_converter():
+    """
+    轉檔指令樣板，{midi} / {pdf} 會換成檔案路徑。
+    AIRPIANO_SCORE_CONVERTER 環境變數優先（例如測試時換成假的 converter），
+    否則找本機的 MuseScore；都沒有就回傳 None（只存 MIDI）。
+    """
+    env = os.environ.get("AIRPIANO_SCORE_CONVERTER")
+    if env:
+        return shlex.split(env)
+    for path in MUSESCORE_PATHS:
+        if os.path.exists(path):
+            return [path, "-o", "{pdf}", "{midi}"]
+    return None
+
+
+class ExportJob:
+    STATUS_TEXT = {
+        "queued": "Waiting to save...",
+        "saving": "Saving MIDI...",
+        "converting": "Converting to PDF...",
+        "post": "Opening score...",
+        "done": "Saved",
+        "failed": "Export failed",
+    }
+
+    def __init__(self, job_id, mid, midi_path):
+        self.id = job_id
+        self.mid = mid
+        self.midi_path = midi_path
+        self.pdf_path = os.path.splitext(midi_path)[0] + ".pdf"
+
+        self.status = "queued"
+        self.progress = 0.0
+        self.error = None
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed")
+
+    def describe(self):
+        text = self.STATUS_TEXT[self.status]
+        if self.status == "done":
+            return f"{text}: {os.path.basename(self.midi_path)}"
+        if self.status == "failed":
+            return f"{text}: {self.error}"
+        return f"{text} {int(self.progress * 100)}%"
+
+
+class ExportQueue:
+    def __init__(self, converter="default", post_process=None, timeout=120):
+        """
+        converter   : 指令樣板 list（含 {midi} / {pdf}）、callable(midi_path, pdf_path)，
+                      None 表示不轉 PDF；"default" 用 default_converter()
+        post_process: callable(job)，轉檔後執行（預設：有 MuseScore 時開啟並播放）
+        """
+        if converter == "default":
+            converter = default_converter()
+            # 只有找到的是本機的 MuseScore 才開啟播放（AIRPIANO_SCORE_CONVERTER 換掉的 converter 不開）
+            if post_process is None and converter is not None and converter[0] in MUSESCORE_PATHS:
+                # 開啟播放會用到 pyautogui（export_midi 在按播放時才 import）
+                from .export_midi import open_and_play_musescore
+                post_process = lambda job: open_and_play_musescore(job.midi_path, converter[0])
+        self.converter = converter
+        self.post_process = post_process
+        self.timeout = timeout
+
+        self.jobs = []
+        self.pending = queue.Queue()
+        self.lock = threading.Lock()
+        self.next_id = 1
+
+        self.worker = threading.Thread(target=self._loop, name="export", daemon=True)
+        self.worker.start()
+
+    def submit(self, mid, midi_path):
+        """mid: mido.MidiFile（錄完就不會再改）"""
+        with self.lock:
+            job = ExportJob(self.next_id, mid, midi_path)
+            self.next_id += 1
+            self.jobs.append(job)
+        self.pending.put(job)
+        return job
+
+    def latest(self):
+        with self.lock:
+            return self.jobs[-1] if self.jobs else None
+
+    def close(self, wait=True):
+        self.pending.put(None)
+        if wait:
+            self.worker.join()
+
+    def _loop(self):
+        while True:
+            job = self.pending.get()
+            if job is None:
+                break
+            try:
+                self._run(job)
+                status = "done"
+            except Exception as e:
+                job.error = str(e)
+                status = "failed"
+                print(f"Export failed: {e}")
+            job.progress = 1.0
+            job.finished_at = clock.now()
+            # 最後才改 status，UI 看到 finished 時 finished_at 一定已經有值
+            job.status = status
+
+    def _run(self, job):
+        job.status = "saving"
+        os.makedirs(os.path.dirname(job.midi_path) or ".", exist_ok=True)
+        job.mid.save(job.midi_path)
+        job.progress = 0.3
+        print(f"MIDI saved to {job.midi_path}")
+
+        if self.converter is not None:
+            job.status = "converting"
+            self._convert(job)
+            job.progress = 0.8
+
+        if self.post_process is not None:
+            job.status = "post"
+            self.post_process(job)
+
+    def _convert(self, job):
+        if callable(self.converter):
+            ok = self.converter(job.midi_path, job.pdf_path)
+            if ok is False:
+                raise RuntimeError("converter reported failure")
+            return
+
+        abs_midi = os.path.abspath(job.midi_path)
+        abs_pdf = os.path.abspath(job.pdf_path)
+        cmd = [arg.replace("{midi}", abs_midi).replace("{pdf}", abs_pdf) for arg in self.converter]
+        subprocess.run(cmd, check=True, timeout=self.timeout,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        print(f"PDF saved to {abs_pdf}")
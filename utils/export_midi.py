@@ -3,8 +3,7 @@ import mido
 import time
 import os
 import subprocess
-import pyautogui
-from .keyboard import NOTE_MAP
+from .layout import note_to_midi
 
 def save_notes_to_midi(note_list, output_filename):
     if not note_list:
@@ -24,8 +23,10 @@ def save_notes_to_midi(note_list, output_filename):
     note_duration = 0.4 # 假設每個音彈 0.4 秒
     
     for note_name, start_time in note_list:
-        midi_pitch = NOTE_MAP.get(note_name)
-        if midi_pitch is None: continue
+        try:
+            midi_pitch = note_to_midi(note_name)
+        except ValueError:
+            continue
         
         # Note On
         all_events.append((start_time, mido.Message('note_on', note=midi_pitch, velocity=90)))
@@ -49,13 +50,10 @@ def save_notes_to_midi(note_list, output_filename):
         print(f"儲存失敗: {e}")
         return False
 
-def open_and_play_musescore(midi_filename):
+def open_and_play_musescore(midi_filename, ms4_path=r"C:\Program Files\MuseScore 4\bin\MuseScore4.exe"):
 
-    # Windows 預設路徑通常是這個：
-    ms4_path = r"C:\Program Files\MuseScore 4\bin\MuseScore4.exe"
-    
-    # macOS 可能是這個：
-    # ms4_path = "/Applications/MuseScore 4.app/Contents/MacOS/mscore"
+    # ms4_path 預設是 Windows 的路徑；ExportQueue 會傳入找到的 MuseScore
+    # （macOS 等其他平台的路徑見 utils/export_jobs.py 的 MUSESCORE_PATHS）
 
     # 檢查路徑是否存在
     if not os.path.exists(ms4_path):
@@ -82,6 +80,8 @@ def open_and_play_musescore(midi_filename):
     # 3. 模擬按下空白鍵 (播放)
     # 為了保險，先點一下滑鼠左鍵確保視窗有被選取 (Focus)
     # 這裡抓螢幕中心點點一下 (MuseScore 通常會開在中間)
+    # pyautogui 要有桌面環境才載入得了，只在真的要按播放時才 import
+    import pyautogui
     screen_w, screen_h = pyautogui.size()
     pyautogui.click(screen_w // 2, screen_h // 2)
     
@@ -141,6 +141,7 @@ def process_recording(midi_filename):
     
     time.sleep(8) 
     
+    import pyautogui
     screen_w, screen_h = pyautogui.size()
     pyautogui.click(screen_w // 2, screen_h // 2)
     time.sleep(0.5)
@@ -0,0 +1,152 @@
+# utils/filters.py
+"""
+One-Euro filter（Casiez et al. 2012）：速度慢時 cutoff 低、濾掉抖動；
+速度快時 cutoff 拉高、減少延遲。另外保留濾過的速度，可以往前預測。
+
+  OneEuroFilter    單一數值（或一組數值）的濾波器，取代舊的 smooth_value
+  FingertipFilter  10 根手指（finger_slots 的編號）各自一組狀態，放在
+                   extract_finger_pixels 與 Keyboard.check_pressed 之間
+"""
+import math
+
+import numpy as np
+
+from .hand_processing import NUM_FINGER_SLOTS
+
+
+def _alpha(cutoff, dt):
+    tau = 1.0 / (2 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+class OneEuroFilter:
+    def __init__(self, min_cutoff=1.0, beta=0.0, d_cutoff=1.0):
+        """
+        min_cutoff: 靜止時的 cutoff (Hz)，越小越平滑、延遲越大
+        beta      : 速度越快 cutoff 加越多，越大越跟手
+        d_cutoff  : 速度本身的 cutoff (Hz)
+        """
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        self.x = None
+        self.dx = None
+        self.t = None
+
+    def __call__(self, t, x):
+        """t 秒時量到 x，回傳濾過的值（純量進、純量出）"""
+        x = np.asarray(x, dtype=np.float64)
+        if self.t is None:
+            self.x = x.copy()
+            self.dx = np.zeros_like(x)
+            self.t = t
+        elif t > self.t:
+            dt = t - self.t
+            dx = (x - self.x) / dt
+            self.dx = self.dx + _alpha(self.d_cutoff, dt) * (dx - self.dx)
+
+            cutoff = self.min_cutoff + self.beta * np.abs(self.dx)
+            self.x = self.x + _alpha(cutoff, dt) * (x - self.x)
+            self.t = t
+        return self.x.copy() if self.x.ndim else float(self.x)
+
+
+class FingertipFilter:
+    """
+    每根手指的 (x, y, z) 各自做 One-Euro，狀態放在 (10, 3) 的陣列裡一次算完。
+    lead > 0 時用濾過的速度往前推 lead 秒，補回 capture + inference 的延遲；
+    濾波本身落後的時間（一階低通追等速運動時落後 tau）也一起補。
+    """
+    def __init__(self, min_cutoff=5.0, beta=0.1, d_cutoff=20.0, predict=False, max_lead=0.1,
+                 min_speed=50.0, jump_px=150):
+        """
+        min_cutoff / beta / d_cutoff: One-Euro 參數（x / y 單位是像素）
+        predict  : 是否依 apply() 傳進來的 lead 往前預測
+        max_lead : 最多往前推幾秒，避免延遲尖峰時預測飛出去
+        min_speed: x / y 速度低於這個值（像素 / 秒）不預測，當作抖動
+        jump_px  : 一張 frame 跳超過這個距離視為重新偵測（換了一隻手 / 追錯），直接重設
+        """
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.predict = predict
+        self.max_lead = max_lead
+        self.min_speed = np.array([min_speed, min_speed, 0.0])
+        self.jump2 = jump_px ** 2
+
+        self.x = np.zeros((NUM_FINGER_SLOTS, 3), dtype=np.float64)
+        self.dx = np.zeros((NUM_FINGER_SLOTS, 3), dtype=np.float64)
+        # 最近一張 frame 沒濾過的速度（預測時用來擋 overshoot）
+        self.step = np.zeros((NUM_FINGER_SLOTS, 3), dtype=np.float64)
+        self.t = np.zeros(NUM_FINGER_SLOTS, dtype=np.float64)
+        self.valid = np.zeros(NUM_FINGER_SLOTS, dtype=bool)
+
+    def reset(self):
+        self.valid[:] = False
+
+    def apply(self, fingers, slots, t, lead=0.0):
+        """
+        fingers: extract_finger_pixels 的結果；slots: finger_slots 的結果
+        lead   : 這張 frame 拍到現在過了幾秒（predict 時往前推這麼多）
+        回傳同樣格式、同樣順序的 [(x, y, z), ...]
+        """
+        if not fingers:
+            self.valid[:] = False
+            return []
+
+        idx = np.asarray(slots, dtype=np.intp)
+        raw = np.array(fingers, dtype=np.float64)
+        seen = np.zeros(NUM_FINGER_SLOTS, dtype=bool)
+        seen[idx] = True
+
+        # 第一次出現（或手消失後再出現、突然跳很遠）的手指直接用量到的值
+        d = raw[:, :2] - self.x[idx, :2]
+        new = ~self.valid[idx] | ((d * d).sum(axis=1) > self.jump2)
+        self.x[idx[new]] = raw[new]
+        self.dx[idx[new]] = 0.0
+        self.step[idx[new]] = 0.0
+        self.t[idx[new]] = t
+
+        old = idx[~new]
+        if len(old):
+            dt = t - self.t[old]
+            step = dt > 0
+            old = old[step]
+            dt = dt[step][:, None]
+            meas = raw[~new][step]
+
+            dx = (meas - self.x[old]) / dt
+            self.dx[old] += _alpha(self.d_cutoff, dt) * (dx - self.dx[old])
+            self.step[old] = dx
+
+            cutoff = self.min_cutoff + self.beta * np.abs(self.dx[old])
+            self.x[old] += _alpha(cutoff, dt) * (meas - self.x[old])
+            self.t[old] = t
+
+        # 消失的手指狀態作廢
+        self.valid = seen
+
+        out = self.x[idx]
+        if self.predict and lead > 0:
+            out = out + self._velocity(idx) * (min(lead, self.max_lead) + self._lag(idx))
+
+        return [(int(round(x)), int(round(y)), float(z)) for x, y, z in out]
+
+    def _velocity(self, idx):
+        """
+        預測用的速度：濾過的速度，但不超過這張 frame 實際的移動速度、方向也要一樣，
+        手指突然停住（敲到桌面、折返）時不會繼續往前推；太慢的當作抖動不推。
+        """
+        dx = self.dx[idx]
+        step = self.step[idx]
+        speed = np.minimum(np.abs(dx), np.abs(step)) - self.min_speed
+        speed[(dx * step <= 0) | (speed < 0)] = 0.0
+        return np.sign(dx) * speed
+
+    def _lag(self, idx):
+        """目前 cutoff 下位置濾波落後幾秒（一階低通的時間常數）"""
+        cutoff = self.min_cutoff + self.beta * np.abs(self.dx[idx])
+        return 1.0 / (2 * math.pi * cutoff)
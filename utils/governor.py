@@ -0,0 +1,241 @@
+# utils/governor.py
+"""
+依實際量到的推論時間調整 HandTracker 的負擔，讓每張 frame 的推論維持在目標延遲內。
+
+等級由輕到重依序是：換小模型 → 縮小輸入 → 每 N 張才偵測一次（中間用外插補）。
+推論時間用 EWMA 平滑，升降都要在同一個等級待滿 hold 秒（hysteresis），避免來回跳。
+換回比較重的等級前先估計它的成本：最近量過就用量到的，否則用目前的時間乘上兩個等級的相對成本
+（之前兩個等級都待過就用當時量到的比例，不然用 level_cost 粗估）。
+模型由 worker 載入、大小換不了時（InferencePool / ProcessInferencePool）給 complexity，
+只會調整縮放與偵測頻率。
+時間來源可以換成假的 clock，policy 不需要真的模型就能測（tests/test_governor.py）。
+"""
+import collections
+import time
+
+import numpy as np
+
+# (model_complexity, 輸入縮放, 每幾張偵測一次)，index 越大越省
+LEVELS = [
+    (1, 1.0, 1),
+    (0, 1.0, 1),
+    (0, 0.75, 1),
+    (0, 0.5, 1),
+    (0, 0.5, 2),
+    (0, 0.5, 3),
+]
+
+# 沒量過時單次偵測的相對成本：模型大小 × 送進去的像素，再加上跟大小無關的固定開銷（粗估）
+COMPLEXITY_COST = {0: 1.0, 1: 1.6}
+
+
+def level_cost(level):
+    complexity, scale, _ = level
+    return COMPLEXITY_COST.get(complexity, 1.0) * (0.25 + 0.75 * scale * scale)
+
+
+def fixed_levels(levels, complexity):
+    """模型大小固定時的等級：complexity 都換成固定的，去掉重複的"""
+    out = []
+    for _, scale, every in levels:
+        level = (complexity, scale, every)
+        if level not in out:
+            out.append(level)
+    return out
+
+
+class InferenceGovernor:
+    def __init__(self, target_ms=30.0, levels=LEVELS, alpha=0.2, up_ratio=0.6,
+                 hold_s=1.0, retry_s=10.0, clock=time.perf_counter, complexity=None, log_size=50):
+        """
+        target_ms: 平均每張 frame 的推論時間上限
+        up_ratio : 低於 target_ms * up_ratio 才考慮換回比較重的等級
+        hold_s   : 換等級後至少要待多久才能再換
+        retry_s  : 之前在某個等級量到的時間多久內還算數（之後允許再試一次）
+        clock    : 回傳秒數的函式（測試時換成假的）
+        complexity: 模型大小固定（由 pool 的 worker 載入）時給這個，只調整縮放與偵測頻率
+        log_size : decisions 最多留幾筆
+        """
+        self.target = target_ms / 1000.0
+        self.complexity_fixed = complexity is not None
+        self.levels = fixed_levels(levels, complexity) if complexity is not None else list(levels)
+        self.alpha = alpha
+        self.up_ratio = up_ratio
+        self.hold_s = hold_s
+        self.retry_s = retry_s
+        self.clock = clock
+
+        self.level = 0
+        self.ewma = None            # 單次偵測的推論時間
+        self.changed_at = clock()
+        self.frame_idx = 0
+        self.measured = {}          # 等級 → (離開時的 EWMA, 時間)；retry_s 內才算數
+        self.seen = {}              # 等級 → 最後一次量到的 EWMA（不過期，只拿來算相對成本）
+
+        # 統計
+        self.detected = 0
+        self.skipped = 0
+        self.switches = 0
+        # 換等級的紀錄（不印出來，推論的路徑上不寫 stdout）：(時間, 舊等級, 新等級, 當時的 EWMA 秒)
+        self.decisions = collections.deque(maxlen=log_size)
+
+    @property
+    def model_complexity(self):
+        return self.levels[self.level][0]
+
+    @property
+    def scale(self):
+        return self.levels[self.level][1]
+
+    @property
+    def detect_every(self):
+        return self.levels[self.level][2]
+
+    def should_detect(self):
+        """每張 frame 呼叫一次；False 表示這張用外插"""
+        detect = self.frame_idx % self.detect_every == 0
+        self.frame_idx += 1
+        if detect:
+            self.detected += 1
+        else:
+            self.skipped += 1
+        return detect
+
+    def per_frame(self):
+        """平均到每張 frame 的推論時間（秒）"""
+        if self.ewma is None:
+            return None
+        return self.ewma / self.detect_every
+
+    def record(self, seconds):
+        """
+        回報一次偵測花的時間。等級有變時回傳 True，
+        呼叫端再依 model_complexity / scale 重新設定。
+        """
+        if self.ewma is None:
+            self.ewma = seconds
+        else:
+            self.ewma += self.alpha * (seconds - self.ewma)
+
+        now = self.clock()
+        if now - self.changed_at < self.hold_s:
+            return False
+
+        cost = self.per_frame()
+        if cost > self.target and self.level < len(self.levels) - 1:
+            self._switch(self.level + 1, now)
+            return True
+        if self.level > 0:
+            # 估計換回上一級後的成本，還在 up_ratio 以內才換
+            if self._estimate(self.level - 1, now) < self.target * self.up_ratio:
+                self._switch(self.level - 1, now)
+                return True
+        return False
+
+    def _estimate(self, level, now):
+        """level 的每張 frame 成本：最近量過就用量到的，否則用目前的時間乘上相對成本"""
+        every = self.levels[level][2]
+        measured = self.measured.get(level)
+        if measured is not None and now - measured[1] < self.retry_s:
+            return measured[0] / every
+        return self.ewma * self._relative_cost(level, self.level) / every
+
+    def _relative_cost(self, level, current):
+        """單次偵測 level 比 current 貴幾倍：兩個都量過就用量到的比例，否則用 level_cost 粗估"""
+        if level in self.seen and current in self.seen:
+            return self.seen[level] / self.seen[current]
+        return level_cost(self.levels[level]) / level_cost(self.levels[current])
+
+    def _switch(self, level, now):
+        self.decisions.append((now, self.level, level, self.ewma))
+        self.measured[self.level] = (self.ewma, now)
+        self.seen[self.level] = self.ewma
+        self.level = level
+        self.changed_at = now
+        self.switches += 1
+        # 新等級的成本不同，重新量
+        self.ewma = None
+        self.frame_idx = 0
+
+    def metrics(self):
+        cost = self.per_frame()
+        return {
+            "level": self.level,
+            "model_complexity": self.model_complexity,
+            "scale": self.scale,
+            "detect_every": self.detect_every,
+            "avg_ms": round(self.ewma * 1000, 2) if self.ewma is not None else None,
+            "per_frame_ms": round(cost * 1000, 2) if cost is not None else None,
+            "target_ms": round(self.target * 1000, 2),
+            "detected": self.detected,
+            "skipped": self.skipped,
+            "switches": self.switches,
+            "complexity_fixed": self.complexity_fixed,
+            "recent_switches": [(old, new, round(ewma * 1000, 2)) for _, old, new, ewma in list(self.decisions)[-5:]],
+        }
+
+
+class LandmarkExtrapolator:
+    """
+    沒有偵測的 frame 用最近兩次偵測結果做等速外插。
+    超過 max_gap 秒就不再往外推，直接沿用最後一次的位置。
+
+    偵測結果的陣列會被 pool 回收重用，所以 update() 複製到自己的 buffer。
+    """
+    def __init__(self, max_gap=0.1):
+        self.max_gap = max_gap
+        self.hands = np.zeros((2, 2, 21, 3))   # [兩組輪流用, 左 / 右手]
+        self.prev = None    # (t, 第幾組, has_left, has_right, handed_list)
+        self.last = None
+
+    def update(self, t, left, right, handed_list):
+        self.prev = self.last
+        k = 0 if self.prev is None else 1 - self.prev[1]
+        for i, hand in enumerate((left, right)):
+            if hand is not None:
+                self.hands[k, i] = hand
+        self.last = (t, k, left is not None, right is not None, list(handed_list))
+
+    def reset(self):
+        self.prev = None
+        self.last = None
+
+    def predict(self, t, out=None):
+        """
+        回傳 (left, right, handed_list)；沒有任何偵測過時回傳 (None, None, [])
+        out: (2, 21, 3) buffer，結果寫進去；None 時另外配置
+        """
+        if self.last is None:
+            return None, None, []
+        if out is None:
+            out = np.empty((2, 21, 3))
+
+        t1, k1, *has1, handed = self.last
+        ahead = 0.0
+        if self.prev is not None:
+            t0, k0, *has0, _ = self.prev
+            dt = t1 - t0
+            if dt > 0:
+                ahead = min(t - t1, self.max_gap) / dt
+
+        hands = []
+        for i in range(2):
+            if not has1[i]:
+                hands.append(None)
+                continue
+            p1 = self.hands[k1, i]
+            if ahead > 0 and has0[i]:
+                _extrapolate(self.hands[k0, i], p1, ahead, out[i])
+            else:
+                out[i] = p1
+            hands.append(out[i])
+        return hands[0], hands[1], list(handed)
+
+
+def _extrapolate(p0, p1, k, out):
+    np.subtract(p1, p0, out=out)
+    out *= k
+    out += p1
+    # x / y 是正規化座標，不要推出畫面
+    np.clip(out[:, :2], 0.0, 1.0, out=out[:, :2])
+    return out
@@ -2,17 +2,25 @@
 # 原本是utils.py
 
 import cv2
-import numpy as np
 
-def smooth_value(history, value, max_len=5):
-    history.append(value)
-    if len(history) > max_len:
-        history.pop(0)
-    return float(np.mean(history))
+TIP_IDS = [4, 8, 12, 16, 20]  # 10指指尖點
+NUM_FINGER_SLOTS = 10           # 左手 0-4，右手 5-9
+
+def finger_slots(left_hand, right_hand):
+    """
+    extract_finger_pixels 回傳的每根手指對應到哪個固定編號（左手 0-4、右手 5-9），
+    只有一隻手時 index 會位移，追蹤同一根手指要用這個編號。
+    """
+    slots = []
+    if left_hand is not None:
+        slots.extend(range(0, 5))
+    if right_hand is not None:
+        slots.extend(range(5, 10))
+    return slots
 
 def extract_finger_pixels(left_hand, right_hand, frame_w, frame_h):
     fingers = []
-    tip_ids = [4, 8, 12, 16, 20]  # 10指指尖點
+    tip_ids = TIP_IDS
 
     if left_hand is not None:
         for tid in tip_ids:
@@ -1,20 +1,86 @@
 # utils/hand_tracker.py
+import time
+
 import cv2
 import mediapipe as mp
 import numpy as np
-import time
 
-from .hand_processing import smooth_value
+from .filters import OneEuroFilter
+from . import clock
+from .landmark_store import LandmarkWriter
+from .governor import LandmarkExtrapolator
+
+# 21 個 landmark 的骨架（同 mp.solutions.hands.HAND_CONNECTIONS）
+HAND_CONNECTIONS = (
+    (0, 1), (1, 2), (2, 3), (3, 4),
+    (0, 5), (5, 6), (6, 7), (7, 8),
+    (5, 9), (9, 10), (10, 11), (11, 12),
+    (9, 13), (13, 14), (14, 15), (15, 16),
+    (13, 17), (0, 17), (17, 18), (18, 19), (19, 20),
+)
+
+
+def build_hands(complexity=1, static=False):
+    """
+    static=True：每張都重新找手、不沿用上一張的追蹤結果，
+    同一個模型輪流處理好幾個 station 的畫面時要用這個
+    """
+    return mp.solutions.hands.Hands(
+        static_image_mode=static,
+        max_num_hands=2,
+        min_detection_confidence=0.6,
+        min_tracking_confidence=0.6,
+        model_complexity=complexity
+    )
+
+
+def read_results(results, out):
+    """
+    Hands.process 的結果 → (points, labels)：points 是 out（(2, 21, 3)）前 n 隻手的 view，
+    labels 是 MediaPipe 判斷的左右手。worker process 也用這個，只把陣列傳回主程式。
+    """
+    if not results.multi_hand_landmarks:
+        return out[:0], []
+    labels = []
+    n = 0
+    for lm, handed in zip(results.multi_hand_landmarks, results.multi_handedness):
+        if n == len(out):
+            break
+        HandTracker._fill_landmarks(lm.landmark, out[n])
+        labels.append(handed.classification[0].label)
+        n += 1
+    return out[:n], labels
+
+
+def draw_hand(frame, points, w, h):
+    """landmark 骨架畫在 frame 上（points 是整張畫面的正規化座標）"""
+    px = [(int(x * w), int(y * h)) for x, y, _ in points]
+    for a, b in HAND_CONNECTIONS:
+        cv2.line(frame, px[a], px[b], (224, 224, 224), 2)
+    for p in px:
+        cv2.circle(frame, p, 4, (48, 48, 255), -1)
+
 
 class HandTracker:
-    def __init__(self):
-        self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands(
-            max_num_hands=2,
-            min_detection_confidence=0.6,
-            min_tracking_confidence=0.6,
-            model_complexity=1
-        )
+    def __init__(self, use_mediapipe=True, governor=None, mirror=True):
+        """
+        governor: utils.governor.InferenceGovernor；None 時固定 model_complexity=1、每張都偵測
+        mirror  : detect() 收到的是相機原始畫面（沒有左右翻轉），
+                  回傳的座標 / 左右手在這裡鏡像成使用者看到的樣子，不用翻整張畫面
+        """
+        self.governor = governor
+        self.mirror = mirror
+        self.extrapolator = LandmarkExtrapolator()
+        self.model_complexity = governor.model_complexity if governor is not None else 1
+        self.infer_scale = governor.scale if governor is not None else 1.0
+
+        # 重播 landmark 檔時不需要載入 MediaPipe，只用到下面的校正邏輯
+        self.hands = None
+        self.owns_hands = False
+        if use_mediapipe:
+            self.mp_hands = mp.solutions.hands
+            self.hands = self._build_hands(self.model_complexity)
+            self.owns_hands = True
 
         # 桌面校正
         self.table_z = None
@@ -25,45 +91,263 @@ class HandTracker:
         self.table_rect = None
         
         # smoothing
-        self.z_history_L = []
-        self.z_history_R = []
+        self.z_filter_L = OneEuroFilter(min_cutoff=1.0)
+        self.z_filter_R = OneEuroFilter(min_cutoff=1.0)
+
+        # 把每張 frame 的偵測結果存成 .lmk（重播 / 回歸測試用）
+        self.recorder = None
+
+        # ROI 模式：校正完成後只把桌面附近的橫帶送進 Hands.process
+        self.roi_enabled = False
+        self.roi_band = (0.30, 0.10)    # 桌面線往上 / 往下保留多少（畫面高度的比例）
+        self.roi_margin = 0.08          # 手的外框再往外留多少（畫面高度的比例）
+        self.roi_scale = 1.0            # < 1 時 crop 後再縮小
+        self.roi_quantum = 32           # crop 邊界對齊到 32 px，手小幅移動時 ROI 不會一直變
+        self.roi = None                 # 目前的 (x0, y0, x1, y1)；None = 整張
+        self.hand_boxes = []            # 上一張偵測到的手外框（全畫面像素）
+        self.roi_frames = 0
+        self.full_frames = 0
+        self.pixels_in = 0
+        self.pixels_full = 0
+
+        # resize / cvtColor 的輸出 buffer，尺寸變了（ROI、governor 縮放）才重新配置
+        self.scratch = {}
+
+    def set_roi(self, enabled, scale=None):
+        self.roi_enabled = enabled
+        if scale is not None:
+            self.roi_scale = scale
+        if not enabled:
+            self.roi = None
+
+    def roi_summary(self):
+        """ROI 與整張各跑了幾次、實際送進模型的像素比例"""
+        ratio = self.pixels_in / self.pixels_full if self.pixels_full else 1.0
+        return {"roi_frames": self.roi_frames, "full_frames": self.full_frames,
+                "pixel_ratio": round(ratio, 3)}
+
+    def attach(self, hands):
+        """用別人建好的模型（InferencePool 的 worker 共用）；governor 要用 complexity= 固定模型大小"""
+        self.mp_hands = mp.solutions.hands
+        self.hands = hands
+        self.owns_hands = False
+
+    def _build_hands(self, complexity):
+        return build_hands(complexity)
+
+    def _apply_governor(self):
+        """governor 換了等級：必要時換模型，並更新輸入縮放"""
+        self.infer_scale = self.governor.scale
+        complexity = self.governor.model_complexity
+        if complexity != self.model_complexity and self.owns_hands:
+            self.hands.close()
+            self.hands = self._build_hands(complexity)
+            self.model_complexity = complexity
+
+    def start_recording(self, path, frame_size):
+        self.stop_recording()
+        self.recorder = LandmarkWriter(path, frame_size)
+        print(f"Recording landmarks to {path}")
+
+    def stop_recording(self):
+        if self.recorder is not None:
+            self.recorder.close()
+            print(f"Saved {self.recorder.n_frames} frames of landmarks to {self.recorder.path}")
+            self.recorder = None
 
     # Mediapipe 手部偵測 （預設食指位置的y值為桌面高度）
-    def detect(self, frame):
+    def detect(self, frame, out=None):
+        """
+        out: (2, 21, 3) buffer，左 / 右手的 landmark 寫進 out[0] / out[1]；None 時另外配置。
+        回傳的手就是 out 的 view，呼叫端要在下一次用同一塊 buffer 之前用完。
+        """
+        t = clock.now()
+        if out is None:
+            out = np.empty((2, 21, 3))
+
+        # governor 決定這張不偵測 → 用前兩次的結果外插
+        if self.governor is not None and not self.governor.should_detect():
+            left_hand, right_hand, handed_list = self.extrapolator.predict(t, out)
+            return self._result(t, left_hand, right_hand, handed_list, extrapolated=True)
+
         h, w, _ = frame.shape
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        roi = self._select_roi(w, h)
+        rgb = self._prepare(frame, roi)
+        self.pixels_in += rgb.shape[0] * rgb.shape[1]
+        self.pixels_full += h * w
+
+        t0 = time.perf_counter()
         results = self.hands.process(rgb)
+        if self.governor is not None and self.governor.record(time.perf_counter() - t0):
+            self._apply_governor()
+
+        points, labels = read_results(results, self._scratch("points", (2, 21, 3), np.float64))
+        return self._finish(frame, t, roi, points, labels, out)
+
+    def begin(self, frame, alloc):
+        """
+        ProcessInferencePool 用的前半段：選 ROI、把 RGB 寫進 alloc(shape) 給的 buffer（共享記憶體）。
+        回傳 job = (t, roi, 送出的影像 shape)；governor 決定這張不偵測時 shape 是 None。
+        """
+        t = clock.now()
+        if self.governor is not None and not self.governor.should_detect():
+            return t, None, None
+        h, w, _ = frame.shape
+        roi = self._select_roi(w, h)
+        rgb = self._prepare(frame, roi, alloc)
+        self.pixels_in += rgb.shape[0] * rgb.shape[1]
+        self.pixels_full += h * w
+        return t, roi, rgb.shape
+
+    def finish(self, frame, job, points, labels, elapsed, out):
+        """
+        後半段：worker 的結果（read_results 的格式）→ 跟 detect() 一樣的回傳值。
+        要依 frame 順序呼叫，ROI / 外插 / 濾波的狀態才會對。
+        """
+        t, roi, shape = job
+        if shape is None:
+            left_hand, right_hand, handed_list = self.extrapolator.predict(t, out)
+            return self._result(t, left_hand, right_hand, handed_list, extrapolated=True)
+        if self.governor is not None and self.governor.record(elapsed):
+            self._apply_governor()
+        return self._finish(frame, t, roi, points if points is not None else (), labels, out)
+
+    def _finish(self, frame, t, roi, points, labels, out):
+        """points: crop 內正規化座標的 (n, 21, 3)，labels: MediaPipe 的左右手（未鏡像）"""
+        h, w, _ = frame.shape
+        if len(points):
+            if roi is not None:
+                self._roi_to_frame(points, roi, w, h)
+            self.hand_boxes = [self._hand_box(p, w, h) for p in points]
+        else:
+            # 追丟了 → 下一張回到整張畫面重新找手
+            self.hand_boxes = []
+            self.roi = None
 
         left_hand = None
         right_hand = None
-        left_z = None
-        right_z = None
-
         handed_list = []
 
-        if results.multi_hand_landmarks:
-            for lm, handed in zip(results.multi_hand_landmarks, results.multi_handedness):
-                mp.solutions.drawing_utils.draw_landmarks(
-                    frame,
-                    lm,
-                    self.mp_hands.HAND_CONNECTIONS,
-                    mp.solutions.drawing_styles.get_default_hand_landmarks_style(),
-                    mp.solutions.drawing_styles.get_default_hand_connections_style()
-                )
-                pts = np.array([(p.x, p.y, p.z) for p in lm.landmark])
-                label = handed.classification[0].label
-                handed_list.append(label)
-
-                if label == "Left":
-                    left_hand = pts
-                    left_z = pts[8][2] 
-                else:
-                    right_hand = pts
-                    right_z = pts[8][2]
+        for p, label in zip(points, labels):
+            # 畫在原始畫面上，之後整張翻轉時會跟著鏡像
+            draw_hand(frame, p, w, h)
+            if self.mirror:
+                # MediaPipe 假設輸入已經鏡像；原始畫面的左右手要對調
+                label = "Right" if label == "Left" else "Left"
+            handed_list.append(label)
+
+            if label == "Left":
+                left_hand = self._copy_landmarks(p, out[0], self.mirror)
+            else:
+                right_hand = self._copy_landmarks(p, out[1], self.mirror)
+
+        self.extrapolator.update(t, left_hand, right_hand, handed_list)
+        return self._result(t, left_hand, right_hand, handed_list)
+
+    def _prepare(self, frame, roi, alloc=None):
+        """crop → (縮小) → RGB，輸出寫進重複使用的 buffer；給了 alloc(shape) 就寫進它給的 buffer"""
+        scale = self.infer_scale
+        if roi is None:
+            crop = frame
+            self.full_frames += 1
+        else:
+            x0, y0, x1, y1 = roi
+            crop = frame[y0:y1, x0:x1]
+            scale *= self.roi_scale
+            self.roi_frames += 1
+        if scale != 1.0:
+            h, w = crop.shape[:2]
+            size = (max(int(round(w * scale)), 1), max(int(round(h * scale)), 1))
+            small = self._scratch("small", (size[1], size[0], 3))
+            crop = cv2.resize(crop, size, dst=small, interpolation=cv2.INTER_AREA)
+        rgb = alloc(crop.shape) if alloc is not None else self._scratch("rgb", crop.shape)
+        return cv2.cvtColor(crop, cv2.COLOR_BGR2RGB, dst=rgb)
+
+    def _scratch(self, name, shape, dtype=np.uint8):
+        buf = self.scratch.get(name)
+        if buf is None or buf.shape != shape:
+            buf = np.empty(shape, dtype=dtype)
+            self.scratch[name] = buf
+        return buf
+
+    @staticmethod
+    def _fill_landmarks(points, out, mirror=False):
+        """lm.landmark（21 個有 .x .y .z 的點）→ (21, 3) buffer；mirror 時 x → 1 - x"""
+        for i, p in enumerate(points):
+            out[i] = (p.x, p.y, p.z)
+        if mirror:
+            np.subtract(1.0, out[:, 0], out=out[:, 0])
+        return out
+
+    @staticmethod
+    def _copy_landmarks(points, out, mirror=False):
+        np.copyto(out, points)
+        if mirror:
+            np.subtract(1.0, out[:, 0], out=out[:, 0])
+        return out
+
+    def _result(self, t, left_hand, right_hand, handed_list, extrapolated=False):
+        left_z = left_hand[8][2] if left_hand is not None else None
+        right_z = right_hand[8][2] if right_hand is not None else None
+
+        if self.recorder is not None:
+            # 外插的 frame 也存，但標起來：重播時預設只餵真的偵測結果
+            self.recorder.write(t, left_hand, right_hand, handed_list, extrapolated)
 
         return left_hand, right_hand, left_z, right_z, handed_list
 
 
+    def _select_roi(self, w, h):
+        """
+        桌面線附近的橫帶，再加上上一張手的外框（手抬高時 ROI 跟著往上長）。
+        還沒校正、沒開 ROI、或上一張沒偵測到手時回傳 None（用整張畫面）。
+        """
+        if not self.roi_enabled or self.table_y_pixel is None or not self.hand_boxes:
+            self.roi = None
+            return None
+
+        up, down = self.roi_band
+        margin = int(self.roi_margin * h)
+        y0 = self.table_y_pixel - int(up * h)
+        y1 = self.table_y_pixel + int(down * h)
+        for bx0, by0, bx1, by1 in self.hand_boxes:
+            y0 = min(y0, by0 - margin)
+            y1 = max(y1, by1 + margin)
+
+        q = self.roi_quantum
+        y0 = max((y0 // q) * q, 0)
+        y1 = min(-(-y1 // q) * q, h)
+
+        # 目前的 ROI 還包得住就沿用，避免每張 frame 都換座標讓追蹤重來
+        if self.roi is not None and self.roi[1] <= y0 and self.roi[3] >= y1:
+            return self.roi
+        if y1 - y0 >= h:
+            self.roi = None
+            return None
+
+        # 鍵盤可以橫跨整個畫面，x 方向不裁
+        self.roi = (0, y0, w, y1)
+        return self.roi
+
+    @staticmethod
+    def _roi_to_frame(points, roi, w, h):
+        """把 crop 內的正規化座標改回整張畫面的座標（原地修改 (n, 21, 3)）"""
+        x0, y0, x1, y1 = roi
+        sx = (x1 - x0) / w
+        sy = (y1 - y0) / h
+        points[..., 0] *= sx
+        points[..., 0] += x0 / w
+        points[..., 1] *= sy
+        points[..., 1] += y0 / h
+        # z 與 x 同比例
+        points[..., 2] *= sx
+
+    @staticmethod
+    def _hand_box(points, w, h):
+        xs = points[:, 0]
+        ys = points[:, 1]
+        return (int(xs.min() * w), int(ys.min() * h), int(xs.max() * w), int(ys.max() * h))
+
     def update_table_calibration(self, left_hand, right_hand, frame_h):
         if self.table_locked: return
 
@@ -81,16 +365,17 @@ class HandTracker:
         index_z = finger[2]
         index_y = finger[1]
 
+        now = clock.now()
         if side == "Left":
-            z_smooth = smooth_value(self.z_history_L, index_z)
+            z_smooth = self.z_filter_L(now, index_z)
         else:
-            z_smooth = smooth_value(self.z_history_R, index_z)
+            z_smooth = self.z_filter_R(now, index_z)
 
         if self.table_lock_time is None:
-            self.table_lock_time = time.time()
+            self.table_lock_time = now
             return
 
-        if time.time() - self.table_lock_time >= 1.5:
+        if now - self.table_lock_time >= 1.5:
             self.table_z = z_smooth
             self.table_y_pixel = int(index_y * frame_h)
             self.table_locked = True
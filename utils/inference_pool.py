@@ -0,0 +1,349 @@
+# utils/inference_pool.py
+"""
+把 Hands.process 分給好幾個 worker process（各自一個 MediaPipe Hands），用滿多核心。
+
+  主程式（FramePipeline 的推論 thread）            worker process × N
+    HandTracker.begin → RGB 寫進共享記憶體 slot  ─→  tasks queue：(job, slot, 名稱, shape)
+    submit(tag)                                      Hands.process(共享記憶體上的 view)
+    collect() ← 依送出順序重排 ←──────────────────  results queue：(job, landmark 陣列, 左右手)
+    HandTracker.finish → FramePacket.hands
+
+影像只經過共享記憶體，queue 上傳的只有幾個整數和 (n, 21, 3) 的 landmark。
+worker 可能不照順序做完，collect() 只在前面的工作都完成時才把結果交出去，
+HandTracker 的 ROI / 外插 / 濾波狀態才會照 frame 順序更新。
+
+worker 掉了（crash、被砍）：它手上的工作改送給還活著的 worker（同一張連續害死兩個 worker
+就當成沒偵測到手）；全部掉光時改在主程式裡自己推論，只是變慢，不會卡住。
+
+reserve / submit / collect 都只能由同一條 thread 呼叫。
+
+    pool = ProcessInferencePool(workers=4)
+    pool.start()
+    pipeline = FramePipeline(cap, tracker, executor=pool)
+"""
+import collections
+import multiprocessing
+import queue
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+def _build_model(complexity, static):
+    from .hand_tracker import build_hands
+    return build_hands(complexity, static)
+
+
+def _worker_main(index, tasks, results, model_factory, complexity, static):
+    from .hand_tracker import read_results
+    try:
+        model = model_factory(complexity, static)
+    except Exception as e:
+        results.put(("error", index, repr(e)))
+        return
+    results.put(("ready", index, None))
+
+    blocks = {}     # slot → SharedMemory（slot 換了更大的 block 才重新 attach）
+    points = np.empty((2, 21, 3))
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            job, slot, name, shape = task
+            shm = blocks.get(slot)
+            if shm is None or shm.name != name:
+                if shm is not None:
+                    shm.close()
+                shm = blocks[slot] = shared_memory.SharedMemory(name=name)
+            rgb = np.ndarray(shape, np.uint8, buffer=shm.buf)
+            t0 = time.perf_counter()
+            found, labels = read_results(model.process(rgb), points)
+            elapsed = time.perf_counter() - t0
+            del rgb
+            results.put(("done", index, (job, found.copy() if len(found) else None, labels, elapsed)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        model.close()
+        for shm in blocks.values():
+            shm.close()
+
+
+class _Slot:
+    def __init__(self, index):
+        self.index = index
+        self.shm = None
+        self.busy = False
+
+
+class _ProcWorker:
+    def __init__(self, index):
+        self.index = index
+        self.process = None
+        self.tasks = None
+        self.jobs = set()       # 送出但還沒收到結果的 job
+        self.alive = True
+        self.ready = False
+
+        # 統計
+        self.frames = 0
+        self.busy_s = 0.0
+
+
+class ProcessInferencePool:
+    def __init__(self, workers=2, model_complexity=1, static=None, depth=2, model_factory=None):
+        """
+        static       : None 時 worker 超過一個就用 static_image_mode
+                       （每個 worker 只看到每 N 張中的一張，沿用上一張的追蹤反而會追錯）
+        depth        : 每個 worker 同時排著幾張；共享記憶體 slot 共 workers × depth 塊
+        model_factory: (complexity, static) → 有 process(rgb) / close() 的物件；
+                       要能 pickle（模組層級的函式），預設是 MediaPipe Hands
+        """
+        self.workers = [_ProcWorker(i) for i in range(max(workers, 1))]
+        self.model_complexity = model_complexity
+        self.static = len(self.workers) > 1 if static is None else static
+        self.depth = depth
+        self.model_factory = model_factory or _build_model
+        self.slots = [_Slot(i) for i in range(len(self.workers) * depth)]
+        self.ctx = multiprocessing.get_context("spawn")
+        self.results = None
+        self.running = False
+
+        self.next_job = 0
+        self.reserved = None     # reserve() 拿到、還沒 submit() 的 slot
+        self.jobs = {}           # job → (tag, slot, shape, 已經害死幾個 worker)
+        self.order = collections.deque()    # 送出的順序
+        self.done = {}           # job → (tag, (points, labels, elapsed))；等前面的完成
+        self.local = None        # worker 全掉光時在主程式推論用的模型
+
+        # 統計
+        self.started_at = None
+        self.reordered = 0       # 比前面的工作先完成、在 done 裡等過的結果
+        self.max_waiting = 0
+        self.requeued = 0
+        self.lost = 0
+        self.local_frames = 0
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.started_at = time.perf_counter()
+        self.results = self.ctx.Queue()
+        for w in self.workers:
+            w.tasks = self.ctx.Queue()
+            w.process = self.ctx.Process(
+                target=_worker_main, name=f"hands-{w.index}", daemon=True,
+                args=(w.index, w.tasks, self.results, self.model_factory, self.model_complexity, self.static))
+            w.process.start()
+
+    def close(self):
+        if not self.running:
+            return
+        self.running = False
+        for w in self.workers:
+            if w.alive:
+                w.tasks.put(None)
+        for w in self.workers:
+            w.process.join(timeout=2.0)
+            if w.process.is_alive():
+                w.process.terminate()
+                w.process.join(timeout=1.0)
+            w.tasks.close()
+        self.results.close()
+        for slot in self.slots:
+            if slot.shm is not None:
+                slot.shm.close()
+                slot.shm.unlink()
+                slot.shm = None
+        if self.local:
+            self.local.close()
+            self.local = None
+
+    def pending(self):
+        """送出但還沒交回去的工作數"""
+        return len(self.order)
+
+    def ready(self):
+        """現在能不能再送一張（有空的 slot，也有還沒排滿的 worker）"""
+        if self.reserved is not None or len(self.order) >= 2 * len(self.slots):
+            return False
+        if not any(w.alive for w in self.workers):
+            return True
+        return self._free_slot() is not None and self._pick_worker() is not None
+
+    def reserve(self, shape):
+        """
+        給 HandTracker.begin 當 alloc：回傳放得下 shape（uint8）的共享記憶體 view。
+        slot 太小就換一塊大的；下一次 submit() 會把這個 slot 送出去。
+        """
+        slot = self._free_slot()
+        if slot is None:
+            raise RuntimeError("no free shared-memory slot; check ready() before reserve()")
+        nbytes = int(np.prod(shape))
+        if slot.shm is None or slot.shm.size < nbytes:
+            if slot.shm is not None:
+                slot.shm.close()
+                slot.shm.unlink()
+            slot.shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        slot.busy = True
+        self.reserved = (slot, tuple(shape))
+        return np.ndarray(shape, np.uint8, buffer=slot.shm.buf)
+
+    def submit(self, tag):
+        """
+        送出 reserve() 寫好的影像；沒有 reserve 過（例如 governor 決定這張不偵測）
+        就只佔一個順序，collect() 到它時結果是 None。
+        """
+        job = self.next_job
+        self.next_job += 1
+        self.order.append(job)
+
+        if self.reserved is None:
+            self.done[job] = (tag, None)
+            return job
+        slot, shape = self.reserved
+        self.reserved = None
+        self.jobs[job] = (tag, slot, shape, 0)
+        self._dispatch(job)
+        return job
+
+    def collect(self, timeout=0.0):
+        """
+        收回已完成的結果，依 submit 的順序回傳 [(tag, (points, labels, elapsed) 或 None), ...]。
+        最前面的工作還沒完成時最多等 timeout 秒。
+        """
+        self._drain(0)
+        if timeout > 0 and self.order and self.order[0] not in self.done:
+            self._drain(timeout)
+        self._reap()
+
+        out = []
+        while self.order and self.order[0] in self.done:
+            out.append(self.done.pop(self.order.popleft()))
+        return out
+
+    def _drain(self, timeout):
+        block = timeout
+        while True:
+            try:
+                msg = self.results.get(timeout=block) if block > 0 else self.results.get_nowait()
+            except (queue.Empty, OSError, ValueError):
+                return
+            block = 0
+            self._handle(*msg)
+
+    def _handle(self, kind, index, payload):
+        w = self.workers[index]
+        if kind == "ready":
+            w.ready = True
+        elif kind == "error":
+            print(f"Inference worker {index} failed to start: {payload}")
+        elif kind == "done":
+            job, points, labels, elapsed = payload
+            w.jobs.discard(job)
+            w.frames += 1
+            w.busy_s += elapsed
+            entry = self.jobs.pop(job, None)
+            if entry is None:
+                # 已經當成掉了、改送別人的工作又回來了
+                return
+            tag, slot, _, _ = entry
+            slot.busy = False
+            if self.order and self.order[0] != job:
+                self.reordered += 1
+            self.done[job] = (tag, (points, labels, elapsed))
+            self.max_waiting = max(self.max_waiting, len(self.done))
+
+    def _reap(self):
+        """找出掉了的 worker，把它手上的工作改送別人"""
+        for w in self.workers:
+            if not w.alive or w.process.is_alive():
+                continue
+            w.alive = False
+            print(f"Inference worker {w.index} exited (code {w.process.exitcode}); "
+                  f"{sum(x.alive for x in self.workers)} left")
+            # 已經在 queue 裡的結果先收，避免重做
+            self._drain(0)
+            for job in sorted(w.jobs):
+                if job not in self.jobs:
+                    continue
+                tag, slot, shape, kills = self.jobs[job]
+                if kills >= 1:
+                    # 同一張害死第二個 worker：不再重試，當成沒偵測到手
+                    self.jobs.pop(job)
+                    slot.busy = False
+                    self.lost += 1
+                    self.done[job] = (tag, (None, [], 0.0))
+                    continue
+                self.jobs[job] = (tag, slot, shape, kills + 1)
+                self.requeued += 1
+                self._dispatch(job)
+            w.jobs.clear()
+
+    def _dispatch(self, job):
+        tag, slot, shape, _ = self.jobs[job]
+        w = self._pick_worker(any_load=True)
+        if w is not None:
+            w.jobs.add(job)
+            w.tasks.put((job, slot.index, slot.shm.name, shape))
+            return
+
+        # 沒有活著的 worker：主程式自己推論
+        if self.local is None:
+            print("No inference workers left; running hand inference in-process")
+            try:
+                self.local = self.model_factory(self.model_complexity, self.static)
+            except Exception as e:
+                print(f"In-process hand inference unavailable: {e!r}")
+                self.local = False
+        self.jobs.pop(job)
+        slot.busy = False
+        if self.local is False:
+            # 連主程式都載不了模型：照常交回 frame，只是沒有手
+            self.lost += 1
+            self.done[job] = (tag, (None, [], 0.0))
+            return
+
+        from .hand_tracker import read_results
+        rgb = np.ndarray(shape, np.uint8, buffer=slot.shm.buf)
+        t0 = time.perf_counter()
+        points, labels = read_results(self.local.process(rgb), np.empty((2, 21, 3)))
+        elapsed = time.perf_counter() - t0
+        del rgb
+        self.local_frames += 1
+        self.done[job] = (tag, (points if len(points) else None, labels, elapsed))
+
+    def _free_slot(self):
+        for slot in self.slots:
+            if not slot.busy:
+                return slot
+        return None
+
+    def _pick_worker(self, any_load=False):
+        """排最少的活著的 worker；any_load=False 時排滿 depth 的不算"""
+        alive = [w for w in self.workers if w.alive]
+        if not any_load:
+            alive = [w for w in alive if len(w.jobs) < self.depth]
+        if not alive:
+            return None
+        return min(alive, key=lambda w: len(w.jobs))
+
+    def metrics(self):
+        elapsed = time.perf_counter() - self.started_at if self.started_at else 0.0
+        return {
+            "workers": [{
+                "worker": w.index,
+                "alive": w.alive,
+                "frames": w.frames,
+                "utilization": round(w.busy_s / elapsed, 3) if elapsed else 0.0,
+            } for w in self.workers],
+            "static_image_mode": self.static,
+            "reordered": self.reordered,
+            "max_waiting": self.max_waiting,
+            "requeued": self.requeued,
+            "lost": self.lost,
+            "local_frames": self.local_frames,
+        }
@@ -2,51 +2,142 @@
 
 import cv2
 import math
+import numpy as np
 
-NOTE_MAP = {
-    'C3': 48, 'D3': 50, 'E3': 52, 'F3': 53, 'G3': 55, 'A3': 57, 'B3': 59,
-    'C4': 60, 'D4': 62, 'E4': 64, 'F4': 65, 'G4': 67, 'A4': 69, 'B4': 71, 'C5': 72
-}
+from .layout import KeyboardLayout, DEFAULT_LAYOUT
+from .press_detector import HOLD, STRIKE
+from .compositor import LayerCache, render_layer
+
+# 預設 15 個白鍵 (C3–C5)
+NOTE_MAP = DEFAULT_LAYOUT.note_map
 NUM_KEYS = len(NOTE_MAP)
 NUM_TO_NOTE = {v: k for k, v in NOTE_MAP.items()}
 
 class Keyboard:
-    def __init__(self, note_map):
-        self.note_map = note_map
-        self.num_keys = len(note_map)
+    def __init__(self, layout, hold_scale=1.0):
+        """
+        hold_scale: 已經按著的鍵，判定距離放大幾倍才放開（避免手指在邊界抖動時一直 on/off）
+        """
+        # 舊的呼叫方式 Keyboard(NOTE_MAP) 仍可用：全部排成一排
+        if isinstance(layout, dict):
+            layout = KeyboardLayout.from_note_map(layout)
+        self.layout = layout
 
-        # 各個音
-        self.notes_order = list(note_map.keys())
+        self.note_map = layout.note_map
+        self.num_keys = len(self.note_map)
+
+        # 各個音（依音高）
+        self.notes_order = list(self.note_map.keys())
+        self.note_index = {note: i for i, note in enumerate(self.notes_order)}
 
         # 每個 key 的範圍
-        self.key_boxes = [] 
+        self.key_boxes = []
 
         # 琴鍵顏色
         self.white_color = (255, 255, 255)
         self.pressed_color = (180, 180, 180)
         self.practice_color =  (0, 255, 255)
+        self.black_color = (40, 40, 40)
 
         # 鍵盤設定
-        self.key_height = 80  
-        self.key_width = 80   
+        self.key_height = 80
+        self.key_width = 80
 
         self.key_radius = 28
         self.hit_threshold = 45
 
+        # 上排黑鍵比較小，判定範圍也比較小，避免跟白鍵重疊
+        self.black_radius = 20
+        self.black_hit_threshold = 30
+
+        # 檢視範圍：scroll 以白鍵為單位平移，zoom 放大鍵距
+        self.view_offset = 0
+        self.zoom = 1.0
+
         self.key_states = {note: False for note in self.notes_order}
+        self.key_centers = []
+
+        # 鍵中心 (K, 2)、目前按下的鍵 index
+        self.centers_xy = np.zeros((0, 2), dtype=np.float64)
+        self.pressed_keys = set()
+        self.step = 0
+
+        # 這一圈新按下的鍵是哪根手指按的：note → finger_positions 的 index
+        self.pressed_by = {}
 
-    def build_keyboard(self, table_rect):
+        self.hold_scale = hold_scale
+
+        # 沒按下的鍵畫成靜態圖層
+        self.layers = LayerCache()
+        # 每個鍵是否按著（最後多一格給 -1 用，永遠是 False）
+        self.held = np.zeros(self.num_keys + 1, dtype=bool)
+
+    def build_keyboard(self, frame_w, table_y, center_x, key_width):
         """
-        依照桌面的 x, w 動態生成 15 顆圓形鍵盤位置
+        根據桌面水平線 + 中心點 + 鍵寬動態生成圓形鍵盤位置
+        frame_w  : 相機畫面寬度
+        table_y  : 桌面 y 像素位置
+        center_x : 食指所在的水平基準位置
+        key_width: 推估的鍵間距（由手掌寬度決定）
         """
-        x, y, w, h = table_rect
-        key_y = y - 25   # 琴鍵列（桌面正上方）
-        step = w / len(self.notes_order)
+        self.frame_w = frame_w
+        self.table_y = table_y
+        self.center_x = center_x
+        self.base_key_width = key_width
 
-        self.key_centers = []
-        for i, note in enumerate(self.notes_order):
-            cx = int(x + (i + 0.5) * step)
-            self.key_centers.append((cx, key_y, note))
+        self._layout_keys()
+        self.pressed_keys = {i for i, n in enumerate(self.notes_order) if self.key_states[n]}
+        self.held[:] = False
+        if self.pressed_keys:
+            self.held[list(self.pressed_keys)] = True
+
+    def _layout_keys(self):
+        """
+        下排白鍵等距排列，第 i 格中心 x = x0 + i * step；
+        上排黑鍵位在第 slot 與 slot+1 格中間。
+        """
+        row0 = self.layout.row0
+        row1 = self.layout.row1
+
+        self.step = max(self.base_key_width * self.zoom, 1)
+
+        # 以食指位置為中心，左右展開
+        half = len(row0) // 2
+        self.x0 = self.center_x - (half + self.view_offset) * self.step
+
+        cy0 = int(self.table_y - 35)
+        cy1 = cy0 - (self.key_radius + self.black_radius + 6)
+        self.row_y = (cy0, cy1)
+
+        centers = [None] * self.num_keys
+        self.slot_to_key0 = np.empty(len(row0), dtype=np.intp)
+        self.slot_to_key1 = np.full(len(row0), -1, dtype=np.intp)
+
+        for slot, note in enumerate(row0):
+            k = self.note_index[note]
+            centers[k] = (int(self.x0 + slot * self.step), cy0, note)
+            self.slot_to_key0[slot] = k
+
+        for slot, note in row1:
+            k = self.note_index[note]
+            centers[k] = (int(self.x0 + (slot + 0.5) * self.step), cy1, note)
+            self.slot_to_key1[slot] = k
+
+        self.key_centers = centers
+        self.centers_xy = np.array([(cx, cy) for cx, cy, _ in centers], dtype=np.float64)
+        self.centers_x = np.ascontiguousarray(self.centers_xy[:, 0])
+        self._build_hit_index()
+
+    def scroll(self, n_keys):
+        """往右（正）/ 左（負）平移 n 個白鍵"""
+        self.view_offset += n_keys
+        if self.step:
+            self._layout_keys()
+
+    def set_zoom(self, zoom):
+        self.zoom = min(max(zoom, 0.5), 3.0)
+        if self.step:
+            self._layout_keys()
 
     # def check_pressed(self, finger_positions):
     #     states = [0] * self.num_keys
@@ -59,70 +150,174 @@ class Keyboard:
     #     pressed_notes = [self.notes_order[i] for i, s in enumerate(states) if s == 1]
     #     return pressed_notes
 
-    def check_pressed(self, finger_positions):
-        newly_pressed = []
-        newly_released = []
+    def _build_hit_index(self):
+        """
+        hit-test 用的查表：兩排各自的 slot → key（前後各墊一格 -1），
+        以及每個候選格子的偏移量、所在排的 y 與判定距離。
+        """
+        n = len(self.layout.row0)
+        table = np.full((2, n + 2), -1, dtype=np.intp)
+        table[0, 1:-1] = self.slot_to_key0
+        table[1, 1:-1] = self.slot_to_key1
+        self.hit_table = table.ravel()
+        self.hit_n = n
 
-        current_pressed = set()
+        # 只需要檢查最近格子左右 r 格，跟鍵盤總共有幾顆鍵無關
+        r = int(math.ceil((max(self.hit_threshold, self.black_hit_threshold) + 1) / self.step + 0.5))
+        span = np.arange(-r, r + 1)
+        c = len(span)
+        self.hit_offsets = np.concatenate([span, span])
+        self.hit_shift = np.repeat([0.0, 0.5], c)
+        # 攤平後的 table 位置 = 格子編號 + 該排起點 + 1（墊的那格）
+        self.hit_base = np.repeat([1, n + 3], c)
+        self.hit_y = np.repeat(np.array(self.row_y, dtype=np.float64), c)
+        self.hit_thr2 = np.repeat([self.hit_threshold ** 2, self.black_hit_threshold ** 2], c).astype(np.float64)
 
-        for fx, fy, _ in finger_positions:
-            for (kx, ky, note) in self.key_centers:
-                if math.dist((fx, fy), (kx, ky)) < self.hit_threshold:
-                    current_pressed.add(note)
+    def _hit_keys(self, tips):
+        """
+        tips: (F, 2)。用 x 座標換算最近的格子，只檢查附近幾格（O(手指數)）。
+        回傳 {被按到的鍵 index: 第一根按到它的手指 index}。
+        """
+        fx = tips[:, 0:1]
+        fy = tips[:, 1:2]
 
-        for note in self.key_states:
-            if current_pressed.__contains__(note) and not self.key_states[note]:
-                newly_pressed.append(note)
-                self.key_states[note] = True
+        u = (fx - self.x0) / self.step - self.hit_shift
+        cand = np.rint(u).astype(np.intp) + self.hit_offsets
+        # 超出鍵盤的格子都落到墊的 -1（np.clip 對小陣列太慢）
+        np.maximum(cand, -1, out=cand)
+        np.minimum(cand, self.hit_n, out=cand)
+        keys = self.hit_table[cand + self.hit_base]
 
-            elif not current_pressed.__contains__(note) and self.key_states[note]:
-                newly_released.append(note)
-                self.key_states[note] = False
+        dx = self.centers_x[keys] - fx
+        dy = self.hit_y - fy
+        thr2 = self.hit_thr2
+        if self.hold_scale != 1.0 and self.pressed_keys:
+            thr2 = np.where(self.held[keys], thr2 * self.hold_scale ** 2, thr2)
+        hit = (keys >= 0) & (dx * dx + dy * dy < thr2)
 
-        return newly_pressed, newly_released
+        fingers, cols = np.nonzero(hit)
+        hits = {}
+        for f, k in zip(fingers.tolist(), keys[fingers, cols].tolist()):
+            hits.setdefault(k, f)
+        return hits
 
-    def draw(self, frame, pressed_notes, next_note=None):
+    def check_pressed(self, finger_positions, active=None):
         """
-        在桌面上方畫 15 顆圓形琴鍵（取代方形鋼琴鍵）
+        回傳 (newly_pressed, newly_released)，順序與 notes_order 相同。
+        active: 與 finger_positions 對齊的 PressDetector 狀態（UP / HOLD / STRIKE），
+                None 表示全部手指都算（只看距離）。
+                STRIKE 的手指可以按下新的鍵，HOLD 的手指只能維持已經按著的鍵，
+                按著滑過去不會觸發旁邊的鍵。
         """
-        radius = self.key_radius
+        hits = {}
+        if finger_positions and self.step:
+            tips = np.array([(fx, fy) for fx, fy, _ in finger_positions], dtype=np.float64)
+            if active is None:
+                hits = self._hit_keys(tips)
+            else:
+                active = np.asarray(active)
+                hold = np.flatnonzero(active == HOLD)
+                strike = np.flatnonzero(active == STRIKE)
+                # pressed_by 仍然對應到原本 finger_positions 的 index
+                if len(hold):
+                    for k, f in self._hit_keys(tips[hold]).items():
+                        if k in self.pressed_keys:
+                            hits[k] = int(hold[f])
+                if len(strike):
+                    for k, f in self._hit_keys(tips[strike]).items():
+                        hits.setdefault(k, int(strike[f]))
+        current = set(hits)
 
-        for (cx, cy, note) in self.key_centers:
+        newly_pressed = []
+        newly_released = []
+        self.pressed_by = {}
 
-            if next_note == note and note not in pressed_notes:
-                cv2.circle(frame, (cx, cy), radius+4, self.practice_color, -1)
-                continue
+        for i in sorted(current - self.pressed_keys):
+            note = self.notes_order[i]
+            newly_pressed.append(note)
+            self.key_states[note] = True
+            self.pressed_by[note] = hits[i]
 
-            # 按下 → 實心，否則空心
-            if note in pressed_notes:
-                cv2.circle(frame, (cx, cy), radius, (0, 255, 0), -1)
-            else:
-                cv2.circle(frame, (cx, cy), radius, (0, 255, 0), 2)
+        for i in sorted(self.pressed_keys - current):
+            note = self.notes_order[i]
+            newly_released.append(note)
+            self.key_states[note] = False
 
-            # 標示音名
-            cv2.putText(frame, note, (cx - 15, cy + 25),
-                        cv2.FONT_HERSHEY_SIMPLEX,
-                        0.5, (255, 255, 255), 2)
-    def build_keyboard(self, frame_w, table_y, center_x, key_width):
+        self.pressed_keys = current
+        if self.hold_scale != 1.0 and (newly_pressed or newly_released):
+            self.held[:] = False
+            if current:
+                self.held[list(current)] = True
+        return newly_pressed, newly_released
+
+    def visible_slots(self):
+        """畫面內的白鍵格範圍 [s0, s1)"""
+        margin = self.key_radius + 4
+        s0 = int(math.floor((-margin - self.x0) / self.step))
+        s1 = int(math.ceil((self.frame_w + margin - self.x0) / self.step)) + 1
+        return max(s0, 0), min(s1, len(self.layout.row0))
+
+    def draw(self, frame, pressed_notes, next_notes=()):
         """
-        根據桌面水平線 + 中心點 + 鍵寬動態生成圓形鍵盤位置
-        frame_w  : 相機畫面寬度
-        table_y  : 桌面 y 像素位置
-        center_x : 食指所在的水平基準位置
-        key_width: 推估的鍵間距（由手掌寬度決定）
+        在桌面上方畫圓形琴鍵（取代方形鋼琴鍵），只畫畫面內看得到的鍵。
+        沒按下的鍵是靜態圖層，版面（scroll / zoom / 重新校正）變了才重畫；
+        每張 frame 只重畫按下的鍵與練習提示。
+        next_notes: 練習模式接下來要按的音（和弦可以有好幾個；單一音名也可以）
         """
+        if not self.step:
+            return
 
-        num_keys = len(self.notes_order)
+        key = (frame.shape, self.x0, self.step, self.row_y)
+        self.layers.get(key, lambda: render_layer(frame.shape, self._draw_static)).blend(frame)
 
-        # 以食指位置為中心，左右展開 15 顆鍵
-        half = num_keys // 2
+        for note in pressed_notes:
+            self._draw_pressed(frame, note)
 
-        self.key_centers = []
+        # 練習模式下一個要按的鍵
+        if isinstance(next_notes, str):
+            next_notes = (next_notes,)
+        for next_note in next_notes:
+            if next_note in self.note_index and next_note not in pressed_notes:
+                cx, cy, _ = self.key_centers[self.note_index[next_note]]
+                cv2.circle(frame, (cx, cy), self._radius(next_note)+4, self.practice_color, -1)
+
+    def _draw_static(self, canvas):
+        """所有看得到的鍵（沒按下的樣子）畫到圖層畫布上"""
+        s0, s1 = self.visible_slots()
+
+        for k in self.slot_to_key0[s0:s1]:
+            self._draw_key(canvas, self.key_centers[k], self.key_radius, False)
+
+        for k in self.slot_to_key1[s0:s1]:
+            if k >= 0:
+                self._draw_key(canvas, self.key_centers[k], self.black_radius, True)
 
-        for i, note in enumerate(self.notes_order):
-            # ex: i = 0 → offset = -7
-            offset = i - half
-            cx = int(center_x + offset * key_width)
-            cy = int(table_y - 35)
+    def _radius(self, note):
+        k = self.note_index[note]
+        return self.key_radius if self.key_centers[k][1] == self.row_y[0] else self.black_radius
 
-            self.key_centers.append((cx, cy, note))
\ No newline at end of file
+    def _draw_key(self, canvas, center, radius, black):
+        cx, cy, note = center
+
+        # 平常空心（黑鍵是深色實心）
+        if black:
+            cv2.circle(canvas, (cx, cy), radius, self.black_color, -1)
+        cv2.circle(canvas, (cx, cy), radius, (0, 255, 0), 2)
+
+        # 標示音名（黑鍵字太擠，只畫白鍵）
+        if not black:
+            cv2.putText(canvas, note, (cx - 15, cy + 25),
+                        cv2.FONT_HERSHEY_SIMPLEX,
+                        0.5, (255, 255, 255), 2)
+
+    def _draw_pressed(self, frame, note):
+        """按下 → 實心"""
+        k = self.note_index.get(note)
+        if k is None:
+            return
+        cx, cy, _ = self.key_centers[k]
+        cv2.circle(frame, (cx, cy), self._radius(note), (0, 255, 0), -1)
+        if self.key_centers[k][1] == self.row_y[0]:
+            cv2.putText(frame, note, (cx - 15, cy + 25),
+                        cv2.FONT_HERSHEY_SIMPLEX,
+                        0.5, (255, 255, 255), 2)
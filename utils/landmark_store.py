@@ -0,0 +1,173 @@
+# utils/landmark_store.py
+"""
+HandTracker.detect 輸出的二進位儲存格式 (.lmk)。
+
+  header (64 bytes)
+    magic        4s   b"APLM"
+    version      u2
+    header_size  u2
+    record_size  u4
+    frame_w      u4
+    frame_h      u4
+    n_frames     u8   close() 時寫回；讀取時以檔案大小為準，中途當掉也讀得到
+    reserved     ...
+  records，每張 frame 一筆固定長度 RECORD_DTYPE（516 bytes）
+
+固定長度 → 第 i 張 frame 的位置就是 header_size + i * record_size，
+用 numpy.memmap 讀取可以 O(1) 跳到任何 frame，不需要整個檔案載入記憶體。
+30 fps 大約 0.9 MB / 分鐘。
+"""
+import os
+import struct
+import numpy as np
+
+MAGIC = b"APLM"
+VERSION = 1
+HEADER_SIZE = 64
+HEADER_FORMAT = "<4sHHIIIQ"
+
+# flags
+HAS_LEFT = 1
+HAS_RIGHT = 2
+RIGHT_FIRST = 4     # handed_list 的順序（MediaPipe 回傳時 Right 在前）
+EXTRAPOLATED = 8    # governor 跳過推論，這張是 LandmarkExtrapolator 外插的，不是偵測結果
+
+RECORD_DTYPE = np.dtype([
+    ("t", "<f8"),
+    ("flags", "<u4"),
+    ("left", "<f4", (21, 3)),
+    ("right", "<f4", (21, 3)),
+])
+
+
+class LandmarkWriter:
+    def __init__(self, path, frame_size):
+        self.path = path
+        self.frame_w, self.frame_h = frame_size
+        self.n_frames = 0
+
+        self.f = open(path, "wb")
+        self._write_header()
+
+        # 重複使用同一筆 record buffer，每張 frame 不用重新配置
+        self.record = np.zeros(1, dtype=RECORD_DTYPE)
+
+    def write(self, t, left_hand, right_hand, handed_list=(), extrapolated=False):
+        rec = self.record[0]
+        rec["t"] = t
+
+        flags = 0
+        if left_hand is not None:
+            rec["left"] = left_hand
+            flags |= HAS_LEFT
+        else:
+            rec["left"] = np.nan
+        if right_hand is not None:
+            rec["right"] = right_hand
+            flags |= HAS_RIGHT
+        else:
+            rec["right"] = np.nan
+        if handed_list and handed_list[0] == "Right":
+            flags |= RIGHT_FIRST
+        if extrapolated:
+            flags |= EXTRAPOLATED
+        rec["flags"] = flags
+
+        self.f.write(self.record.tobytes())
+        self.n_frames += 1
+
+    def close(self):
+        if self.f is None:
+            return
+        self.f.seek(0)
+        self._write_header()
+        self.f.close()
+        self.f = None
+
+    def _write_header(self):
+        header = struct.pack(HEADER_FORMAT, MAGIC, VERSION, HEADER_SIZE,
+                             RECORD_DTYPE.itemsize, self.frame_w, self.frame_h,
+                             self.n_frames)
+        self.f.write(header.ljust(HEADER_SIZE, b"\0"))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LandmarkReader:
+    """
+    以 memmap 讀取 .lmk。records["t"] / records["left"] ... 都是 view，不會複製。
+    """
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            header = f.read(HEADER_SIZE)
+
+        magic, version, header_size, record_size, frame_w, frame_h, _ = \
+            struct.unpack_from(HEADER_FORMAT, header)
+        if magic != MAGIC:
+            raise ValueError(f"Not a landmark file: {path}")
+        if version != VERSION or record_size != RECORD_DTYPE.itemsize:
+            raise ValueError(f"Unsupported landmark file version {version}: {path}")
+
+        self.path = path
+        self.frame_size = (frame_w, frame_h)
+
+        n = (os.path.getsize(path) - header_size) // record_size
+        if n > 0:
+            self.records = np.memmap(path, dtype=RECORD_DTYPE, mode="r",
+                                     offset=header_size, shape=(n,))
+        else:
+            self.records = np.zeros(0, dtype=RECORD_DTYPE)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, i):
+        """回傳與 HandTracker.detect 相同格式的 tuple"""
+        return self.get(i)
+
+    def get(self, i, out=None):
+        """out: (2, 21, 3) float64 buffer，左右手複製進去；None 時另外配置"""
+        rec = self.records[i]
+        flags = int(rec["flags"])
+
+        left_hand = right_hand = None
+        if out is None:
+            if flags & HAS_LEFT:
+                left_hand = np.array(rec["left"], dtype=np.float64)
+            if flags & HAS_RIGHT:
+                right_hand = np.array(rec["right"], dtype=np.float64)
+        else:
+            if flags & HAS_LEFT:
+                left_hand = out[0]
+                np.copyto(left_hand, rec["left"])
+            if flags & HAS_RIGHT:
+                right_hand = out[1]
+                np.copyto(right_hand, rec["right"])
+        left_z = left_hand[8][2] if left_hand is not None else None
+        right_z = right_hand[8][2] if right_hand is not None else None
+
+        handed_list = []
+        if left_hand is not None:
+            handed_list.append("Left")
+        if right_hand is not None:
+            handed_list.append("Right")
+        if flags & RIGHT_FIRST:
+            handed_list.reverse()
+
+        return left_hand, right_hand, left_z, right_z, handed_list
+
+    def detected(self):
+        """真的有跑偵測的 frame 編號（沒有 EXTRAPOLATED 旗標的）"""
+        return np.flatnonzero((self.records["flags"] & EXTRAPOLATED) == 0)
+
+    def timestamp(self, i):
+        return float(self.records[i]["t"])
+
+    def index_at(self, t):
+        """時間 t 當下（或之前最近）的 frame 編號，二分搜尋"""
+        idx = int(np.searchsorted(self.records["t"], t, side="right")) - 1
+        return max(idx, 0)
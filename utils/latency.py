@@ -0,0 +1,66 @@
+# utils/latency.py
+import threading
+import collections
+import numpy as np
+
+
+class LatencyStats:
+    """
+    Per-stage latency counters.
+    每個階段只保留最近 window 筆樣本（秒），summary() 轉成毫秒的統計值。
+    """
+    def __init__(self, window=600):
+        self.window = window
+        self.samples = {}
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self.lock:
+            buf = self.samples.get(stage)
+            if buf is None:
+                buf = collections.deque(maxlen=self.window)
+                self.samples[stage] = buf
+                self.counts[stage] = 0
+            buf.append(seconds)
+            self.counts[stage] += 1
+
+    def count(self, stage, n=1):
+        """純計數器（例如丟掉的 frame 數），不記錄時間"""
+        with self.lock:
+            self.counts[stage] = self.counts.get(stage, 0) + n
+
+    def summary(self):
+        with self.lock:
+            snapshot = {k: list(v) for k, v in self.samples.items()}
+            counts = dict(self.counts)
+
+        result = {}
+        for stage, n in counts.items():
+            values = snapshot.get(stage)
+            if not values:
+                result[stage] = {"count": n}
+                continue
+            ms = np.asarray(values) * 1000.0
+            p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+            result[stage] = {
+                "count": n,
+                "mean_ms": round(float(ms.mean()), 3),
+                "p50_ms": round(float(p50), 3),
+                "p95_ms": round(float(p95), 3),
+                "p99_ms": round(float(p99), 3),
+                "max_ms": round(float(ms.max()), 3),
+            }
+        return result
+
+    def report(self):
+        summary = self.summary()
+        if not summary:
+            return
+        print("---- latency (ms) ----")
+        for stage, s in summary.items():
+            if "p50_ms" in s:
+                print(f"{stage:>16}: p50 {s['p50_ms']:7.2f}  p95 {s['p95_ms']:7.2f}  "
+                      f"max {s['max_ms']:7.2f}  (n={s['count']})")
+            else:
+                print(f"{stage:>16}: {s['count']}")
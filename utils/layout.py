@@ -0,0 +1,96 @@
+# utils/layout.py
+"""
+鍵盤配置：音域、是否有黑鍵。
+Keyboard 的 note map / hit-test 結構與 SoundPlayer 載入的音色都從這裡來。
+"""
+import re
+
+NOTE_NAMES = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
+BLACK_PITCH_CLASSES = {1, 3, 6, 8, 10}
+
+_FLATS = {"Db": "C#", "Eb": "D#", "Gb": "F#", "Ab": "G#", "Bb": "A#"}
+_NOTE_RE = re.compile(r"^([A-G][#b]?)(-?\d+)$")
+
+
+def note_to_midi(name):
+    """'C4' → 60，'F#3' / 'Gb3' → 54"""
+    m = _NOTE_RE.match(name)
+    if m is None:
+        raise ValueError(f"Invalid note name: {name}")
+    pitch, octave = m.groups()
+    pitch = _FLATS.get(pitch, pitch)
+    return NOTE_NAMES.index(pitch) + (int(octave) + 1) * 12
+
+
+def midi_to_note(midi):
+    """60 → 'C4'"""
+    return f"{NOTE_NAMES[midi % 12]}{midi // 12 - 1}"
+
+
+def is_black(midi):
+    return midi % 12 in BLACK_PITCH_CLASSES
+
+
+class KeyboardLayout:
+    """
+    row0：下排（白鍵，或 from_note_map 時的所有鍵），等距排列
+    row1：上排黑鍵，位在兩個白鍵之間
+
+    slot 是「白鍵格」的編號；黑鍵的 slot 是它左邊白鍵的 slot，
+    所以兩排都可以用 x 座標直接換算 slot，hit-test 不用掃過所有鍵。
+    """
+    def __init__(self, low="C3", high="C5", black_keys=False):
+        self.low = note_to_midi(low) if isinstance(low, str) else low
+        self.high = note_to_midi(high) if isinstance(high, str) else high
+        if self.low > self.high:
+            raise ValueError(f"Invalid range: {low}-{high}")
+        self.black_keys = black_keys
+
+        row0 = []
+        row1 = []   # (slot, note)
+        for midi in range(self.low, self.high + 1):
+            if is_black(midi):
+                # 第一顆白鍵之前的黑鍵沒有位置放
+                if black_keys and row0:
+                    row1.append((len(row0) - 1, midi_to_note(midi)))
+            else:
+                row0.append(midi_to_note(midi))
+
+        self._set_rows(row0, row1)
+
+    @classmethod
+    def from_note_map(cls, note_map):
+        """舊的寫法：傳入 {note: midi}，全部排成一排"""
+        layout = cls.__new__(cls)
+        layout.low = min(note_map.values())
+        layout.high = max(note_map.values())
+        layout.black_keys = False
+        layout._set_rows(list(note_map.keys()), [], dict(note_map))
+        return layout
+
+    @classmethod
+    def parse(cls, text, black_keys=False):
+        """'C3-C5' → KeyboardLayout；'88' → 完整 88 鍵"""
+        if text == "88":
+            return cls("A0", "C8", black_keys=True)
+        low, high = text.split("-")
+        return cls(low, high, black_keys=black_keys)
+
+    def _set_rows(self, row0, row1, note_map=None):
+        self.row0 = row0
+        self.row1 = row1
+        if note_map is None:
+            # 依音高排序，Keyboard 的 notes_order 用這個順序
+            notes = row0 + [n for _, n in row1]
+            note_map = dict(sorted(((n, note_to_midi(n)) for n in notes), key=lambda kv: kv[1]))
+        self.note_map = note_map
+
+    def __len__(self):
+        return len(self.note_map)
+
+    def __repr__(self):
+        black = "+black" if self.row1 else ""
+        return f"KeyboardLayout({midi_to_note(self.low)}-{midi_to_note(self.high)}{black}, {len(self)} keys)"
+
+
+DEFAULT_LAYOUT = KeyboardLayout("C3", "C5")
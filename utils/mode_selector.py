@@ -1,4 +1,10 @@
 import cv2
+from .compositor import LayerCache, render_layer
+
+BUTTON_BASE = (255, 255, 255)       # 預設白色
+BUTTON_HOVER = (180, 180, 180)      # hover會變灰色
+BUTTON_OUTLINE = (0, 0, 0)
+BUTTON_FONT = (0, 0, 0)
 
 class ModeSelector:
     def __init__(self):
@@ -10,6 +16,9 @@ class ModeSelector:
         self.practice_color = (0, 255, 0)
         self.hover_color = (255, 255, 0)
 
+        # 按鈕沒 hover 的樣子是靜態圖層
+        self.layers = LayerCache()
+
     def build_buttons(self, frame_w, frame_h=480):
         btn_width = frame_w // 3
         btn_height = 60
@@ -48,25 +57,23 @@ class ModeSelector:
         if self.record_btn is None or self.practice_btn is None:
             return
 
-        rx1, ry1, rx2, ry2 = self.record_btn
-        px1, py1, px2, py2 = self.practice_btn
-
-        base_color = (255, 255, 255)      # 預設白色
-        hover_color = (180, 180, 180)     # hover會變灰色
-        outline = (0, 0, 0)               
-        font_color = (0, 0, 0)           
-
-        color = hover_color if hover == "record" else base_color
-        cv2.rectangle(frame, (rx1, ry1), (rx2, ry2), color, -1)
-        cv2.rectangle(frame, (rx1, ry1), (rx2, ry2), outline, 2)
-        cv2.putText(frame, "RECORD",
-                    (rx1 + 20, ry1 + 40),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, font_color, 2)
-
-        color = hover_color if hover == "practice" else base_color
-        cv2.rectangle(frame, (px1, py1), (px2, py2), color, -1)
-        cv2.rectangle(frame, (px1, py1), (px2, py2), outline, 2)
-        cv2.putText(frame, "PRACTICE",
-                    (px1 + 20, py1 + 40),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, font_color, 2)
-
+        key = (frame.shape, self.record_btn, self.practice_btn)
+        self.layers.get(key, lambda: render_layer(frame.shape, self._draw_static)).blend(frame)
+
+        # hover 的按鈕才重畫（變灰色）
+        if hover == "record":
+            self._draw_button(frame, self.record_btn, "RECORD", BUTTON_HOVER)
+        elif hover == "practice":
+            self._draw_button(frame, self.practice_btn, "PRACTICE", BUTTON_HOVER)
+
+    def _draw_static(self, canvas):
+        self._draw_button(canvas, self.record_btn, "RECORD", BUTTON_BASE)
+        self._draw_button(canvas, self.practice_btn, "PRACTICE", BUTTON_BASE)
+
+    def _draw_button(self, img, btn, text, color):
+        x1, y1, x2, y2 = btn
+        cv2.rectangle(img, (x1, y1), (x2, y2), color, -1)
+        cv2.rectangle(img, (x1, y1), (x2, y2), BUTTON_OUTLINE, 2)
+        cv2.putText(img, text,
+                    (x1 + 20, y1 + 40),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, BUTTON_FONT, 2)
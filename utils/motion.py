@@ -0,0 +1,82 @@
+# utils/motion.py
+import numpy as np
+
+from .hand_processing import NUM_FINGER_SLOTS
+
+
+class FingerMotionTracker:
+    """
+    每根手指最近 history 張 frame 的位置放在固定大小的 ring buffer，
+    每張 frame 每根手指只寫入一次（O(1)），需要時才用最舊 / 最新兩筆估計速度。
+
+    y 以畫面高度正規化（0~1），所以跟相機解析度無關；往下為正。
+    z 是 MediaPipe 的相對深度（越小越靠近相機），敲擊時指尖也會往相機靠近。
+    """
+    def __init__(self, frame_h, history=4, min_speed=0.1, max_speed=2.0, min_velocity=20, z_weight=0.5):
+        """
+        min_speed / max_speed：對應到 min_velocity / 127 的敲擊速度（畫面高度 / 秒）
+        z_weight：往相機靠近的速度算進敲擊速度的比重（0 = 只看 y）
+        """
+        self.frame_h = frame_h
+        self.history = history
+        self.min_speed = min_speed
+        self.max_speed = max_speed
+        self.min_velocity = min_velocity
+        self.z_weight = z_weight
+
+        self.pos = np.zeros((NUM_FINGER_SLOTS, history, 2), dtype=np.float64)   # (y, z)
+        self.times = np.zeros((NUM_FINGER_SLOTS, history), dtype=np.float64)
+        self.head = np.zeros(NUM_FINGER_SLOTS, dtype=np.intp)    # 下一筆寫入的位置
+        self.count = np.zeros(NUM_FINGER_SLOTS, dtype=np.intp)   # 目前有幾筆有效資料
+
+    def update(self, fingers, slots, t):
+        """fingers: extract_finger_pixels 的結果；slots: finger_slots 的結果"""
+        seen = np.zeros(NUM_FINGER_SLOTS, dtype=bool)
+        for (_, y, z), s in zip(fingers, slots):
+            h = self.head[s]
+            self.pos[s, h, 0] = y / self.frame_h
+            self.pos[s, h, 1] = z
+            self.times[s, h] = t
+            self.head[s] = (h + 1) % self.history
+            if self.count[s] < self.history:
+                self.count[s] += 1
+            seen[s] = True
+
+        # 手消失了 → 那幾根手指的歷史作廢，避免重新出現時算出很大的速度
+        self.count[~seen] = 0
+
+    def _delta(self, slot):
+        """最舊到最新那筆的 (dy, dz) / dt；資料不足回傳 None"""
+        n = self.count[slot]
+        if n < 2:
+            return None
+        newest = (self.head[slot] - 1) % self.history
+        oldest = (self.head[slot] - n) % self.history
+        dt = self.times[slot, newest] - self.times[slot, oldest]
+        if dt <= 0:
+            return None
+        return (self.pos[slot, newest] - self.pos[slot, oldest]) / dt
+
+    def down_speed(self, slot):
+        """最近幾張 frame 往下的平均速度（畫面高度 / 秒），資料不足回傳 None"""
+        delta = self._delta(slot)
+        return delta[0] if delta is not None else None
+
+    def strike_speed(self, slot):
+        """
+        敲擊速度：往下的速度 + z_weight × 往相機靠近的速度（離開相機不扣分）。
+        相機在正上方時 y 幾乎不動，靠 z 才量得到力道。
+        """
+        delta = self._delta(slot)
+        if delta is None:
+            return None
+        return delta[0] + self.z_weight * max(-delta[1], 0.0)
+
+    def strike_velocity(self, slot, default=90):
+        """敲擊速度 → MIDI velocity (min_velocity~127)"""
+        speed = self.strike_speed(slot)
+        if speed is None:
+            return default
+        ratio = (speed - self.min_speed) / (self.max_speed - self.min_speed)
+        ratio = min(max(ratio, 0.0), 1.0)
+        return int(round(self.min_velocity + ratio * (127 - self.min_velocity)))
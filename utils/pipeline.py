@@ -0,0 +1,326 @@
+# utils/pipeline.py
+import threading
+import collections
+import time
+import cv2
+import numpy as np
+
+from .buffers import BufferPool
+from .latency import LatencyStats
+from . import clock
+
+
+class FramePacket:
+    """
+    一張 frame 在 pipeline 中流動時帶的資料。
+    t_* 都是 time.perf_counter() 的時間點，用來算每個階段的延遲；
+    timestamp 是拍攝當下的 clock.now()（重播時就是錄製時的時間）。
+    """
+    def __init__(self, seq, frame, t_capture, timestamp=None):
+        self.seq = seq
+        self.frame = frame
+        self.t_capture = t_capture
+        self.timestamp = timestamp
+
+        # HandTracker.detect 的回傳值 (left_hand, right_hand, left_z, right_z, handed_list)
+        self.hands = None
+        self.t_infer_start = None
+        self.t_infer_end = None
+        self.t_render = None
+
+        # 從 BufferPool 借來的 buffer：(pool, buf)，release() 時還回去
+        self.borrowed = []
+
+    def borrow(self, pool, buf):
+        self.borrowed.append((pool, buf))
+        return buf
+
+    def release(self):
+        for pool, buf in self.borrowed:
+            pool.release(buf)
+        self.borrowed = []
+
+
+class FrameRing:
+    """
+    Bounded drop-oldest ring buffer.
+    寫入端永遠不會被擋住；滿了就丟掉最舊的。讀取端只拿最新的一筆，
+    比它舊的也一併丟掉，所以消費者永遠處理最新的資料。
+    """
+    def __init__(self, capacity=2, stats=None, name="ring", on_drop=None):
+        """on_drop(item): 丟掉的項目交給它（例如把 frame buffer 還給 pool）"""
+        self.items = collections.deque()
+        self.capacity = capacity
+        self.cond = threading.Condition()
+        self.closed = False
+        self.stats = stats
+        self.name = name
+        self.on_drop = on_drop
+
+    def put(self, item):
+        with self.cond:
+            if len(self.items) >= self.capacity:
+                self._drop(self.items.popleft())
+                self._dropped(1)
+            self.items.append(item)
+            self.cond.notify()
+
+    def get_latest(self, timeout=None):
+        """回傳最新的一筆；timeout 或已關閉且沒資料時回傳 None"""
+        with self.cond:
+            if not self.items and not self.closed:
+                self.cond.wait(timeout)
+            if not self.items:
+                return None
+            item = self.items.pop()
+            if self.items:
+                self._dropped(len(self.items))
+                while self.items:
+                    self._drop(self.items.popleft())
+            return item
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def is_finished(self):
+        with self.cond:
+            return self.closed and not self.items
+
+    def _drop(self, item):
+        if self.on_drop is not None:
+            self.on_drop(item)
+
+    def _dropped(self, n):
+        if self.stats is not None:
+            self.stats.count(f"{self.name}_dropped", n)
+
+
+class FramePipeline:
+    """
+    capture thread → [frame ring] → inference worker → [result ring] → render/audio (呼叫端)
+
+    detector 是任何有 detect(frame) 的物件，通常是 HandTracker，
+    重播 landmark 檔時則是 LandmarkReplaySource 本身。
+
+    threaded=False 時退化成原本的單執行緒流程（read → detect），
+    方便比較延遲或需要逐張處理的情況（例如重播）。
+
+    frame 與 landmark 都放在重複使用的 buffer 裡：cap.read(buf) 直接寫進 pool 借來的 frame，
+    detector.detect(frame, out) 把兩隻手寫進 (2, 21, 3) 的 buffer。
+    packet 被丟掉、或呼叫端下一次 read() 時，上一個 packet 的 buffer 就還回 pool，
+    所以 read() 回傳的 frame / 手的陣列只在下一次 read() 之前有效。
+
+    偵測用的是相機原始（未鏡像）的畫面，detector 自己把座標鏡像；
+    mirror=True 時 read() 才把畫面原地左右翻轉給使用者看（headless 時不需要）。
+
+    clock: 這個來源自己的時鐘（例如重播檔的 now），capture / inference thread 都用它；
+           None 時用 utils.clock 的全域時鐘。
+    pool : utils.station_server.InferencePool；給了就只開 capture thread，推論交給 pool 的 worker。
+    executor: utils.inference_pool.ProcessInferencePool；推論 thread 改成同時送好幾張給 worker process，
+              結果依 frame 順序交給 detector.finish()（detector 要是 HandTracker）。stop() 時一起關掉。
+    """
+    def __init__(self, cap, detector, threaded=True, ring_size=2, stats=None, mirror=True,
+                 clock=None, pool=None, executor=None):
+        self.cap = cap
+        self.detector = detector
+        self.threaded = threaded
+        self.mirror = mirror
+        self.clock = clock
+        self.pool = pool
+        self.executor = executor
+        self.stats = stats if stats is not None else LatencyStats()
+
+        release = lambda packet: packet.release()
+        self.frame_ring = FrameRing(ring_size, self.stats, "capture", release)
+        self.result_ring = FrameRing(1, self.stats, "result", release)
+
+        # 解析度要等第一張 frame 才知道
+        self.frames = BufferPool()
+        self.hands = BufferPool((2, 21, 3), np.float64)
+        self.current = None     # 最後一次 read() 回傳的 packet
+
+        self.running = False
+        self.threads = []
+        self.seq = 0
+
+    def start(self):
+        if not self.threaded or self.running:
+            return
+        self.running = True
+        self.threads = [threading.Thread(target=self._capture_loop, name="capture", daemon=True)]
+        if self.executor is not None:
+            self.executor.start()
+            self.threads.append(threading.Thread(target=self._executor_loop, name="inference", daemon=True))
+        elif self.pool is None:
+            self.threads.append(threading.Thread(target=self._inference_loop, name="inference", daemon=True))
+        for t in self.threads:
+            t.start()
+
+    def stop(self):
+        self.running = False
+        self.frame_ring.close()
+        self.result_ring.close()
+        for t in self.threads:
+            t.join(timeout=1.0)
+        self.threads = []
+        self._release_current()
+        if self.executor is not None:
+            self.executor.close()
+
+    def read(self, timeout=1.0):
+        """
+        取得下一個已完成手部偵測的 packet。
+        來源結束時回傳 None。上一次回傳的 packet 在這裡還回 pool。
+        """
+        self._release_current()
+        if not self.threaded:
+            packet = self._grab()
+            if packet is not None:
+                self._infer(packet)
+                packet.t_render = time.perf_counter()
+                self._present(packet)
+            return packet
+
+        while True:
+            packet = self.result_ring.get_latest(timeout)
+            if packet is not None:
+                packet.t_render = time.perf_counter()
+                self.stats.add("handoff", packet.t_render - packet.t_infer_end)
+                self._present(packet)
+                return packet
+            if self.result_ring.is_finished():
+                return None
+
+    def poll(self):
+        """
+        不等待的 read()：有新的結果就回傳，否則回傳 None（上一個 packet 仍然有效）。
+        只用在 threaded 模式；是否已經結束用 finished() 判斷。
+        """
+        packet = self.result_ring.get_latest(0)
+        if packet is None:
+            return None
+        self._release_current()
+        packet.t_render = time.perf_counter()
+        self.stats.add("handoff", packet.t_render - packet.t_infer_end)
+        self._present(packet)
+        return packet
+
+    def finished(self):
+        return self.result_ring.is_finished()
+
+    def _present(self, packet):
+        if self.mirror:
+            # 原地翻轉，不另外配置一張 frame
+            cv2.flip(packet.frame, 1, packet.frame)
+        self.current = packet
+
+    def _release_current(self):
+        if self.current is not None:
+            self.current.release()
+            self.current = None
+
+    def _grab(self):
+        buf = self.frames.acquire()
+        ret, frame = self.cap.read(buf) if buf is not None else self.cap.read()
+        t = time.perf_counter()
+        if not ret:
+            self.frames.release(buf)
+            return None
+
+        packet = FramePacket(self.seq, frame, t, clock.now())
+        if frame is buf:
+            packet.borrow(self.frames, frame)
+        else:
+            # 第一張 frame、來源換了解析度，或來源不支援寫進給定的 buffer
+            self.frames.release(buf)
+            if frame.shape != self.frames.shape:
+                # 這張就當成 pool 的第一塊
+                self.frames.reset(frame.shape, frame.dtype)
+                packet.borrow(self.frames, frame)
+        self.seq += 1
+        return packet
+
+    def _infer(self, packet):
+        packet.t_infer_start = time.perf_counter()
+        out = packet.borrow(self.hands, self.hands.acquire())
+        packet.hands = self.detector.detect(packet.frame, out)
+        packet.t_infer_end = time.perf_counter()
+
+        self.stats.add("capture_wait", packet.t_infer_start - packet.t_capture)
+        self.stats.add("inference", packet.t_infer_end - packet.t_infer_start)
+
+    def _capture_loop(self):
+        last = None
+        with clock.using(self.clock):
+            while self.running:
+                packet = self._grab()
+                if packet is None:
+                    break
+                if last is not None:
+                    self.stats.add("capture_interval", packet.t_capture - last)
+                last = packet.t_capture
+                self.frame_ring.put(packet)
+                if self.pool is not None:
+                    self.pool.notify(self)
+        self.frame_ring.close()
+        if self.pool is not None:
+            self.pool.notify(self)
+
+    def _inference_loop(self):
+        with clock.using(self.clock):
+            while self.running:
+                packet = self.frame_ring.get_latest(timeout=0.5)
+                if packet is None:
+                    if self.frame_ring.is_finished():
+                        break
+                    continue
+                self._infer(packet)
+                self.result_ring.put(packet)
+        self.result_ring.close()
+
+    def _executor_loop(self):
+        """
+        推論交給 worker process：有空位就送出最新的 frame，
+        完成的結果依送出順序交給 detector.finish()，不管 worker 誰先做完。
+        """
+        ex = self.executor
+        with clock.using(self.clock):
+            while self.running:
+                submitted = False
+                if ex.ready():
+                    packet = self.frame_ring.get_latest(0 if ex.pending() else 0.05)
+                    if packet is not None:
+                        packet.t_infer_start = time.perf_counter()
+                        job = self.detector.begin(packet.frame, ex.reserve)
+                        ex.submit((packet, job))
+                        submitted = True
+                    elif self.frame_ring.is_finished() and not ex.pending():
+                        break
+                for (packet, job), result in ex.collect(0 if submitted else 0.005):
+                    points, labels, elapsed = result if result is not None else (None, [], 0.0)
+                    out = packet.borrow(self.hands, self.hands.acquire())
+                    packet.hands = self.detector.finish(packet.frame, job, points, labels, elapsed, out)
+                    packet.t_infer_end = time.perf_counter()
+                    self.stats.add("capture_wait", packet.t_infer_start - packet.t_capture)
+                    self.stats.add("inference", packet.t_infer_end - packet.t_infer_start)
+                    if elapsed:
+                        self.stats.add("worker", elapsed)
+                    self.result_ring.put(packet)
+        self.result_ring.close()
+
+    def infer_pending(self):
+        """
+        給 InferencePool 的 worker 呼叫：有等著的 frame 就推論一張並回傳 True。
+        capture 已經結束而且沒有剩下的 frame 時關掉 result ring。
+        """
+        packet = self.frame_ring.get_latest(0)
+        if packet is None:
+            if self.frame_ring.is_finished() and not self.result_ring.closed:
+                self.result_ring.close()
+            return False
+        with clock.using(self.clock):
+            self._infer(packet)
+        self.result_ring.put(packet)
+        return True
@@ -1,88 +1,277 @@
 # utils/practice_ui.py
 
+import bisect
 import cv2
 import os
-import time
-import mido
-from .keyboard import NOTE_MAP, NUM_TO_NOTE
+import string
+from .layout import DEFAULT_LAYOUT
+from . import clock
+from .compositor import LayerCache, render_layer
+from .song_library import SongLibrary, describe
 
 class PracticeUI:
     """
     Overlay style selection menu rendered inside main.py's frame.
     It displays MIDI files on the upper area of the screen.
     Hover fingertip on an item for >2 seconds to select.
+    File names and metadata come from the cached song library (utils.song_library),
+    so nothing is parsed when the menu opens.
+
+    The list is virtualized: only the rows that fit in the menu are drawn (directly,
+    a few putText calls), and hover is computed from the fingertip y, so the cost
+    per frame does not depend on how many songs there are.
+
+      ┌ Select MIDI File:   A* (12/5000)            [ Up ] [Down] ┐
+      │ 1. ...                                                  ▐ │  ← rows; right strip = scrollbar
+      │ ...                                                     ▐ │    (finger position → scroll)
+      └ All  A  B  C ... Z                                        ┘  ← hover a letter = prefix filter
     """
-    def __init__(self, audio_dir="audio"):
+    def __init__(self, audio_dir="audio", layout=DEFAULT_LAYOUT, library=None):
         self.audio_dir = audio_dir
-        self.files = [f for f in os.listdir(audio_dir) if f.endswith(".mid") or f.endswith(".midi")]
+        self.layout = layout
+        # 沒給就只讀現有的快取 index（不在背景建）
+        self.library = library if library is not None else SongLibrary(audio_dir)
 
         # UI Layout
-        self.menu_height = 250          # height of top overlay area
+        self.menu_height = 290          # height of top overlay area
+        self.title_height = 45          # title bar (page buttons on the right)
         self.item_height = 40           # each row height
+        self.bar_height = 40            # letter bar at the bottom
+        self.scroll_width = 50          # scrollbar strip on the right
         self.menu_bg = (230, 230, 230)  # light gray
+        self.rows = (self.menu_height - self.title_height - self.bar_height) // self.item_height
+        self.letters = ["All"] + list(string.ascii_uppercase)
+
+        # Hover times (seconds)
+        self.select_s = 2.0
+        self.filter_s = 1.0
+        self.page_s = 0.6
+
+        # Background + title + buttons + letter bar, rendered when the filter changes
+        self.layers = LayerCache()
+        self.width = None
 
         # State
         self.hover_start = None
+        self.hover_target = None        # ("row", idx) / ("page", ±1) / ("letter", text) / ("scroll", None)
         self.hovered_index = None
         self.selected_file = None
 
         self.midi_practice_audio = None
         self.practice_idx = 0
 
+        # library.version changes whenever the index changes (a song parsed, or failed to parse)
+        self.library_version = None
+        self.set_files([])
+        self.refresh()
+
+    # ---- List / filter ----
+    def set_files(self, files):
+        """Sort case-insensitively so a prefix is one contiguous range (found with bisect)."""
+        self.files = sorted(files, key=str.lower)
+        self.keys = [f.lower() for f in self.files]
+        self.layers.invalidate()
+        self.set_filter("")
+
+    def refresh(self):
+        """Rebuild the list only when the library changed; keeps the filter and scroll position."""
+        version = self.library.version
+        if version == self.library_version:
+            return
+        self.library_version = version
+        files = sorted((name for name, _ in self.library.entries()), key=str.lower)
+        if files == self.files:
+            return
+        prefix, top = self.prefix, self.top
+        self.set_files(files)
+        self.set_filter(prefix)
+        self.scroll_to(top)
+        # 清單變了，原本停著的那一行可能已經是別首
+        self.hover_target = None
+        self.hover_start = None
+
+    def set_filter(self, prefix):
+        """Show only files starting with prefix (case-insensitive); "" shows everything."""
+        self.prefix = prefix
+        p = prefix.lower()
+        self.lo = bisect.bisect_left(self.keys, p)
+        self.hi = bisect.bisect_left(self.keys, p + "\U0010ffff") if p else len(self.keys)
+        self.top = self.lo
+        self.hovered_index = None
+
+    @property
+    def count(self):
+        return self.hi - self.lo
+
+    def scroll_to(self, top):
+        """top = index of the first visible row (clamped to the filtered range)"""
+        last = max(self.lo, self.hi - self.rows)
+        self.top = min(max(top, self.lo), last)
+
+    def page(self, direction):
+        self.scroll_to(self.top + direction * self.rows)
+
+    def visible(self):
+        """Range of file indices currently on screen"""
+        return range(self.top, min(self.top + self.rows, self.hi))
+
+    def _row_y(self, slot):
+        return self.title_height + slot * self.item_height
+
+    # ---- Drawing ----
     def render(self, frame, fingertip):
         """
         Draw overlay menu on the frame & highlight hovered item.
+        The translucent background, title, buttons and letter bar are a cached layer;
+        the visible rows, highlights, scrollbar thumb and cursor are drawn per frame.
         """
         h, w, _ = frame.shape
+        self.width = w
+        self.refresh()
 
-        # Create overlay background
-        overlay = frame.copy()
-        cv2.rectangle(
-            overlay,
-            (0, 0),
-            (w, self.menu_height),
-            self.menu_bg,
-            -1
-        )
+        key = (frame.shape, self.prefix)
+        self.layers.get(key, lambda: render_layer(
+            (self.menu_height, w, 3), self._draw_static,
+            backdrop=(0, 0, w, self.menu_height, self.menu_bg, 0.85))).blend(frame)
 
-        # Blend overlay with transparency
-        alpha = 0.85
-        frame[:self.menu_height] = cv2.addWeighted(
-            overlay[:self.menu_height], alpha,
-            frame[:self.menu_height], 1 - alpha, 0
-        )
+        kind, value = self.hover_target or (None, None)
+        if kind == "page":
+            x1, x2 = self._page_button(value, w)
+            cv2.rectangle(frame, (x1, 8), (x2, self.title_height - 8), (180, 200, 255), -1)
+            self._draw_page_label(frame, value, w)
+        elif kind == "letter":
+            x1, x2 = self._letter_cell(self.letters.index(value), w)
+            y = self.menu_height - self.bar_height
+            cv2.rectangle(frame, (x1, y + 4), (x2, self.menu_height - 4), (180, 200, 255), -1)
+            self._draw_letter(frame, self.letters.index(value), w)
+
+        if self.count == 0:
+            # 篩選後沒有曲子（很少見，直接畫）
+            cv2.putText(frame, f"No songs starting with '{self.prefix}'", (20, self._row_y(0) + 28),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (80, 80, 80), 2)
+
+        for slot, idx in enumerate(self.visible()):
+            y = self._row_y(slot)
+            if idx == self.hovered_index:
+                cv2.rectangle(frame, (10, y + 3), (w - self.scroll_width - 10, y + 33), (180, 200, 255), -1)
+            self._draw_item(frame, idx, y + 28)
+
+        self._draw_scrollbar(frame, w)
 
+        # Draw fingertip cursor
+        if fingertip:
+            fx, fy = fingertip
+            cv2.circle(frame, (fx, fy), 8, (0, 255, 0), -1)
+
+        return frame
+
+    def _draw_static(self, canvas):
+        w = canvas.shape[1]
         # Draw title
         cv2.putText(
-            frame, "Select MIDI File:",
+            canvas, "Select MIDI File:",
             (20, 35),
             cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 0), 2
         )
+        # 篩選條件與筆數
+        label = f"{self.prefix}* " if self.prefix else ""
+        cv2.putText(canvas, f"{label}({self.count}/{len(self.files)})", (340, 33),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (60, 60, 60), 2)
 
-        # Draw file list
-        for idx, file in enumerate(self.files):
-            y = 70 + idx * self.item_height
+        for direction in (-1, 1):
+            x1, x2 = self._page_button(direction, w)
+            cv2.rectangle(canvas, (x1, 8), (x2, self.title_height - 8), (120, 120, 120), 2)
+            self._draw_page_label(canvas, direction, w)
 
-            # Highlight if hovered
-            if self.hovered_index == idx:
-                cv2.rectangle(frame, (10, y - 25), (w - 10, y + 5), (180, 200, 255), -1)
+        for i in range(len(self.letters)):
+            self._draw_letter(canvas, i, w)
 
-            cv2.putText(
-                frame,
-                f"{idx+1}. {file}",
-                (20, y),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                1.0,
-                (0, 0, 0),
-                2
-            )
+        # 捲軸的軌道
+        x1 = w - self.scroll_width + 10
+        y1 = self.title_height + 3
+        y2 = self.title_height + self.rows * self.item_height - 3
+        cv2.rectangle(canvas, (x1, y1), (w - 10, y2), (160, 160, 160), 2)
 
-        # Draw fingertip cursor
-        if fingertip:
-            fx, fy = fingertip
-            cv2.circle(frame, (fx, fy), 8, (0, 255, 0), -1)
+    def _draw_item(self, img, idx, y=28):
+        """One row: "n. name" on the left, metadata on the right (baseline y)"""
+        cv2.putText(
+            img,
+            f"{idx+1}. {self.files[idx]}",
+            (20, y),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            1.0,
+            (0, 0, 0),
+            2
+        )
+        # 長度 / 音數 / 音域 / 速度，靠右；還沒解析好顯示 "..."
+        info = describe(self.library.meta(self.files[idx])) or "..."
+        (tw, _), _ = cv2.getTextSize(info, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 1)
+        x = img.shape[1] - self.scroll_width - tw - 20
+        cv2.putText(img, info, (x, y), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (80, 80, 80), 1)
 
-        return frame
+    def _page_button(self, direction, w):
+        """x range of the Up (-1) / Down (+1) button in the title bar"""
+        x2 = w - 10 if direction > 0 else w - 110
+        return x2 - 90, x2
+
+    def _draw_page_label(self, img, direction, w):
+        x1, _ = self._page_button(direction, w)
+        cv2.putText(img, "Down" if direction > 0 else "Up", (x1 + (12 if direction > 0 else 25), 32),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 0), 2)
+
+    def _letter_cell(self, i, w):
+        """x range of letter-bar cell i ("All" is twice as wide)"""
+        cell = (w - 20) // (len(self.letters) + 1)
+        if i == 0:
+            return 10, 10 + 2 * cell
+        x1 = 10 + (i + 1) * cell
+        return x1, x1 + cell
+
+    def _letter_at(self, fx, w):
+        cell = (w - 20) // (len(self.letters) + 1)
+        i = (fx - 10) // cell
+        if i < 0 or i > len(self.letters):
+            return None
+        return self.letters[max(i - 1, 0)]
+
+    def _draw_letter(self, img, i, w):
+        x1, x2 = self._letter_cell(i, w)
+        text = self.letters[i]
+        (tw, _), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)
+        color = (0, 0, 200) if text == (self.prefix.upper() or "All") else (0, 0, 0)
+        cv2.putText(img, text, ((x1 + x2 - tw) // 2, self.menu_height - 12),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+
+    def _draw_scrollbar(self, frame, w):
+        if self.count <= self.rows:
+            return
+        track_y = self.title_height + 3
+        track_h = self.rows * self.item_height - 6
+        thumb_h = max(20, track_h * self.rows // self.count)
+        offset = (self.top - self.lo) * (track_h - thumb_h) // (self.count - self.rows)
+        cv2.rectangle(frame, (w - self.scroll_width + 12, track_y + offset),
+                      (w - 12, track_y + offset + thumb_h), (120, 120, 120), -1)
+
+    # ---- Hover ----
+    def _target(self, fx, fy, w):
+        """Which control is under the fingertip; O(1) from the coordinates"""
+        if fy < 0 or fy > self.menu_height:
+            return None
+        if fy < self.title_height:
+            for direction in (-1, 1):
+                x1, x2 = self._page_button(direction, w)
+                if x1 <= fx <= x2:
+                    return ("page", direction)
+            return None
+        if fy >= self.menu_height - self.bar_height:
+            letter = self._letter_at(fx, w)
+            return ("letter", letter) if letter is not None else None
+        if fx >= w - self.scroll_width:
+            return ("scroll", None)
+        idx = self.top + (fy - self.title_height) // self.item_height
+        if idx < min(self.top + self.rows, self.hi):
+            return ("row", idx)
+        return None
 
     def update(self, fingertip):
         """
@@ -90,56 +279,44 @@ class PracticeUI:
         Handles hover detection & selection logic.
         Returns the full file path when selected.
         """
-        if fingertip is None:
-            self.hovered_index = None
-            self.hover_start = None
-            return None
-
-        fx, fy = fingertip
+        target = None
+        if fingertip is not None:
+            fx, fy = fingertip
+            target = self._target(fx, fy, self.width or 1280)
 
-        # Only react if fingertip is inside menu area
-        if fy > self.menu_height:
-            self.hovered_index = None
+        now = clock.now()
+        if target != self.hover_target:
+            # reset hover timer
+            self.hover_target = target
+            self.hover_start = now
+        self.hovered_index = target[1] if target is not None and target[0] == "row" else None
+        if target is None:
             self.hover_start = None
             return None
 
-        # Determine which item is hovered
-        for idx in range(len(self.files)):
-            y_top = 70 + idx * self.item_height - 25
-            y_bottom = y_top + self.item_height
-
-            if y_top <= fy <= y_bottom:
-                # Set hovered index
-                if self.hovered_index != idx:
-                    self.hovered_index = idx
-                    self.hover_start = time.time()   # reset hover timer
-                else:
-                    # Check if hovered for > 2 seconds
-                    if time.time() - self.hover_start > 2:
-                        self.selected_file = self.files[idx]
-                        return os.path.join(self.audio_dir, self.selected_file)
-                break
-        else:
-            self.hovered_index = None
-            self.hover_start = None
-
+        kind, value = target
+        held = now - self.hover_start
+        if kind == "scroll":
+            # 捲軸：手指在軌道上的位置直接對到清單位置
+            track_h = self.rows * self.item_height
+            frac = min(max((fy - self.title_height) / track_h, 0.0), 1.0)
+            self.scroll_to(self.lo + round(frac * max(self.count - self.rows, 0)))
+        elif kind == "page" and held > self.page_s:
+            # 停在按鈕上會一直翻頁
+            self.page(value)
+            self.hover_start = now
+        elif kind == "letter" and held > self.filter_s:
+            prefix = "" if value == "All" else value
+            if prefix != self.prefix:
+                self.set_filter(prefix)
+        elif kind == "row" and held > self.select_s:
+            self.selected_file = self.files[value]
+            return os.path.join(self.audio_dir, self.selected_file)
         return None
 
     def is_active(self):
         return self.selected_file is None
-    
+
     def midi_to_notes(self, path):
-        """讀取 MIDI 並回傳 note sequence，例如 ["C4","C4","G4",...]"""
-        mid = mido.MidiFile(path)
-        notes = []
-
-        for track in mid.tracks:
-            for msg in track:
-                if msg.type == "note_on" and msg.velocity > 0:
-                    midi_num = msg.note
-                    if midi_num in NUM_TO_NOTE:
-                        notes.append(NUM_TO_NOTE[midi_num])  
-                    else:
-                        print(f"[Warning] Unknown MIDI note: {midi_num}")
-
-        return notes
\ No newline at end of file
+        """讀取 MIDI 並回傳 note sequence，例如 ["C4","C4","G4",...]（沒有時間與和弦；練習用 utils.song）"""
+        return self.library.load(path, playable=self.layout.note_map).notes()
@@ -0,0 +1,122 @@
+# utils/press_detector.py
+"""
+每根手指一個「按下 / 抬起」狀態機，決定哪些手指可以觸發琴鍵。
+
+只靠距離判斷時，手指懸在鍵上也會響，在邊界抖動還會一直 on/off。這裡改成：
+  抬起 → 按下：指尖 z 到了桌面附近（press_z 以內），而且最近 arm_s 秒內有往下敲的速度
+  按下 → 抬起：指尖 z 離開桌面超過 release_z（比 press_z 大，hysteresis），或快速往上抬
+兩次狀態改變之間至少隔 debounce_s 秒。
+
+桌面高度用 HandTracker 校正的 table_z（食指），其他手指用校正時同一隻手的相對高度補正。
+速度來自 FingerMotionTracker.down_speed（畫面高度 / 秒，往下為正）。
+"""
+import numpy as np
+
+from .hand_processing import NUM_FINGER_SLOTS, TIP_IDS
+
+# update() 回傳的每根手指狀態
+UP = 0          # 抬起：不能按鍵
+HOLD = 1        # 按著：只能維持已經按下的鍵
+STRIKE = 2      # 這張 frame 剛敲下去：可以按下新的鍵
+
+
+class PressDetector:
+    def __init__(self, motion, press_z=0.01, release_z=0.02, arm_speed=0.25, arm_s=0.15,
+                 lift_speed=0.5, debounce_s=0.05):
+        """
+        motion    : FingerMotionTracker（要先 update 過同一張 frame）
+        press_z   : 指尖 z 低於桌面不超過這個值才算碰到
+        release_z : 指尖 z 高於桌面超過這個值才算抬起（> press_z）
+        arm_speed : 往下速度超過這個值（畫面高度 / 秒）才算是「敲」
+        arm_s     : 敲的動作之後多久內碰到桌面都算按下
+        lift_speed: 往上速度超過這個值就直接算抬起
+        debounce_s: 同一根手指兩次狀態改變的最短間隔
+        """
+        self.motion = motion
+        self.press_z = press_z
+        self.release_z = release_z
+        self.arm_speed = arm_speed
+        self.arm_s = arm_s
+        self.lift_speed = lift_speed
+        self.debounce_s = debounce_s
+
+        self.table_z = None
+        self.offsets = np.zeros(NUM_FINGER_SLOTS, dtype=np.float64)
+
+        self.down = np.zeros(NUM_FINGER_SLOTS, dtype=bool)
+        self.changed_at = np.full(NUM_FINGER_SLOTS, -np.inf)
+        self.armed_at = np.full(NUM_FINGER_SLOTS, -np.inf)
+
+        # 統計
+        self.presses = 0
+        self.debounced = 0
+
+    def set_table(self, table_z, hand=None):
+        """
+        table_z: HandTracker.table_z（食指）
+        hand   : 放在桌面上的那隻手 (21, 3)，用來算其他手指相對食指的高度差
+        """
+        self.table_z = table_z
+        self.offsets[:] = 0.0
+        if hand is not None:
+            rel = np.array([hand[tid][2] - hand[8][2] for tid in TIP_IDS])
+            self.offsets[:5] = rel
+            self.offsets[5:] = rel
+        self.reset()
+
+    def reset(self):
+        self.down[:] = False
+        self.changed_at[:] = -np.inf
+        self.armed_at[:] = -np.inf
+
+    def update(self, fingers, slots, t):
+        """
+        fingers: extract_finger_pixels / FingertipFilter 的結果；slots: finger_slots 的結果
+        回傳與 fingers 對齊的 UP / HOLD / STRIKE list；還沒校正時回傳 None
+        """
+        if self.table_z is None:
+            return None
+
+        seen = np.zeros(NUM_FINGER_SLOTS, dtype=bool)
+        active = []
+        for (_, _, z), s in zip(fingers, slots):
+            seen[s] = True
+            depth = z - (self.table_z + self.offsets[s])
+
+            speed = self.motion.down_speed(s) or 0.0
+            if speed >= self.arm_speed:
+                self.armed_at[s] = t
+
+            settled = t - self.changed_at[s] >= self.debounce_s
+            state = HOLD if self.down[s] else UP
+            if not self.down[s]:
+                if depth >= -self.press_z and t - self.armed_at[s] <= self.arm_s:
+                    if settled:
+                        self._set(s, True, t)
+                        self.presses += 1
+                        state = STRIKE
+                    else:
+                        self.debounced += 1
+            elif depth < -self.release_z or speed <= -self.lift_speed:
+                if settled:
+                    self._set(s, False, t)
+                    state = UP
+                else:
+                    self.debounced += 1
+
+            active.append(state)
+
+        # 手不見了 → 那幾根手指直接算抬起
+        self.down[~seen] = False
+        return active
+
+    def _set(self, slot, down, t):
+        self.down[slot] = down
+        self.changed_at[slot] = t
+        # 用掉這次敲擊，抬起後要再敲一次才會再按下
+        if down:
+            self.armed_at[slot] = -np.inf
+
+    def metrics(self):
+        return {"presses": self.presses, "debounced": self.debounced,
+                "down": int(self.down.sum())}
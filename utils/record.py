@@ -1,34 +1,75 @@
 # utils/record.py
 import os
-from mido import Message, MidiFile, MidiTrack
+import queue
+import threading
+from mido import Message, MetaMessage, MidiFile, MidiTrack, bpm2tempo, second2tick
 import time
-from .keyboard import NOTE_MAP
+from .layout import note_to_midi
 from .export_midi import save_notes_to_midi, process_recording
+from . import clock
 
 class MidiRecorder:
-    def __init__(self):
-        self.mid = MidiFile()
+    """
+    update() 只比對按鍵狀態、把 (拍攝時間, 事件) 丟進 queue；
+    轉成 MIDI 訊息由另一條 thread 處理，時間只看 frame 的拍攝時間，
+    所以畫面卡頓或 waitKey 的停頓不會影響錄下來的節奏。
+    """
+    def __init__(self, ticks_per_beat=480, bpm=120):
+        self.ticks_per_beat = ticks_per_beat
+        self.tempo = bpm2tempo(bpm)
+
+        self.mid = MidiFile(ticks_per_beat=ticks_per_beat)
         self.track = MidiTrack()
         self.mid.tracks.append(self.track)
 
         self.active = False
         self.note_on_time = {}
 
-        self.last_time = time.time()
-        
-    def start(self):
+        self.start_time = None
+        self.last_tick = 0
+
+        self.events = queue.Queue()
+        self.worker = None
+        self.export_job = None
+
+    def start(self, timestamp=None):
         self.active = True
         self.track = MidiTrack()
+        self.track.append(MetaMessage("set_tempo", tempo=self.tempo, time=0))
         self.mid.tracks = [self.track]
-        self.last_time = time.time()
+        self.start_time = timestamp if timestamp is not None else clock.now()
+        self.last_tick = 0
         self.note_on_time = {}
+
+        self.events = queue.Queue()
+        self.worker = threading.Thread(target=self._write_loop, name="midi-recorder", daemon=True)
+        self.worker.start()
         print("MIDI recording started")
 
-    def stop_and_save(self):
+    def stop(self, timestamp=None):
+        """停止錄音：還按著的音補上 note off，等 queue 全部寫完"""
+        if not self.active:
+            return
+        self.active = False
+
+        t = timestamp if timestamp is not None else clock.now()
+        for n in list(self.note_on_time):
+            self.events.put((t, "note_off", note_to_midi(n), 0))
+        self.note_on_time = {}
+
+        self.events.put(None)
+        self.worker.join()
+        self.worker = None
+
+    def stop_and_save(self, timestamp=None, exports=None):
+        """
+        exports: ExportQueue。有給的話存檔 / 轉 PDF 都在背景做，
+        立刻回傳檔名，進度看 self.export_job。
+        """
         if not self.active:
             return None
 
-        self.active = False
+        self.stop(timestamp)
 
         directory = "./records"
         os.makedirs(directory, exist_ok=True)
@@ -36,35 +77,59 @@ class MidiRecorder:
         # 預設使用timestamp命名
         ts = time.strftime("%Y%m%d_%H%M%S")
         filename = os.path.join(directory, f"recording_{ts}.mid")
+
+        if exports is not None:
+            self.export_job = exports.submit(self.mid, filename)
+            return filename
+
         self.mid.save(filename)
         print(f"MIDI saved to {filename}")
         process_recording(filename)
         return filename
 
-    def update(self, pressed_notes):
+    def update(self, pressed_notes, velocities=None, timestamp=None):
+        """
+        pressed_notes: 這張 frame 按著的音
+        velocities   : {note: velocity}，由 FingerMotionTracker 估計；沒給就用 90
+        timestamp    : 這張 frame 的拍攝時間（FramePacket.timestamp）
+        """
         if not self.active:
             return
 
-        now = time.time()
-        dt = now - self.last_time
-        delta_ticks = int(dt * 480)
+        t = timestamp if timestamp is not None else clock.now()
 
         for n in pressed_notes:
             if n not in self.note_on_time:
-                midi_num = NOTE_MAP[n]
-                self.track.append(Message("note_on", note=midi_num, velocity=90, time=delta_ticks))
-                self.note_on_time[n] = now
-                dt = 0  
+                velocity = velocities.get(n, 90) if velocities else 90
+                self.events.put((t, "note_on", note_to_midi(n), velocity))
+                self.note_on_time[n] = t
 
         # 處理 note off（手已放開的）
         for n in list(self.note_on_time.keys()):
             if n not in pressed_notes:
-                midi_num = NOTE_MAP[n]
-                self.track.append(Message("note_off", note=midi_num, velocity=0, time=delta_ticks))
+                self.events.put((t, "note_off", note_to_midi(n), 0))
                 del self.note_on_time[n]
-                dt = 0
 
-        self.last_time = now
+    def _write_loop(self):
+        while True:
+            event = self.events.get()
+            if event is None:
+                break
+            t, kind, midi_num, velocity = event
+            self.track.append(Message(kind, note=midi_num, velocity=velocity,
+                                      time=self._delta_ticks(t)))
+
+    def _delta_ticks(self, t):
+        """
+        先算從開始錄音到 t 的絕對 tick，再減掉上一個事件的絕對 tick，
+        誤差不會一個一個事件累積；同一張 frame 的第二個事件之後 delta 都是 0。
+        """
+        abs_tick = int(round(second2tick(max(t - self.start_time, 0.0),
+                                         self.ticks_per_beat, self.tempo)))
+        delta = max(abs_tick - self.last_tick, 0)
+        self.last_tick = max(abs_tick, self.last_tick)
+        return delta
+
     def toggle(self):
         """切換錄音狀態"""
         if not self.is_recording:
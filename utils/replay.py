@@ -0,0 +1,201 @@
+# utils/replay.py
+import time
+
+import cv2
+import numpy as np
+
+from .landmark_store import LandmarkReader
+
+
+class VideoReplaySource:
+    """
+    用錄好的影片取代 cv2.VideoCapture(cam_index)。
+    時間依 frame 編號 / fps 前進，跟實際處理速度無關，所以可以全速重播。
+    """
+    def __init__(self, path, fps=None):
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise FileNotFoundError(f"Cannot open video: {path}")
+        self.fps = fps or self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.frame_idx = -1
+
+    def read(self, image=None):
+        """image: 重複使用的 buffer（同 cv2.VideoCapture.read）"""
+        ret, frame = self.cap.read(image)
+        if ret:
+            self.frame_idx += 1
+        return ret, frame
+
+    def now(self):
+        return max(self.frame_idx, 0) / self.fps
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def release(self):
+        self.cap.release()
+
+
+class LandmarkReplaySource:
+    """
+    重播 HandTracker.detect 的輸出，不需要相機也不需要 MediaPipe。
+
+    read() 回傳空白畫面，detect() 回傳「上一次 read 的那張 frame」的
+    (left_hand, right_hand, left_z, right_z, handed_list)，
+    所以這個物件本身就可以當 FramePipeline 的 detector。
+
+    支援 .lmk（utils.landmark_store，memmap 讀取）與 .npz。
+
+    錄的時候 governor 跳過推論、用外插補上的 frame 在 .lmk 裡有 EXTRAPOLATED 旗標；
+    預設重播時略過（只餵真的偵測結果，時間照原本的 t），include_extrapolated=True 則全部重播。
+    """
+    def __init__(self, path, frame_size=None, include_extrapolated=False):
+        self.reader = None
+        self.rows = None        # 重播的第 i 張 → .lmk 的第 rows[i] 筆；None 表示一對一
+        if path.endswith(".lmk"):
+            self.reader = LandmarkReader(path)
+            self.t = self.reader.records["t"]
+            if not include_extrapolated:
+                rows = self.reader.detected()
+                if len(rows) < len(self.t):
+                    self.rows = rows
+                    self.t = self.t[rows]
+            stored_size = self.reader.frame_size
+        else:
+            data = np.load(path)
+            self.t = data["t"]
+            self.left = data["left"]
+            self.right = data["right"]
+            stored_size = tuple(int(v) for v in data["frame_size"]) if "frame_size" in data else (1280, 720)
+
+        if frame_size is None:
+            frame_size = stored_size
+        self.frame_w, self.frame_h = frame_size
+        self.blank = np.zeros((self.frame_h, self.frame_w, 3), dtype=np.uint8)
+
+        self.frame_idx = -1
+        # id(frame buffer) → 寫進去的是第幾張；capture thread 先讀到後面時，
+        # detect() 仍然回傳那張 frame 自己的 landmark
+        self.frame_of = {}
+
+    def __len__(self):
+        return len(self.t)
+
+    def read(self, image=None):
+        if self.frame_idx + 1 >= len(self.t):
+            return False, None
+        self.frame_idx += 1
+        if image is not None and image.shape == self.blank.shape:
+            # 上一輪畫上去的東西清掉，不用重新配置
+            image.fill(0)
+        else:
+            image = self.blank.copy()
+        self.frame_of[id(image)] = self.frame_idx
+        return True, image
+
+    def detect(self, frame, out=None):
+        """out: (2, 21, 3) buffer，左右手寫進去（同 HandTracker.detect）"""
+        i = self.frame_of.get(id(frame), self.frame_idx) if frame is not None else self.frame_idx
+        i = max(i, 0)
+        if self.reader is not None:
+            return self.reader.get(self.rows[i] if self.rows is not None else i, out)
+        return unpack_hands(self.left[i], self.right[i], out)
+
+    def seek(self, i):
+        """下一次 read() 會讀到第 i 張 frame"""
+        self.frame_idx = i - 1
+
+    def now(self):
+        return float(self.t[max(self.frame_idx, 0)])
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.frame_w
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.frame_h
+        if prop == cv2.CAP_PROP_FPS and len(self.t) > 1:
+            return (len(self.t) - 1) / float(self.t[-1] - self.t[0])
+        return 0
+
+    def release(self):
+        pass
+
+
+class PacedSource:
+    """
+    讓重播來源像真的相機一樣依 fps 出 frame：read() 會等到這張 frame 該出現的時間。
+    多台琴一起重播（station_server）時用，不然 capture thread 會全速讀完、大部分 frame 被丟掉。
+    其他屬性（now、detect、get…）都直接轉給原本的來源。
+    """
+    def __init__(self, source, fps=None):
+        self.source = source
+        self.fps = fps or source.get(cv2.CAP_PROP_FPS) or 30.0
+        self.started = None
+        self.n_read = 0
+
+    def read(self, image=None):
+        now = time.perf_counter()
+        if self.started is None:
+            self.started = now
+        due = self.started + self.n_read / self.fps
+        if due > now:
+            time.sleep(due - now)
+        self.n_read += 1
+        return self.source.read(image)
+
+    def __getattr__(self, name):
+        return getattr(self.source, name)
+
+
+def unpack_hands(left, right, out=None):
+    """
+    (21,3) 陣列（沒偵測到的手整塊是 NaN）→ HandTracker.detect 的回傳格式
+    out: (2, 21, 3) buffer；None 時另外配置
+    """
+    left_hand = None if np.isnan(left[0, 0]) else _copy_hand(left, out, 0)
+    right_hand = None if np.isnan(right[0, 0]) else _copy_hand(right, out, 1)
+
+    handed_list = []
+    left_z = right_z = None
+    if left_hand is not None:
+        handed_list.append("Left")
+        left_z = left_hand[8][2]
+    if right_hand is not None:
+        handed_list.append("Right")
+        right_z = right_hand[8][2]
+
+    return left_hand, right_hand, left_z, right_z, handed_list
+
+
+def _copy_hand(hand, out, i):
+    if out is None:
+        return hand.astype(np.float64)
+    np.copyto(out[i], hand)
+    return out[i]
+
+
+def save_landmark_stream(path, records, frame_size):
+    """
+    records: [(t, left_hand, right_hand), ...]，手沒出現時為 None。
+    存成 LandmarkReplaySource 讀得懂的 .npz。
+    """
+    n = len(records)
+    t = np.zeros(n, dtype=np.float64)
+    left = np.full((n, 21, 3), np.nan, dtype=np.float32)
+    right = np.full((n, 21, 3), np.nan, dtype=np.float32)
+
+    for i, (ts, lh, rh) in enumerate(records):
+        t[i] = ts
+        if lh is not None:
+            left[i] = lh
+        if rh is not None:
+            right[i] = rh
+
+    np.savez(path, t=t, left=left, right=right, frame_size=np.array(frame_size))
+
+
+def open_replay_source(path, frame_size=None):
+    """依副檔名決定是 landmark 串流還是影片"""
+    if path.endswith(".lmk") or path.endswith(".npz"):
+        return LandmarkReplaySource(path, frame_size)
+    return VideoReplaySource(path)
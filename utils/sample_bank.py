@@ -0,0 +1,236 @@
+# utils/sample_bank.py
+"""
+音色庫：所有音色只 decode 一次，放在同一個連續的 float32 buffer 裡，
+每個音只記 (offset, length)。結果快取成 .npy + .json，之後啟動直接 memmap，
+88 鍵也只要幾毫秒。
+
+快取的 key 由設定與每個 wav 內容的 sha1 算出來；sha1 另外記在 hashes.json
+（path → 大小、mtime、sha1），檔案沒動過就不用重讀，內容一樣只是被 touch 過也不會重建。
+不同音域（例如單機的 C3-C5 與多台琴共用的 88 鍵）各有一份快取，
+超過 max_banks 份時刪掉最久沒用的。
+
+沒有 wav 的音會用最近的 wav 移調產生；一個 wav 都沒有時用合成音。
+"""
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+from .audio_engine import load_wav, resample
+
+CACHE_VERSION = 2
+
+
+class SampleBank:
+    def __init__(self, note_map, wav_folder="sounds_WAV", sample_rate=44100, channels=2,
+                 cache_dir=".cache/samples", max_seconds=4.0, max_banks=4):
+        """
+        note_map   : {note: midi}（KeyboardLayout.note_map）
+        max_seconds: 移調往下會把音色拉長，超過這個長度就截斷淡出
+        max_banks  : cache_dir 裡最多留幾份快取（依最後使用時間淘汰）
+        """
+        self.note_map = note_map
+        self.wav_folder = wav_folder
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.cache_dir = cache_dir
+        self.max_samples = int(max_seconds * sample_rate)
+        self.max_banks = max_banks
+
+        self.buffer = np.zeros((0, channels), dtype=np.float32)
+        self.index = {}         # note → (offset, length, source)
+
+        t0 = time.perf_counter()
+        self.wav_hashes = self._wav_hashes()
+        key = self._cache_key()
+        self.cache_hit = self._load_cache(key)
+        if not self.cache_hit:
+            self._build()
+            self._save_cache(key)
+        self.load_ms = (time.perf_counter() - t0) * 1000
+
+    def get(self, note):
+        """回傳 (N, channels) 的 view，不複製"""
+        entry = self.index.get(note)
+        if entry is None:
+            return None
+        offset, length, _ = entry
+        return self.buffer[offset:offset + length]
+
+    def sources(self):
+        """note → 'wav' / 'shifted:<來源音>' / 'synth'"""
+        return {note: entry[2] for note, entry in self.index.items()}
+
+    def __contains__(self, note):
+        return note in self.index
+
+    # ---- cache ----
+
+    def _wav_path(self, note):
+        return os.path.join(self.wav_folder, f"{note}.wav")
+
+    def _wav_hashes(self):
+        """
+        note → wav 內容的 sha1（沒有 wav 的音不列）。
+        hashes.json 記著上次算的 (大小, mtime, sha1)，檔案沒動過就直接用，不讀內容。
+        """
+        memo_path = os.path.join(self.cache_dir, "hashes.json")
+        try:
+            with open(memo_path) as f:
+                memo = json.load(f)
+        except (OSError, ValueError):
+            memo = {}
+
+        hashes = {}
+        changed = False
+        for note in self.note_map:
+            path = self._wav_path(note)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            abs_path = os.path.abspath(path)
+            entry = memo.get(abs_path)
+            if entry is None or entry[0] != st.st_size or entry[1] != st.st_mtime_ns:
+                with open(path, "rb") as f:
+                    entry = [st.st_size, st.st_mtime_ns, hashlib.sha1(f.read()).hexdigest()]
+                memo[abs_path] = entry
+                changed = True
+            hashes[note] = entry[2]
+
+        if changed:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with open(memo_path + ".tmp", "w") as f:
+                    json.dump(memo, f)
+                os.replace(memo_path + ".tmp", memo_path)
+            except OSError as e:
+                print(f"Could not write sample hashes: {e}")
+        return hashes
+
+    def _cache_key(self):
+        """由設定與每個 wav 的內容（sha1）算出來；wav 內容有改動或新增就會重建"""
+        h = hashlib.sha1()
+        h.update(f"{CACHE_VERSION}:{self.sample_rate}:{self.channels}:{self.max_samples}".encode())
+        for note, midi in sorted(self.note_map.items(), key=lambda kv: kv[1]):
+            h.update(f"|{note}:{midi}:{self.wav_hashes.get(note, '')}".encode())
+        return h.hexdigest()[:16]
+
+    def _load_cache(self, key):
+        npy = os.path.join(self.cache_dir, f"bank_{key}.npy")
+        meta = os.path.join(self.cache_dir, f"bank_{key}.json")
+        if not (os.path.exists(npy) and os.path.exists(meta)):
+            return False
+
+        try:
+            with open(meta) as f:
+                info = json.load(f)
+            if info.get("wav_sha1") != self.wav_hashes:
+                print("Sample cache does not match the wav files, rebuilding")
+                return False
+            self.buffer = np.load(npy, mmap_mode="r")
+            # 記下最後使用時間（淘汰舊快取時看這個）
+            os.utime(meta)
+        except (OSError, ValueError) as e:
+            print(f"Sample cache unreadable, rebuilding: {e}")
+            return False
+
+        self.index = {note: tuple(v) for note, v in info["notes"].items()}
+        return True
+
+    def _save_cache(self, key):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            npy = os.path.join(self.cache_dir, f"bank_{key}.npy")
+            meta = os.path.join(self.cache_dir, f"bank_{key}.json")
+
+            # 先寫暫存檔再 rename，避免中途中斷留下壞掉的快取
+            np.save(npy + ".tmp.npy", self.buffer)
+            os.replace(npy + ".tmp.npy", npy)
+            with open(meta + ".tmp", "w") as f:
+                json.dump({"key": key, "sample_rate": self.sample_rate, "channels": self.channels,
+                           "wav_sha1": self.wav_hashes, "notes": self.index}, f)
+            os.replace(meta + ".tmp", meta)
+            self._evict(keep=key)
+        except OSError as e:
+            print(f"Could not write sample cache: {e}")
+
+    def _evict(self, keep):
+        """只留最近用過的 max_banks 份（json 的 mtime = 最後使用時間）；其他音域的快取不會被一次清光"""
+        banks = []
+        for name in os.listdir(self.cache_dir):
+            if name.startswith("bank_") and name.endswith(".json"):
+                key = name[len("bank_"):-len(".json")]
+                if key != keep:
+                    banks.append((os.path.getmtime(os.path.join(self.cache_dir, name)), key))
+        banks.sort(reverse=True)
+        for _, key in banks[max(self.max_banks - 1, 0):]:
+            for ext in (".json", ".npy"):
+                path = os.path.join(self.cache_dir, f"bank_{key}{ext}")
+                if os.path.exists(path):
+                    os.remove(path)
+
+    # ---- build ----
+
+    def _build(self):
+        decoded = {}
+        for note in self.note_map:
+            path = self._wav_path(note)
+            if os.path.exists(path):
+                decoded[note] = load_wav(path, self.sample_rate, self.channels)
+
+        samples = {}
+        sources = {}
+        for note, midi in self.note_map.items():
+            if note in decoded:
+                samples[note] = decoded[note]
+                sources[note] = "wav"
+            elif decoded:
+                # 找音高最接近的 wav 移調（重新取樣）
+                src = min(decoded, key=lambda n: abs(self.note_map[n] - midi))
+                ratio = 2.0 ** ((midi - self.note_map[src]) / 12.0)
+                samples[note] = fit_length(resample(decoded[src], ratio), self.max_samples, self.sample_rate)
+                sources[note] = f"shifted:{src}"
+            else:
+                samples[note] = synth_tone(midi, self.sample_rate, self.channels)
+                sources[note] = "synth"
+
+        total = sum(len(s) for s in samples.values())
+        self.buffer = np.empty((total, self.channels), dtype=np.float32)
+        self.index = {}
+        offset = 0
+        for note, data in samples.items():
+            self.buffer[offset:offset + len(data)] = data
+            self.index[note] = (offset, len(data), sources[note])
+            offset += len(data)
+
+        n_missing = sum(1 for s in sources.values() if s != "wav")
+        if n_missing:
+            print(f"Sample bank: {n_missing}/{len(sources)} notes have no wav, pitch-shifted or synthesized")
+
+
+def fit_length(data, max_samples, sample_rate, fade_ms=50):
+    """太長就截斷，最後 fade_ms 淡出"""
+    if len(data) <= max_samples:
+        return data
+    data = data[:max_samples].copy()
+    fade = min(int(sample_rate * fade_ms / 1000), max_samples)
+    data[-fade:] *= np.linspace(1, 0, fade, dtype=np.float32)[:, None]
+    return data
+
+
+def synth_tone(midi, sample_rate=44100, channels=2, seconds=1.5):
+    """沒有任何 wav 時的替代音色：幾個泛音 + 指數衰減"""
+    freq = 440.0 * 2.0 ** ((midi - 69) / 12.0)
+    t = np.arange(int(sample_rate * seconds), dtype=np.float32) / sample_rate
+    wave = np.zeros_like(t)
+    for k, amp in enumerate((1.0, 0.5, 0.25, 0.12), start=1):
+        wave += amp * np.sin(2 * np.pi * freq * k * t)
+    wave *= np.exp(-3.0 * t) * 0.2
+
+    # 開頭 5ms 淡入避免 click
+    attack = int(sample_rate * 0.005)
+    wave[:attack] *= np.linspace(0, 1, attack, dtype=np.float32)
+    return np.repeat(wave[:, None], channels, axis=1).astype(np.float32)
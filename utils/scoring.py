@@ -0,0 +1,267 @@
+# utils/scoring.py
+"""
+練習的評分：把彈出來的音（Keyboard.check_pressed 的 newly_pressed + 時間）
+對齊到參考曲子（utils.song 的 Chord 串流），用只看游標附近的 online DTW。
+
+  列（row）    參考曲子的一個和弦
+  每個彈的音    DP 往前算一欄，只算 [pos - back, pos + ahead] 這幾列（band）
+  轉移          音在和弦裡：同一列（和弦的下一個音）/ 下一列 / 跳過幾列（跳過的音算 miss 的成本），
+               成本是跟預期時間差多少（依彈奏速度換算；晚的有上限，早的沒有）
+               彈錯的音：留在同一列，成本 wrong_cost（錯音不會把游標往前拉）
+
+每個音算完 DP 後直接決定它對到哪一列（不回頭改），所以 pos 只會往前；
+pos 走過的列就定案：沒按到的音算 miss。每個音的工作量是 band 的寬度，跟曲子長度無關，
+參考曲子也只透過 Song.peek / advance 讀游標附近。
+
+速度跟 PracticeEngine 一樣用 EMA 跟著彈奏者走（rate = 樂譜秒數 / 實際秒數），
+tempo drift 是後段跟前段實際速度的比較。
+
+    scorer = Scorer(Song.open(path, playable=layout.note_map))
+    每張 frame：scorer.update(newly_pressed, packet.timestamp)
+    結束：scorer.finish()；scorer.metrics()
+"""
+import collections
+import math
+
+import numpy as np
+
+INF = math.inf
+
+
+class Scorer:
+    def __init__(self, song, back=2, ahead=8, wrong_cost=1.0, miss_cost=0.5, stay_cost=0.3,
+                 time_tolerance=0.15, time_cap=0.9, follow=0.3, max_step=1.5, min_rate=0.25, max_rate=4.0,
+                 resync_after=4, drift_window=8):
+        """
+        back / ahead   : band 往回 / 往前看幾個和弦
+        wrong_cost     : 音不在這個和弦裡
+        miss_cost      : 跳過一個參考音
+        stay_cost      : 同一個和弦再對一個音（避免重複的單音都擠在同一列）
+        time_tolerance : 跟預期時間差這麼多秒，成本加 1
+        time_cap       : 晚彈的成本上限，要比 wrong_cost 小：
+                         停頓很久之後彈對的音不會因為太晚被當成錯音
+        max_step       : 一個和弦的實際速度跟目前速度差超過這個倍數就不算進速度（停頓、判斷錯的音）
+        resync_after   : 連續這麼多個音被判成錯音，表示時間的預測已經跑掉：
+                         丟掉 anchor，下一個音只看音高重新對齊
+        drift_window   : tempo drift 比較前後各幾個和弦的實際速度
+        """
+        self.song = song
+        self.back = back
+        self.ahead = ahead
+        self.wrong_cost = wrong_cost
+        self.miss_cost = miss_cost
+        self.stay_cost = stay_cost
+        self.time_tolerance = time_tolerance
+        self.time_cap = time_cap
+        self.follow = follow
+        self.max_step = max_step
+        self.resync_after = resync_after
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.drift_window = drift_window
+
+        # song 的游標對到的列（比這個前面的和弦已經丟掉）
+        self.base = 0
+        self.pos = 0                # 目前對到的列
+        self.started = False
+        # 上一個音算完的 DP（列 → 累計成本）；還沒彈之前只有起點（-1 列）
+        self.cost = {-1: 0.0}
+        # 每列：已經按到的音、第一個音的預期時間
+        self.hit = {}
+        self.expected = {}
+
+        self.rate = 1.0
+        self.anchor = None          # (實際時間, 樂譜 onset)：上一個開始的和弦
+        self.first_rates = []
+        self.last_rates = collections.deque(maxlen=drift_window)
+        self.outliers = 0
+        self.wrong_run = 0          # 連續幾個錯音
+        self.resyncs = 0
+
+        # 結果
+        self.notes = []             # (時間, 音名, 列, "hit" / "wrong", 時間誤差秒或 None)
+        self.missed = []            # (列, 音名)
+        self.errors = []
+        self.hits = 0
+        self.wrong = 0
+        self.finished = False
+
+    # ---- 參考曲子 ----
+    def chord(self, row):
+        """第 row 個和弦；曲子結束之後是 None"""
+        if row < self.base:
+            return None
+        return self.song.peek(row - self.base)
+
+    def _release(self, row):
+        """row 之前的和弦不會再用到：讓 Song 丟掉"""
+        while self.base < row:
+            if self.song.peek() is None:
+                break
+            self.song.advance()
+            self.base += 1
+
+    def predicted(self, row):
+        """row 這個和弦依目前速度預期在什麼時候彈；還沒開始時回傳 None"""
+        chord = self.chord(row)
+        if chord is None or self.anchor is None:
+            return None
+        t0, onset0 = self.anchor
+        return t0 + (chord.onset - onset0) / self.rate
+
+    # ---- 每張 frame ----
+    def update(self, newly_pressed, t):
+        """回傳這張 frame 每個音的判定 [(音名, 列, "hit" / "wrong", 誤差)]"""
+        if self.finished or not newly_pressed:
+            return []
+        out = []
+        for note in sorted(newly_pressed):
+            out.append(self._step(note, t))
+        return out
+
+    def _match(self, row, note, t):
+        """note 當成 row 這個和弦的音的成本；不在和弦裡是 INF"""
+        if note not in self.chord(row).notes:
+            return INF
+        pred = self.predicted(row)
+        if pred is None:
+            return 0.0
+        late = (t - pred) / self.time_tolerance
+        # 太晚（停下來想）最多 time_cap；太早不設上限，寧可當成彈錯也不把游標拉到後面的和弦
+        return min(late, self.time_cap) if late >= 0 else -late
+
+    def _step(self, note, t):
+        old = self.cost
+        lo = max(self.pos - self.back, 0)
+        new = {}
+        skip = INF          # 從更前面的列跳過來（中間的音都算 miss）的最小成本
+        best_row, best, best_hit = None, INF, False
+        row = lo
+        while row <= self.pos + self.ahead:
+            chord = self.chord(row)
+            if chord is None:
+                break
+            prev = self.chord(row - 1)
+            if prev is not None:
+                skip = min(skip, old.get(row - 2, INF)) + self.miss_cost * len(prev.notes)
+            stay = old.get(row, INF)
+            # 對到這個和弦：同一列的下一個音 / 從上一列過來 / 跳過幾列（起點也可以跳過開頭）
+            match = self._match(row, note, t) + min(stay + self.stay_cost, old.get(row - 1, INF), skip)
+            # 彈錯的音不移動游標
+            extra = stay + self.wrong_cost
+            c = min(match, extra)
+            if c < INF:
+                new[row] = c
+                if c < best:
+                    best_row, best, best_hit = row, c, match <= extra
+            row += 1
+
+        if best_row is None:
+            # 曲子已經結束，或還沒開始就彈了和第一個和弦無關的音
+            self.wrong += 1
+            record = (t, note, None, "wrong", None)
+            self.notes.append(record)
+            return record[1:]
+
+        # 累計成本減掉最小值，數字不會一直變大
+        self.cost = {r: c - best for r, c in new.items()}
+        # 只往前走
+        row = max(best_row, self.pos) if self.started else best_row
+        self._advance_to(row)
+        self.started = True
+        return self._assign(note, row, t, best_hit and row == best_row)[1:]
+
+    def _advance_to(self, row):
+        """pos → row；中間走過的列定案，沒按到的音算 miss"""
+        first = self.pos if self.started else 0
+        for r in range(first, row):
+            chord = self.chord(r)
+            if chord is None:
+                break
+            hit = self.hit.pop(r, ())
+            for note in sorted(chord.notes - set(hit)):
+                self.missed.append((r, note))
+            self.expected.pop(r, None)
+        self.pos = row
+        self._release(max(row - self.back, 0))
+
+    def _assign(self, note, row, t, matched):
+        chord = self.chord(row)
+        hit = self.hit.setdefault(row, set())
+        if not matched or note not in chord.notes or note in hit:
+            self.wrong += 1
+            self.wrong_run += 1
+            if self.wrong_run >= self.resync_after and self.anchor is not None:
+                self.anchor = None
+                self.resyncs += 1
+            record = (t, note, row, "wrong", None)
+            self.notes.append(record)
+            return record
+        self.wrong_run = 0
+
+        if not hit:
+            # 這個和弦的第一個音：記下預期時間，再更新速度
+            self.expected[row] = self.predicted(row)
+            self._follow(t, chord)
+        hit.add(note)
+        self.hits += 1
+        pred = self.expected[row]
+        error = t - pred if pred is not None else None
+        if error is not None:
+            self.errors.append(error)
+        record = (t, note, row, "hit", error)
+        self.notes.append(record)
+        return record
+
+    def _follow(self, t, chord):
+        if self.anchor is not None:
+            t0, onset0 = self.anchor
+            played = t - t0
+            if played > 0 and chord.onset > onset0:
+                observed = min(max((chord.onset - onset0) / played, self.min_rate), self.max_rate)
+                if not self.first_rates:
+                    # 第一段間隔：直接當成彈奏者的速度
+                    self.rate = observed
+                    self._record_rate(observed)
+                elif self.rate / self.max_step <= observed <= self.rate * self.max_step:
+                    self.rate += self.follow * (observed - self.rate)
+                    self._record_rate(observed)
+                else:
+                    # 停下來想、或判斷錯的音：只移動 anchor，不算進速度
+                    self.outliers += 1
+        self.anchor = (t, chord.onset)
+
+    def _record_rate(self, observed):
+        if len(self.first_rates) < self.drift_window:
+            self.first_rates.append(observed)
+        self.last_rates.append(observed)
+
+    def finish(self):
+        """彈完（或離開）：目前這一列也定案；之後還沒到的和弦不算 miss"""
+        if not self.finished and self.started:
+            self._advance_to(self.pos + 1)
+        self.finished = True
+
+    # ---- 結果 ----
+    def metrics(self):
+        missed = len(self.missed)
+        played = self.hits + self.wrong
+        errors = np.abs(np.asarray(self.errors)) * 1000.0
+        drift = None
+        if len(self.first_rates) >= self.drift_window and len(self.last_rates) >= self.drift_window:
+            drift = float(np.median(self.last_rates) / np.median(self.first_rates) - 1.0)
+        return {
+            "played": played,
+            "hits": self.hits,
+            "wrong_notes": self.wrong,
+            "missed": missed,
+            "accuracy": round(self.hits / played, 3) if played else None,
+            "completion": round(self.hits / (self.hits + missed), 3) if self.hits + missed else None,
+            "mean_error_ms": round(float(np.mean(self.errors)) * 1000, 1) if self.errors else None,
+            "mean_abs_error_ms": round(float(errors.mean()), 1) if len(errors) else None,
+            "p95_abs_error_ms": round(float(np.percentile(errors, 95)), 1) if len(errors) else None,
+            "tempo_rate": round(self.rate, 3),
+            "tempo_drift_pct": round(drift * 100, 1) if drift is not None else None,
+            "tempo_outliers": self.outliers,
+            "resyncs": self.resyncs,
+        }
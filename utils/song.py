@@ -0,0 +1,383 @@
+# utils/song.py
+"""
+練習模式用的曲子模型與評分引擎。
+
+  NoteEvent     一個音：onset / duration（秒）、音名、力度、聲部（track, channel）
+  Chord         同一個時間點（chord_window 內）開始的音
+  Song          MIDI → Chord 串流；用到才往下解析，只留著游標附近的和弦
+  PracticeEngine 每張 frame 用新按下的音推進游標：和弦要全部按到才算完成，
+                速度跟著彈奏者走（tempo-following），記錄每個和弦早 / 晚多少
+
+Song 不會一次把整首轉成事件：各 track 依 tick 合併成一個 generator，
+要看下一個和弦時才往下讀；走過的和弦丟掉，所以很長的曲子也只佔游標附近的記憶體。
+MIDI 檔直接從 bytes 解碼（只看 note on / off 與 set_tempo），不先用 mido 把每個訊息建成物件；
+解析過的曲子也可以從 utils.song_library 的快取直接建（Song.from_arrays）。
+
+    song = Song.open("audio/twinkle-twinkle-little-star.mid", playable=layout.note_map)
+    engine = PracticeEngine(song)
+    每張 frame：engine.update(newly_pressed, packet.timestamp)；engine.pending 是要按的音
+"""
+import collections
+import heapq
+
+from .layout import midi_to_note
+
+
+class NoteEvent:
+    __slots__ = ("onset", "duration", "note", "midi", "velocity", "voice")
+
+    def __init__(self, onset, note, midi, velocity, voice):
+        self.onset = onset
+        self.duration = None    # 讀到 note off 才知道
+        self.note = note
+        self.midi = midi
+        self.velocity = velocity
+        self.voice = voice
+
+    def __repr__(self):
+        dur = f"{self.duration:.3f}" if self.duration is not None else "?"
+        return f"NoteEvent({self.note} @{self.onset:.3f}s, {dur}s, voice={self.voice})"
+
+
+class Chord:
+    __slots__ = ("index", "onset", "events", "notes")
+
+    def __init__(self, index, onset, events):
+        self.index = index
+        self.onset = onset
+        self.events = events
+        self.notes = frozenset(e.note for e in events)
+
+    def __repr__(self):
+        return f"Chord(#{self.index} @{self.onset:.3f}s {sorted(self.notes)})"
+
+
+def _read_varlen(data, pos):
+    value = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        value = (value << 7) | (b & 0x7F)
+        if b < 0x80:
+            return value, pos
+
+
+# 0xF1–0xFE（system common / real-time）後面跟著幾個 data byte；正常的 SMF 不會有，遇到就跳過
+_SYSTEM_DATA = {0xF1: 1, 0xF2: 2, 0xF3: 1}
+
+
+def _smf_track(data, index):
+    """
+    直接從 Standard MIDI File 的一個 MTrk chunk（data 只有這個 chunk 的內容）依序解碼，用到才往下讀。
+    只產生需要的事件：(絕對 tick, track 編號, "on" / "off" / "tempo", channel, a, b)
+    chunk 被截斷時讀到最後一個完整的事件為止。
+    """
+    end = len(data)
+    pos = 0
+    tick = 0
+    status = 0
+    try:
+        while pos < end:
+            delta, pos = _read_varlen(data, pos)
+            tick += delta
+            b = data[pos]
+            if b == 0xFF:
+                # meta：只需要 set_tempo 與 end of track；跟 mido 一樣不影響 running status
+                kind = data[pos + 1]
+                length, pos = _read_varlen(data, pos + 2)
+                if pos + length > end:
+                    return
+                if kind == 0x51 and length >= 3:
+                    yield tick, index, "tempo", 0, int.from_bytes(data[pos:pos + 3], "big"), 0
+                elif kind == 0x2F:
+                    return
+                pos += length
+                continue
+            if b in (0xF0, 0xF7):
+                # sysex 取消 running status
+                status = 0
+                length, pos = _read_varlen(data, pos + 1)
+                pos += length
+                continue
+            if b > 0xF0:
+                # system common 取消 running status，real-time（0xF8 以上）不影響
+                if b < 0xF8:
+                    status = 0
+                pos += 1 + _SYSTEM_DATA.get(b, 0)
+                continue
+            if b & 0x80:
+                status = b
+                pos += 1
+            elif not status:
+                raise ValueError(f"track {index}: data byte 0x{b:02X} without running status")
+            # 沒有 status byte 時沿用上一個（running status）
+            kind = status & 0xF0
+            channel = status & 0x0F
+            if kind in (0xC0, 0xD0):
+                pos += 1
+                continue
+            a, v = data[pos], data[pos + 1]
+            pos += 2
+            if kind == 0x90 and v > 0:
+                yield tick, index, "on", channel, a, v
+            elif kind in (0x80, 0x90):
+                yield tick, index, "off", channel, a, 0
+    except IndexError:
+        # 最後一個事件不完整（檔案被截斷）
+        return
+
+
+def _smf_tracks(data):
+    """MThd header → (ticks_per_beat, 每個 track 的 generator)"""
+    if data[:4] != b"MThd":
+        raise ValueError("not a Standard MIDI File")
+    header_len = int.from_bytes(data[4:8], "big")
+    n_tracks = int.from_bytes(data[10:12], "big")
+    division = int.from_bytes(data[12:14], "big")
+    if division & 0x8000:
+        raise ValueError("SMPTE time division is not supported")
+
+    # 每個 track 只拿自己那段（不複製），不會讀到下一個 chunk
+    view = memoryview(data)
+    tracks = []
+    pos = 8 + header_len
+    while pos + 8 <= len(data) and len(tracks) < n_tracks:
+        length = int.from_bytes(data[pos + 4:pos + 8], "big")
+        if data[pos:pos + 4] == b"MTrk":
+            tracks.append(_smf_track(view[pos + 8:pos + 8 + length], len(tracks)))
+        pos += 8 + length
+    return division, tracks
+
+
+def _mido_track(track, index):
+    """mido.MidiTrack → 跟 _smf_track 一樣的格式"""
+    tick = 0
+    for msg in track:
+        tick += msg.time
+        if msg.type == "set_tempo":
+            yield tick, index, "tempo", 0, msg.tempo, 0
+        elif msg.type == "note_on" and msg.velocity > 0:
+            yield tick, index, "on", msg.channel, msg.note, msg.velocity
+        elif msg.type in ("note_off", "note_on"):
+            yield tick, index, "off", msg.channel, msg.note, 0
+
+
+def note_events(ticks_per_beat, tracks, tempos=None):
+    """
+    各 track 依 tick 合併，依時間順序產生 NoteEvent；note off 回來時補上前面那個音的 duration。
+    tracks: 每個 track 一個 (tick, track, kind, channel, a, b) 的 iterator（_smf_track 的格式）
+    tempos: 給 list 的話，每個 set_tempo 的 (秒, 每拍微秒數) 會放進去
+    """
+    merged = heapq.merge(*tracks, key=lambda item: (item[0], item[1]))
+    tempo = 500000          # MIDI 預設 120 BPM
+    last_tick = 0
+    seconds = 0.0
+    sounding = {}           # (voice, midi) → NoteEvent
+    for tick, track, kind, channel, a, b in merged:
+        if tick != last_tick:
+            seconds += (tick - last_tick) * tempo / (ticks_per_beat * 1e6)
+            last_tick = tick
+        if kind == "tempo":
+            tempo = a
+            if tempos is not None:
+                tempos.append((seconds, a))
+        elif kind == "on":
+            voice = (track, channel)
+            event = NoteEvent(seconds, midi_to_note(a), a, b, voice)
+            sounding[(voice, a)] = event
+            yield event
+        else:
+            event = sounding.pop(((track, channel), a), None)
+            if event is not None:
+                event.duration = seconds - event.onset
+
+
+def _array_events(arrays):
+    """note_events 存成的欄位 → NoteEvent（duration 是 NaN 表示沒有 note off）"""
+    columns = [arrays[k].tolist() for k in ("onset", "duration", "midi", "velocity", "track", "channel")]
+    for onset, duration, midi, velocity, track, channel in zip(*columns):
+        event = NoteEvent(onset, midi_to_note(midi), midi, velocity, (track, channel))
+        if duration == duration:
+            event.duration = duration
+        yield event
+
+
+class Song:
+    def __init__(self, events, playable=None, chord_window=0.03, name=None):
+        """
+        events      : 依 onset 排好的 NoteEvent iterator（note_events() 或 from_arrays）
+        playable    : 鍵盤上有的音名（layout.note_map）；其他的音略過（印警告）
+        chord_window: onset 相差在這之內的音算同一個和弦（秒）
+        """
+        self.name = name
+        self.playable = playable
+        self.chord_window = chord_window
+        self.skipped = 0
+
+        self._events = self._filter(events)
+        self._next_event = next(self._events, None)
+        self._n_chords = 0
+        # 已經解析、還沒被 advance() 丟掉的和弦
+        self.window = collections.deque()
+
+    @classmethod
+    def open(cls, path, **kwargs):
+        """直接解碼檔案的 bytes，不經過 mido 先把所有訊息建成物件"""
+        with open(path, "rb") as f:
+            data = f.read()
+        ticks_per_beat, tracks = _smf_tracks(data)
+        kwargs.setdefault("name", path)
+        return cls(note_events(ticks_per_beat, tracks), **kwargs)
+
+    @classmethod
+    def from_midi(cls, midi_file, **kwargs):
+        """已經在記憶體裡的 mido.MidiFile（例如剛錄好的）"""
+        tracks = [_mido_track(t, i) for i, t in enumerate(midi_file.tracks)]
+        return cls(note_events(midi_file.ticks_per_beat, tracks), **kwargs)
+
+    @classmethod
+    def from_arrays(cls, arrays, **kwargs):
+        """
+        utils.song_library 快取的欄位（onset / duration / midi / velocity / track / channel，
+        依 onset 排好）→ Song，不需要再解碼 MIDI
+        """
+        return cls(_array_events(arrays), **kwargs)
+
+    def _filter(self, events):
+        """鍵盤上沒有的音略過（印警告）"""
+        for event in events:
+            if self.playable is not None and event.note not in self.playable:
+                print(f"[Warning] Unknown MIDI note: {event.midi}")
+                self.skipped += 1
+                continue
+            yield event
+
+    def _read_chord(self):
+        """從事件串流切出下一個和弦；曲子結束時回傳 None"""
+        first = self._next_event
+        if first is None:
+            return None
+        events = [first]
+        while True:
+            event = next(self._events, None)
+            if event is None or event.onset - first.onset > self.chord_window:
+                self._next_event = event
+                break
+            events.append(event)
+        chord = Chord(self._n_chords, first.onset, events)
+        self._n_chords += 1
+        return chord
+
+    def peek(self, k=0):
+        """游標後第 k 個和弦（0 = 目前這個）；不夠就往下解析，曲子結束回傳 None"""
+        while len(self.window) <= k:
+            chord = self._read_chord()
+            if chord is None:
+                return None
+            self.window.append(chord)
+        return self.window[k]
+
+    def advance(self):
+        """丟掉目前的和弦，回傳下一個"""
+        if self.peek() is not None:
+            self.window.popleft()
+        return self.peek()
+
+    def notes(self):
+        """整首的音名串列（舊的 midi_to_notes 格式）；會把整首讀完"""
+        out = []
+        chord = self.peek()
+        while chord is not None:
+            out.extend(e.note for e in chord.events)
+            chord = self.advance()
+        return out
+
+
+class PracticeEngine:
+    """
+    每張 frame 呼叫 update(newly_pressed, t)；工作量只跟這張新按下的音數有關（最多十根手指），
+    跟曲子長度無關。
+
+    tempo-following：rate 是「樂譜秒數 / 實際秒數」，每完成一個和弦就用這次的間隔
+    往新的值靠一點（EMA），預期時間 = 上一個和弦的實際時間 + 樂譜間隔 / rate。
+    第一個和弦沒有預期時間，只當成起點。
+    """
+    def __init__(self, song, follow=0.3, min_rate=0.25, max_rate=4.0):
+        self.song = song
+        self.follow = follow
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+
+        self.chord = song.peek()
+        self.pending = set(self.chord.notes) if self.chord is not None else set()
+        self.rate = 1.0
+        self.anchor = None          # (實際時間, 樂譜 onset)：上一個完成的和弦
+
+        # 統計（都是累計值，metrics() 才算平均）
+        self.chords_done = 0
+        self.notes_hit = 0
+        self.wrong = 0
+        self.timed = 0
+        self.error_sum = 0.0
+        self.abs_error_sum = 0.0
+        self.last_error = None
+
+    @property
+    def finished(self):
+        return self.chord is None
+
+    def expected_time(self):
+        """目前這個和弦依彈奏速度預期在什麼時候按；還沒開始時回傳 None"""
+        if self.chord is None or self.anchor is None:
+            return None
+        t0, onset0 = self.anchor
+        return t0 + (self.chord.onset - onset0) / self.rate
+
+    def update(self, newly_pressed, t):
+        """回傳這張 frame 完成的和弦（沒有就是 None）"""
+        if self.chord is None or not newly_pressed:
+            return None
+        for note in newly_pressed:
+            if note in self.pending:
+                self.pending.discard(note)
+                self.notes_hit += 1
+            elif note not in self.chord.notes:
+                self.wrong += 1
+        if self.pending:
+            return None
+        return self._complete(t)
+
+    def _complete(self, t):
+        chord = self.chord
+        expected = self.expected_time()
+        if expected is not None:
+            error = t - expected
+            self.last_error = error
+            self.error_sum += error
+            self.abs_error_sum += abs(error)
+            self.timed += 1
+
+            t0, onset0 = self.anchor
+            played = t - t0
+            if played > 0 and chord.onset > onset0:
+                observed = (chord.onset - onset0) / played
+                observed = min(max(observed, self.min_rate), self.max_rate)
+                self.rate += self.follow * (observed - self.rate)
+        self.anchor = (t, chord.onset)
+        self.chords_done += 1
+
+        self.chord = self.song.advance()
+        self.pending = set(self.chord.notes) if self.chord is not None else set()
+        return chord
+
+    def metrics(self):
+        attempts = self.notes_hit + self.wrong
+        return {
+            "chords": self.chords_done,
+            "notes_hit": self.notes_hit,
+            "wrong_notes": self.wrong,
+            "accuracy": round(self.notes_hit / attempts, 3) if attempts else None,
+            "mean_error_ms": round(self.error_sum / self.timed * 1000, 1) if self.timed else None,
+            "mean_abs_error_ms": round(self.abs_error_sum / self.timed * 1000, 1) if self.timed else None,
+            "tempo_rate": round(self.rate, 3),
+        }
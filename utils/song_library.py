@@ -0,0 +1,318 @@
+# utils/song_library.py
+"""
+audio/ 裡的 MIDI 曲庫，解析結果存在硬碟上（預設 .cache/songs/）：
+
+  index.json    檔名 → mtime / size / sha1、metadata（長度、音數、音域、速度）、快取檔名
+  <sha1>.npz    整首的音（onset / duration / midi / velocity / track / channel 欄位，依 onset 排好）
+
+建構時只讀 index.json 和列出資料夾，選曲畫面馬上就有清單；
+背景 thread 把新的 / 改過的檔案補進快取（一次一首，做完一首 version 就加一，畫面跟著更新）。
+mtime 和 size 都沒變就直接沿用；有變再算 sha1，內容一樣（只是被 touch、改名）也沿用，
+真的不一樣才重新解析。資料夾裡已經沒有的檔案從 index 拿掉；這份 index 原本指到、
+現在沒人用的 npz 刪掉（cache_dir 可能跟別的曲庫共用，不認得的檔案不動）。
+解析失敗的曲子不列在 entries() 裡，選曲畫面不會選到。
+
+選好曲子後 load() 從 npz 建 Song（Song.from_arrays），不用再解碼 MIDI；
+快取還沒好或讀不到時退回 Song.open。
+
+    library = SongLibrary("audio")
+    library.start()
+    for name, meta in library.entries(): ...
+    song = library.load("audio/twinkle-twinkle-little-star.mid", playable=layout.note_map)
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from .layout import midi_to_note
+from .song import Song, _smf_tracks, note_events
+
+# 快取格式改了就加一，舊的 index 整個重建
+CACHE_VERSION = 1
+MIDI_EXTS = (".mid", ".midi")
+
+
+def _sha1(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def parse_song(path):
+    """MIDI 檔 → (欄位 dict, metadata)；整首讀一次"""
+    with open(path, "rb") as f:
+        data = f.read()
+    ticks_per_beat, tracks = _smf_tracks(data)
+    tempos = []
+    events = list(note_events(ticks_per_beat, tracks, tempos))
+
+    arrays = {
+        "onset": np.array([e.onset for e in events], np.float64),
+        "duration": np.array([e.duration if e.duration is not None else np.nan for e in events], np.float64),
+        "midi": np.array([e.midi for e in events], np.uint8),
+        "velocity": np.array([e.velocity for e in events], np.uint8),
+        "track": np.array([e.voice[0] for e in events], np.uint16),
+        "channel": np.array([e.voice[1] for e in events], np.uint8),
+    }
+    ends = arrays["onset"] + np.nan_to_num(arrays["duration"])
+    tempo = tempos[0][1] if tempos else 500000
+    meta = {
+        "notes": len(events),
+        "duration_s": round(float(ends.max()), 2) if events else 0.0,
+        "low": midi_to_note(int(arrays["midi"].min())) if events else None,
+        "high": midi_to_note(int(arrays["midi"].max())) if events else None,
+        "bpm": round(60e6 / tempo, 1),
+        "tempo_changes": len(tempos),
+    }
+    return arrays, meta
+
+
+def describe(meta):
+    """選曲畫面上一行的說明，例如 "0:45  42 notes  C4-A4  100 BPM"；還沒解析好是 None"""
+    if meta is None:
+        return None
+    minutes, seconds = divmod(int(round(meta["duration_s"])), 60)
+    text = f"{minutes}:{seconds:02d}  {meta['notes']} notes"
+    if meta["low"] is not None:
+        text += f"  {meta['low']}-{meta['high']}"
+    return text + f"  {meta['bpm']:g} BPM"
+
+
+class SongLibrary:
+    def __init__(self, audio_dir="audio", cache_dir=os.path.join(".cache", "songs")):
+        self.audio_dir = audio_dir
+        self.cache_dir = cache_dir
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stopping = False
+
+        # 每次 index 有變就加一（PracticeUI 用來判斷要不要重畫清單）
+        self.version = 0
+        self.files = self._list()
+        self.index = self._read_index()
+        self.dirty = False
+        # 解析失敗的檔名（不列進 entries()）、被換掉或拿掉的快取檔名（等著刪）
+        self.broken = set()
+        self.stale = set()
+
+        # 統計
+        self.reused = 0
+        self.rehashed = 0
+        self.parsed = 0
+        self.failed = 0
+        self.build_s = None
+        self.cache_loads = 0
+        self.fallback_loads = 0
+
+    def _list(self):
+        if not os.path.isdir(self.audio_dir):
+            print(f"[Warning] Song folder not found: {self.audio_dir}")
+            return []
+        return sorted(f for f in os.listdir(self.audio_dir) if f.lower().endswith(MIDI_EXTS))
+
+    def _read_index(self):
+        try:
+            with open(self.index_path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != CACHE_VERSION:
+            return {}
+        return data.get("songs", {})
+
+    def _write_index(self):
+        """先寫暫存檔再換名，當掉也不會留下寫一半的 index"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with self.lock:
+            data = {"version": CACHE_VERSION, "songs": dict(self.index)}
+            self.dirty = False
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f, indent=1)
+        os.replace(tmp, self.index_path)
+
+    # ---- 背景建 index ----
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.build, daemon=True)
+            self.thread.start()
+        return self
+
+    @property
+    def ready(self):
+        """背景那一輪做完了沒"""
+        return self.build_s is not None
+
+    def progress(self):
+        """(已經有 metadata 的首數, 總首數)"""
+        with self.lock:
+            done = sum(1 for f in self.files if f in self.index)
+        return done, len(self.files)
+
+    def build(self):
+        """把資料夾裡每一首對到快取；可以在背景 thread 或直接呼叫"""
+        t0 = time.perf_counter()
+        by_hash = {e["sha1"]: e for e in self.index.values()}
+        for name in self.files:
+            if self.stopping:
+                return
+            self._refresh(name, by_hash)
+
+        with self.lock:
+            for name in set(self.index) - set(self.files):
+                self.stale.add(self.index.pop(name)["cache"])
+                self.dirty = True
+            self.version += 1
+        if self.dirty:
+            self._write_index()
+        self._collect_garbage()
+        self.build_s = time.perf_counter() - t0
+
+    def _refresh(self, name, by_hash):
+        path = os.path.join(self.audio_dir, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        entry = self.index.get(name)
+        if entry is not None and entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size \
+                and os.path.exists(os.path.join(self.cache_dir, entry["cache"])):
+            self.reused += 1
+            return
+
+        digest = _sha1(path)
+        same = by_hash.get(digest)
+        if same is not None and os.path.exists(os.path.join(self.cache_dir, same["cache"])):
+            # 內容沒變（被 touch 或改名）：沿用解析結果，只更新 mtime
+            entry = dict(same, mtime_ns=st.st_mtime_ns, size=st.st_size)
+            self.rehashed += 1
+        else:
+            try:
+                arrays, meta = parse_song(path)
+            except (OSError, ValueError, IndexError) as e:
+                print(f"[Warning] Cannot parse {name}: {e}")
+                self.failed += 1
+                self._mark_broken(name)
+                return
+            os.makedirs(self.cache_dir, exist_ok=True)
+            cache = digest + ".npz"
+            tmp = os.path.join(self.cache_dir, digest + ".tmp.npz")
+            np.savez(tmp, **arrays)
+            os.replace(tmp, os.path.join(self.cache_dir, cache))
+            entry = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha1": digest,
+                     "cache": cache, "meta": meta}
+            self.parsed += 1
+        by_hash[digest] = entry
+        with self.lock:
+            old = self.index.get(name)
+            if old is not None and old["cache"] != entry["cache"]:
+                self.stale.add(old["cache"])
+            self.index[name] = entry
+            self.broken.discard(name)
+            self.dirty = True
+            self.version += 1
+
+    def _mark_broken(self, name):
+        """解析失敗：從 index 拿掉，entries() 不再列出"""
+        with self.lock:
+            old = self.index.pop(name, None)
+            if old is not None:
+                self.stale.add(old["cache"])
+                self.dirty = True
+            self.broken.add(name)
+            self.version += 1
+
+    def _collect_garbage(self):
+        """這份 index 以前指到、現在沒有人用的 npz 刪掉；cache_dir 裡其他檔案不動"""
+        with self.lock:
+            used = {e["cache"] for e in self.index.values()}
+            stale, self.stale = self.stale - used, set()
+        for f in stale:
+            try:
+                os.remove(os.path.join(self.cache_dir, f))
+            except OSError:
+                pass
+
+    def stop(self):
+        self.stopping = True
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.dirty:
+            self._write_index()
+
+    # ---- 給選曲畫面 / 練習用 ----
+    def entries(self):
+        """[(檔名, metadata 或 None)]；還沒解析到的曲子 metadata 是 None，解析失敗的不列"""
+        with self.lock:
+            return [(name, (self.index.get(name) or {}).get("meta")) for name in self.files
+                    if name not in self.broken]
+
+    def meta(self, name):
+        with self.lock:
+            entry = self.index.get(name)
+        return entry["meta"] if entry is not None else None
+
+    def _cached(self, path):
+        """快取的欄位；沒有快取、檔案改過或讀不到時回傳 None"""
+        name = os.path.basename(path)
+        with self.lock:
+            entry = self.index.get(name)
+        if entry is None or os.path.dirname(os.path.abspath(path)) != os.path.abspath(self.audio_dir):
+            return None
+        try:
+            st = os.stat(path)
+            if entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size:
+                with np.load(os.path.join(self.cache_dir, entry["cache"])) as data:
+                    arrays = {k: data[k] for k in data.files}
+                self.cache_loads += 1
+                return arrays
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[Warning] Song cache unreadable for {name}: {e}")
+        return None
+
+    def load(self, path, **kwargs):
+        """曲子路徑 → Song；有快取就從 npz 建，否則直接解碼 MIDI（用到才往下讀）"""
+        kwargs.setdefault("name", path)
+        arrays = self._cached(path)
+        if arrays is not None:
+            return Song.from_arrays(arrays, **kwargs)
+        self.fallback_loads += 1
+        return Song.open(path, **kwargs)
+
+    def load_arrays(self, path):
+        """
+        曲子路徑 → Song.from_arrays 用的欄位；沒有快取就整首解碼一次。
+        同一首要建好幾個 Song（各自的游標）時用這個，MIDI 只解碼一次。
+        解析失敗時標成壞掉（entries() 不再列出）再把例外丟出去。
+        """
+        arrays = self._cached(path)
+        if arrays is None:
+            self.fallback_loads += 1
+            try:
+                arrays, _ = parse_song(path)
+            except (OSError, ValueError, IndexError):
+                self._mark_broken(os.path.basename(path))
+                raise
+        return arrays
+
+    def metrics(self):
+        done, total = self.progress()
+        return {
+            "songs": total,
+            "indexed": done,
+            "reused": self.reused,
+            "rehashed": self.rehashed,
+            "parsed": self.parsed,
+            "failed": self.failed,
+            "build_ms": round(self.build_s * 1000, 1) if self.build_s is not None else None,
+            "cache_loads": self.cache_loads,
+            "fallback_loads": self.fallback_loads,
+        }
@@ -1,34 +1,67 @@
 # utils/soundplayer.py
-import pygame
-import os
-from .keyboard import NOTE_MAP
+from .layout import DEFAULT_LAYOUT
+from .audio_engine import AudioEngine
+from .sample_bank import SampleBank
 
 class SoundPlayer:
-    def __init__(self, wav_folder="sounds_WAV"):
-        pygame.mixer.init()
-        self.sounds = {}
-        for note, midi in NOTE_MAP.items():
-            wav_path = os.path.join(wav_folder, f"{note}.wav")
-            if os.path.exists(wav_path):
-                self.sounds[note] = pygame.mixer.Sound(wav_path)
-            else:
-                print(f"Warning! Missing wav file: {wav_path}")
-
-        self.active_channels = {}
-
-    def play_notes(self, notes):
+    def __init__(self, wav_folder="sounds_WAV", layout=DEFAULT_LAYOUT,
+                 backend="auto", block_size=256, max_voices=32,
+                 engine=None, bank=None, voice_key=None):
+        """
+        engine / bank: 好幾個 station 共用同一個 AudioEngine / SampleBank（station_server）；
+                       None 時自己建立，close() 時也只關自己建立的
+        voice_key    : 共用 mixer 時區分不同 station 的同一個音，例如 station 編號
+        """
+        # 混音由 AudioEngine 負責：block 大小、同時發聲數、release 都可以自己控制
+        self.owns_engine = engine is None
+        self.engine = engine if engine is not None else \
+            AudioEngine(backend, block_size=block_size, max_voices=max_voices)
+        self.mixer = self.engine.mixer
+        self.voice_key = voice_key
+
+        # 所有音色在同一個連續 buffer 裡，self.sounds 只是 view
+        if bank is None:
+            bank = SampleBank(layout.note_map, wav_folder,
+                              self.mixer.sample_rate, self.mixer.channels)
+            print(f"Sample bank: {len(layout.note_map)} notes loaded in {bank.load_ms:.1f} ms")
+        self.bank = bank
+        self.sounds = {note: self.bank.get(note) for note in layout.note_map if note in self.bank}
+
+        self.active_notes = set()
+
+        if self.owns_engine:
+            lat = self.engine.latency()
+            print(f"Audio: {lat['backend']}, block {lat['block_ms']} ms, output latency ~{lat['total_ms']} ms")
+
+    def play_notes(self, notes, velocities=None):
+        """velocities: {note: MIDI velocity}，沒給的音用 90"""
         for note in notes:
             if note not in self.sounds:
                 continue
 
-            if note not in self.active_channels:
-                ch = self.sounds[note].play()
-                self.active_channels[note] = ch
+            if note not in self.active_notes:
+                velocity = velocities.get(note, 90) if velocities else 90
+                self.mixer.note_on(self._voice(note), self.sounds[note], velocity_to_gain(velocity))
+                self.active_notes.add(note)
 
     def stop_notes(self, notes):
         for note in notes:
-            if note in self.active_channels:
-                ch = self.active_channels[note]
-                if ch:
-                    ch.stop()
-                del self.active_channels[note]
\ No newline at end of file
+            if note in self.active_notes:
+                # release envelope 淡出，不會有 click
+                self.mixer.note_off(self._voice(note))
+                self.active_notes.discard(note)
+
+    def _voice(self, note):
+        return note if self.voice_key is None else (self.voice_key, note)
+
+    def close(self):
+        if self.owns_engine:
+            self.engine.close()
+        else:
+            # 共用的 mixer 還在跑，自己還按著的音要放掉
+            self.stop_notes(list(self.active_notes))
+
+
+def velocity_to_gain(velocity):
+    """MIDI velocity → 音量；用次方曲線讓輕觸不會太小聲"""
+    return (max(velocity, 1) / 127.0) ** 0.6
@@ -0,0 +1,343 @@
+# utils/states.py
+"""
+AirPiano 的流程拆成明確的狀態，每張 frame 交給目前的狀態處理（StateMachine.step）：
+
+  calibrate_table → calibrate_width → mode_select ─→ (訊息) ──────────────→ playing ⇄ exit_menu
+                                                  └→ song_picker → (訊息) → playing → (訊息) → completed
+  exit_menu / completed 按 Restart 回到 calibrate_table，按 Exit 結束
+
+要停一下顯示訊息時（"RECORD MODE"、"Song Completed!"）不會卡住迴圈：Message 狀態照樣每張 frame
+收 packet、畫訊息，時間到由 Scheduler 的 timer 切到下一個狀態，相機和追蹤都不停。
+
+Scheduler 的時間預設來自 utils.clock，也可以注入 FakeClock，
+所以每個狀態都能用假的 packet 單獨測、單獨量時間（benchmarks/bench_states.py）：
+
+    fake = FakeClock()
+    with clock.using(fake):
+        app.machine.goto("mode_select")
+        app.machine.step(packet)
+        fake.advance(1 / 30)
+"""
+import heapq
+import itertools
+
+from . import clock
+from .display_text import draw_center_text
+
+
+class FakeClock:
+    """手動前進的時鐘：clock.using(fake) 或 Scheduler(now=fake)"""
+    def __init__(self, t=0.0):
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+    def advance(self, dt):
+        self.t += dt
+        return self.t
+
+
+class Timer:
+    __slots__ = ("due", "fn", "cancelled")
+
+    def __init__(self, due, fn):
+        self.due = due
+        self.fn = fn
+        self.cancelled = False
+
+
+class Scheduler:
+    """
+    不等待的 timer：after() 排一個 callback，run_due() 每張 frame 呼叫一次，
+    把時間到了的依序執行。沒有自己的 thread，callback 都在呼叫 run_due() 的 thread 上跑。
+    """
+    def __init__(self, now=None):
+        """now: 取得目前時間的函式；None 時用 utils.clock.now"""
+        self.now = now if now is not None else clock.now
+        self.heap = []
+        self.counter = itertools.count()
+
+    def after(self, seconds, fn):
+        timer = Timer(self.now() + seconds, fn)
+        heapq.heappush(self.heap, (timer.due, next(self.counter), timer))
+        return timer
+
+    def cancel(self, timer):
+        if timer is not None:
+            timer.cancelled = True
+
+    def clear(self):
+        self.heap = []
+
+    def run_due(self):
+        """執行所有時間到了的 callback，回傳執行了幾個"""
+        fired = 0
+        now = self.now()
+        while self.heap and self.heap[0][0] <= now:
+            _, _, timer = heapq.heappop(self.heap)
+            if not timer.cancelled:
+                timer.fn()
+                fired += 1
+        return fired
+
+    def pending(self):
+        return sum(1 for _, _, t in self.heap if not t.cancelled)
+
+
+class State:
+    name = None
+    table_line = True       # 桌面校正完之後畫桌面線
+
+    def enter(self, app, **kwargs):
+        pass
+
+    def exit(self, app):
+        pass
+
+    def step(self, app, packet):
+        """處理一張 frame；回傳 False 表示要結束"""
+        return True
+
+
+class CalibrateTable(State):
+    name = "calibrate_table"
+    table_line = False
+
+    def step(self, app, packet):
+        left_hand, right_hand = packet.hands[0], packet.hands[1]
+        app.hand_tracker.update_table_calibration(left_hand, right_hand, app.frame_h)
+        draw_center_text(packet.frame, "Please keep fingertip touching table for calibration.")
+        if app.hand_tracker.table_locked:
+            app.machine.goto("calibrate_width")
+        return app.show(packet.frame) != 27
+
+
+class CalibrateWidth(State):
+    name = "calibrate_width"
+
+    def step(self, app, packet):
+        left_hand, right_hand = packet.hands[0], packet.hands[1]
+        dom = app.hand_tracker.get_dominant(left_hand, right_hand)
+        if dom is None:
+            # 沒偵測到手，等手出現
+            draw_center_text(packet.frame, "Step 2: Show your hand to calibrate key width.")
+            return app.show(packet.frame) != 27
+
+        app.build_keyboard(left_hand if dom == "Left" else right_hand)
+        app.machine.goto("mode_select")
+        return True
+
+
+class ModeSelect(State):
+    name = "mode_select"
+
+    def step(self, app, packet):
+        if app.mode is not None:
+            # 已經指定模式（例如 benchmark 預先設好）：直接開始
+            self._start(app, app.mode, packet)
+            return True
+
+        frame = packet.frame
+        fingers = app.fingers(packet)
+        hover = app.mode_selector.check_pressed(fingers)
+        app.mode_selector.draw(frame, hover)
+        draw_center_text(frame, "Please select a mode: Record or Practice.")
+        keep = app.show(frame) != 27
+        if hover is not None:
+            app.mode = hover
+            self._start(app, hover, packet)
+        return keep
+
+    @staticmethod
+    def _start(app, mode, packet):
+        if mode == "record":
+            app.midi_recorder.start(packet.timestamp)
+            app.machine.message("RECORD MODE", 1.0, "playing")
+        else:
+            app.machine.goto("song_picker")
+
+
+class SongPicker(State):
+    name = "song_picker"
+
+    def step(self, app, packet):
+        # 只需要右手的食指
+        right_hand = packet.hands[1]
+        fingertip = None
+        if right_hand is not None:
+            x_norm, y_norm, _ = right_hand[8]   # 食指 (ID=8)
+            fingertip = (int(x_norm * app.frame_w), int(y_norm * app.frame_h))
+
+        app.practice_ui.render(packet.frame, fingertip)
+        selected = app.practice_ui.update(fingertip)
+        keep = app.show(packet.frame) != 27
+        if selected is not None:
+            if app.load_song(selected):
+                app.machine.message("PRACTICE MODE", 1.0, "playing")
+            else:
+                # 讀不了的曲子：提示一下再回選曲畫面（清單裡已經拿掉）
+                app.machine.message("Cannot open this song", 1.5, "song_picker")
+        return keep
+
+
+class Playing(State):
+    name = "playing"
+
+    def enter(self, app, **kwargs):
+        app.begin_session()
+
+    def step(self, app, packet):
+        frame = packet.frame
+        _, newly_pressed, pressed_notes = app.play(packet)
+
+        # 雙手離開畫面 3 秒 → Exit 選單（下一張開始）
+        app.exit_ui.update(packet.hands[0] is None, packet.hands[1] is None)
+        if app.exit_ui.visible:
+            app.machine.goto("exit_menu")
+            return app.show(frame) != 27
+
+        if app.mode == "practice":
+            # 和弦全部按到才往下走
+            app.practice.update(newly_pressed, packet.timestamp)
+            judged = app.scorer.update(newly_pressed, packet.timestamp)
+            app.log_notes(packet, newly_pressed, judged)
+            if app.practice.finished:
+                app.end_session()
+                draw_center_text(frame, "Song Completed!")
+                keep = app.show(frame) != 27
+                app.machine.message("Song Completed!", 1.5, "completed")
+                return keep
+            app.keyboard.draw(frame, pressed_notes, app.practice.pending)
+        else:
+            app.log_notes(packet, newly_pressed)
+            app.keyboard.draw(frame, pressed_notes)
+        return app.show(frame) != 27
+
+
+class ExitMenu(State):
+    name = "exit_menu"
+
+    def enter(self, app, **kwargs):
+        app.exit_ui.visible = True
+        app.exit_ui.build(app.frame_w, app.frame_h)
+        if app.mode == "record":
+            app.download_ui.build(app.frame_w, app.frame_h)
+
+    def clickable(self, app):
+        return True
+
+    def step(self, app, packet):
+        frame = packet.frame
+        # 選單開著時琴鍵照樣會響
+        fingers, _, _ = app.play(packet)
+
+        midi_hover = False
+        # 只有在 record 模式才顯示 Download MIDI
+        if app.mode == "record":
+            midi_hover = app.download_ui.check_pressed(fingers)
+            if midi_hover:
+                app.midi_recorder.stop_and_save(packet.timestamp, app.exports)
+
+            # 顯示背景存檔的進度，完成後再留 3 秒
+            job = app.midi_recorder.export_job
+            if job is not None and (not job.finished or clock.now() - job.finished_at < 3.0):
+                draw_center_text(frame, job.describe())
+
+        selected = app.exit_ui.check_pressed(fingers) if self.clickable(app) else None
+        if selected == "exit":
+            print("程式結束")
+            return False
+        if selected == "restart":
+            print("Restart requested")
+            app.restart()
+            return True
+
+        app.exit_ui.draw(frame)
+        if app.mode == "record":
+            app.download_ui.draw(frame, midi_hover)
+        return app.show(frame) != 27
+
+
+class Completed(ExitMenu):
+    """曲子彈完：跟 Exit 選單一樣，但 2 秒後才能按（手還在鍵盤上，避免誤按）"""
+    name = "completed"
+
+    def __init__(self, lock_s=2.0):
+        self.lock_s = lock_s
+        self.unlocked = False
+
+    def enter(self, app, **kwargs):
+        app.mode = "completed"
+        app.exit_ui.trigger_time = None
+        super().enter(app)
+        self.unlocked = False
+        app.machine.scheduler.after(self.lock_s, self._unlock)
+
+    def _unlock(self):
+        self.unlocked = True
+
+    def clickable(self, app):
+        return self.unlocked
+
+
+class Message(State):
+    """只顯示一段文字、不處理手勢；seconds 秒後由 timer 切到 then"""
+    name = "message"
+    table_line = False
+
+    def __init__(self):
+        self.text = None
+        self.then = None
+
+    def enter(self, app, text=None, seconds=1.0, then=None):
+        # headless 也照樣等：重播時訊息期間的 frame 一樣要經過，結果才跟有畫面時相同
+        self.text = text
+        self.then = then
+        app.machine.scheduler.after(seconds, lambda: app.machine.goto(then))
+
+    def step(self, app, packet):
+        draw_center_text(packet.frame, self.text)
+        return app.show(packet.frame) != 27
+
+
+def build_states():
+    return [CalibrateTable(), CalibrateWidth(), ModeSelect(), SongPicker(),
+            Playing(), ExitMenu(), Completed(), Message()]
+
+
+class StateMachine:
+    def __init__(self, app, states=None, initial="calibrate_table", scheduler=None):
+        self.app = app
+        self.states = {s.name: s for s in (states if states is not None else build_states())}
+        self.scheduler = scheduler if scheduler is not None else Scheduler()
+        self.current = None
+        self.transitions = 0
+        self.goto(initial)
+
+    @property
+    def name(self):
+        return self.current.name if self.current is not None else None
+
+    def goto(self, name, **kwargs):
+        if self.current is not None:
+            self.current.exit(self.app)
+        self.current = self.states[name]
+        self.transitions += 1
+        self.current.enter(self.app, **kwargs)
+
+    def message(self, text, seconds, then):
+        """顯示 text seconds 秒（不處理手勢），之後進入 then"""
+        self.goto("message", text=text, seconds=seconds, then=then)
+
+    def reset(self, name="calibrate_table"):
+        """取消所有 timer，回到 name"""
+        self.scheduler.clear()
+        self.goto(name)
+
+    def step(self, packet):
+        self.scheduler.run_due()
+        state = self.current
+        if state.table_line:
+            self.app.draw_table_line(packet.frame)
+        return state.step(self.app, packet)
@@ -0,0 +1,229 @@
+# utils/station_server.py
+"""
+一個 process 同時跑好幾台琴（station），共用耗資源的部分：
+
+  SharedResources  一個 AudioEngine（同一個 mixer）、一個 SampleBank、一個 InferencePool
+  InferencePool    固定數量的推論 worker thread；每個 station 固定交給同一個 worker，
+                   worker 一次醒來就把它負責的 station 有等著的 frame 都處理掉
+  StationServer    每個 station 一條 capture thread；主執行緒輪流把推論好的 packet 交給
+                   各 station 的 AirPiano.step()，畫面 / 聲音 / UI 都在這裡
+
+MediaPipe 的 Hands 一次只吃一張圖，沒辦法把不同 station 的 frame 疊成一個 batch。
+一個 worker 只負責一個 station 時沿用 video 模式（會追蹤上一張的手）；
+同一個模型要輪流處理好幾個 station 時改成 static_image_mode，避免把 A 的追蹤結果用在 B 上。
+
+    server = StationServer(workers=2, headless=True)
+    for path in paths:
+        server.add(AirPiano(source=open_replay_source(path), headless=True, station=server.station()))
+    server.run()
+"""
+import threading
+import time
+
+import cv2
+
+from . import clock
+from .audio_engine import AudioEngine
+from .layout import KeyboardLayout
+from .sample_bank import SampleBank
+from .song_library import SongLibrary
+from .analytics import AnalyticsStore
+
+
+class _Worker:
+    def __init__(self, index):
+        self.index = index
+        self.pipelines = []
+        self.event = threading.Event()
+        self.thread = None
+        self.hands = None
+
+        # 統計
+        self.frames = 0
+        self.wakeups = 0
+        self.busy_s = 0.0
+
+
+class InferencePool:
+    def __init__(self, workers=2, model_complexity=1):
+        self.workers = [_Worker(i) for i in range(max(workers, 1))]
+        self.model_complexity = model_complexity
+        self.assigned = {}      # id(pipeline) → _Worker
+        self.running = False
+        # 有任何一個 station 推論完一張就 set，StationServer 用來等結果
+        self.results = threading.Event()
+        self.started_at = None
+
+    def add(self, pipeline):
+        """分配給目前負責最少 station 的 worker（start() 之前呼叫）"""
+        worker = min(self.workers, key=lambda w: len(w.pipelines))
+        worker.pipelines.append(pipeline)
+        self.assigned[id(pipeline)] = worker
+
+    def notify(self, pipeline):
+        """capture thread 放進新的 frame（或結束）時呼叫"""
+        worker = self.assigned.get(id(pipeline))
+        if worker is not None:
+            worker.event.set()
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.started_at = time.perf_counter()
+        for worker in self.workers:
+            if not worker.pipelines:
+                continue
+            self._attach_model(worker)
+            worker.thread = threading.Thread(target=self._loop, args=(worker,),
+                                             name=f"inference-{worker.index}", daemon=True)
+            worker.thread.start()
+
+    def stop(self):
+        self.running = False
+        for worker in self.workers:
+            worker.event.set()
+            if worker.thread is not None:
+                worker.thread.join(timeout=1.0)
+                worker.thread = None
+            if worker.hands is not None:
+                worker.hands.close()
+                worker.hands = None
+
+    def _attach_model(self, worker):
+        # landmark 重播的 station 自己就是 detector，不需要模型
+        trackers = [p.detector for p in worker.pipelines if hasattr(p.detector, "attach")]
+        if not trackers:
+            return
+        from .hand_tracker import build_hands
+        worker.hands = build_hands(self.model_complexity, static=len(trackers) > 1)
+        for tracker in trackers:
+            tracker.attach(worker.hands)
+
+    def _loop(self, worker):
+        while self.running:
+            # 先 clear 再檢查，處理到一半進來的 frame 不會漏掉
+            worker.event.clear()
+            t0 = time.perf_counter()
+            done = 0
+            for pipeline in worker.pipelines:
+                if pipeline.infer_pending():
+                    done += 1
+            if done:
+                worker.busy_s += time.perf_counter() - t0
+                worker.frames += done
+                worker.wakeups += 1
+                self.results.set()
+                continue
+            if all(p.result_ring.closed for p in worker.pipelines):
+                self.results.set()
+                break
+            worker.event.wait(0.05)
+
+    def metrics(self):
+        elapsed = time.perf_counter() - self.started_at if self.started_at else 0.0
+        out = []
+        for w in self.workers:
+            out.append({
+                "worker": w.index,
+                "stations": len(w.pipelines),
+                "shared_model": w.hands is not None and len(w.pipelines) > 1,
+                "frames": w.frames,
+                "frames_per_wakeup": round(w.frames / w.wakeups, 2) if w.wakeups else 0.0,
+                "utilization": round(w.busy_s / elapsed, 3) if elapsed else 0.0,
+            })
+        return out
+
+
+class SharedResources:
+    def __init__(self, audio_backend="auto", workers=2, layout=None, wav_folder="sounds_WAV",
+                 max_voices=64, model_complexity=1, analytics=None):
+        """
+        layout: SampleBank 要涵蓋的音域；預設 88 鍵，任何 station 的音域都用得到
+        analytics: 所有 station 共用的紀錄檔（utils.analytics）；None 表示不記錄
+        """
+        self.engine = AudioEngine(audio_backend, max_voices=max_voices)
+        mixer = self.engine.mixer
+        layout = layout or KeyboardLayout("A0", "C8", black_keys=True)
+        self.bank = SampleBank(layout.note_map, wav_folder, mixer.sample_rate, mixer.channels)
+        print(f"Shared sample bank: {len(layout.note_map)} notes loaded in {self.bank.load_ms:.1f} ms")
+        self.pool = InferencePool(workers, model_complexity)
+        self.library = SongLibrary().start()
+        self.analytics = AnalyticsStore(analytics) if analytics else None
+        if self.analytics is not None:
+            print(f"Analytics: recording sessions to {self.analytics.path}")
+
+        lat = self.engine.latency()
+        print(f"Audio: {lat['backend']}, block {lat['block_ms']} ms, output latency ~{lat['total_ms']} ms")
+
+    def close(self):
+        self.pool.stop()
+        self.engine.close()
+        self.library.stop()
+        print(f"Song library: {self.library.metrics()}")
+        if self.analytics is not None:
+            self.analytics.close()
+            print(f"Analytics: {self.analytics.metrics()}")
+
+
+class StationServer:
+    def __init__(self, workers=2, headless=False, audio_backend="auto", **shared_kwargs):
+        self.headless = headless
+        self.shared = SharedResources(audio_backend, workers, **shared_kwargs)
+        self.stations = []
+
+    def station(self):
+        """下一個 AirPiano 的 station 參數：(編號, 共用資源)"""
+        return len(self.stations), self.shared
+
+    def add(self, app):
+        self.stations.append(app)
+        self.shared.pool.add(app.pipeline)
+        return app
+
+    def run(self):
+        """所有 station 都結束（Exit、來源播完）或按 ESC 才回傳"""
+        print(f"Serving {len(self.stations)} stations with {len(self.shared.pool.workers)} inference workers")
+        self.shared.pool.start()
+        for app in self.stations:
+            app.pipeline.start()
+
+        active = list(self.stations)
+        while active:
+            key = -1
+            if not self.headless:
+                # 所有視窗共用一次 waitKey；ESC 關掉全部
+                key = cv2.waitKey(1) & 0xFF
+                if key == 27:
+                    break
+
+            self.shared.pool.results.clear()
+            progressed = False
+            for app in list(active):
+                app.key = key
+                packet = app.pipeline.poll()
+                if packet is None:
+                    if app.pipeline.finished():
+                        active.remove(app)
+                        app.close()
+                    continue
+
+                progressed = True
+                t0 = time.perf_counter()
+                app.latency.add("capture_to_step", t0 - packet.t_capture)
+                with clock.using(app.clock):
+                    keep = app.step(packet)
+                app.latency.add("step", time.perf_counter() - t0)
+                if not keep:
+                    active.remove(app)
+                    app.close()
+
+            if not progressed and self.headless:
+                self.shared.pool.results.wait(0.05)
+
+        for app in active:
+            app.close()
+        print(f"Inference pool: {self.shared.pool.metrics()}")
+        self.shared.close()
+        if not self.headless:
+            cv2.destroyAllWindows()